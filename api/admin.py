@@ -0,0 +1,43 @@
+from django.contrib import admin
+
+from . import models
+
+
+@admin.register(models.OutboxMessage)
+class OutboxMessageAdmin(admin.ModelAdmin):
+    list_display = (
+        "recipient", "subject", "status", "attempts", "next_attempt_at",
+        "sent_at",
+    )
+    list_filter = ("status",)
+    search_fields = ("recipient",)
+
+
+@admin.register(models.SlowQuery)
+class SlowQueryAdmin(admin.ModelAdmin):
+    list_display = ("created_at", "view", "method", "duration", "path")
+    list_filter = ("view",)
+    search_fields = ("sql", "path")
+    readonly_fields = (
+        "sql", "duration", "view", "method", "path", "stack", "plan",
+        "created_at",
+    )
+
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(models.ProfileRecord)
+class ProfileRecordAdmin(admin.ModelAdmin):
+    list_display = (
+        "created_at", "user", "method", "path", "status", "duration",
+    )
+    list_filter = ("view",)
+    readonly_fields = (
+        "user", "view", "method", "path", "status", "duration", "collapsed",
+        "created_at",
+    )
+    exclude = ("stats",)
+
+    def has_add_permission(self, request):
+        return False
@@ -0,0 +1,60 @@
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import (AuthenticationFailed,
+                                                 InvalidToken)
+from rest_framework_simplejwt.settings import api_settings
+
+from reviews.models import User
+
+USER_CACHE_KEY = "auth:user:{}"
+# Fields used by permissions and shown by `/users/me/`.
+SNAPSHOT_NAMES = (
+    "id", "username", "role", "is_active", "is_superuser", "is_staff",
+    "first_name", "last_name", "email", "bio",
+)
+# `Model.from_db` expects values in the order of concrete fields.
+SNAPSHOT_FIELDS = tuple(
+    field.attname for field in User._meta.concrete_fields
+    if field.attname in SNAPSHOT_NAMES
+)
+
+
+def get_user_cache_key(user_id):
+    return USER_CACHE_KEY.format(user_id)
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """JWT authentication resolving users from a cached snapshot.
+
+    The snapshot holds fields used by permissions and `/users/me/`;
+    other fields are deferred and loaded on first access. Entries live
+    `cache_timeout` seconds and are dropped on every `User` save/delete.
+    """
+
+    cache_timeout = 60
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(
+                _("Token contained no recognizable user identification")
+            )
+        key = get_user_cache_key(user_id)
+        snapshot = cache.get(key)
+        if snapshot is None:
+            user = super().get_user(validated_token)
+            cache.set(
+                key,
+                [getattr(user, name) for name in SNAPSHOT_FIELDS],
+                self.cache_timeout,
+            )
+            return user
+        user = User.from_db(DEFAULT_DB_ALIAS, SNAPSHOT_FIELDS, snapshot)
+        if not user.is_active:
+            raise AuthenticationFailed(
+                _("User is inactive"), code="user_inactive"
+            )
+        return user
@@ -0,0 +1,127 @@
+"""In-process execution of batched API sub-requests.
+
+Sub-requests are passed straight to the resolved view, so middleware
+is skipped for them: they get no metrics, slow query capture,
+profiling or conditional GET of their own, only the batch request
+does. Responses are rendered as for a direct call.
+"""
+import io
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.handlers.exception import response_for_exception
+from django.core.handlers.wsgi import WSGIRequest
+from django.db import connection
+from django.urls import Resolver404, resolve
+
+# Headers of the batch request that must not leak into sub-requests.
+SKIPPED_META = (
+    "CONTENT_LENGTH",
+    "CONTENT_TYPE",
+    "HTTP_IF_MATCH",
+    "HTTP_IF_MODIFIED_SINCE",
+    "HTTP_IF_NONE_MATCH",
+    "HTTP_IF_UNMODIFIED_SINCE",
+)
+
+
+def build_request(request, item):
+    """Build WSGI request for sub-request `item` of batch `request`.
+    The caller's user and token are forced on it, so authentication
+    is not repeated.
+    """
+    path, _, query = item["url"].partition("?")
+    body = item.get("body")
+    content = b"" if body is None else json.dumps(body).encode()
+    environ = {
+        name: value for name, value in request.META.items()
+        if name not in SKIPPED_META
+    }
+    environ.update({
+        "REQUEST_METHOD": item["method"],
+        "PATH_INFO": path,
+        "QUERY_STRING": query,
+        "CONTENT_TYPE": "application/json",
+        "CONTENT_LENGTH": str(len(content)),
+        "wsgi.input": io.BytesIO(content),
+    })
+    for name, value in item.get("headers", {}).items():
+        environ["HTTP_" + name.upper().replace("-", "_")] = value
+    subrequest = WSGIRequest(environ)
+    if request.user.is_authenticated:
+        subrequest._force_auth_user = request.user
+        subrequest._force_auth_token = request.auth
+    return subrequest
+
+
+def get_body(response):
+    """Return decoded content of rendered `response`, parsed if JSON."""
+    content = response.content.decode(response.charset)
+    if response.get("Content-Type", "").startswith("application/json"):
+        return json.loads(content)
+    return content or None
+
+
+def dispatch(subrequest, excluded_views=()):
+    """Run `subrequest` through the URL router & view, return result."""
+    try:
+        match = resolve(subrequest.path_info)
+    except Resolver404 as error:
+        response = response_for_exception(subrequest, error)
+    else:
+        if getattr(match.func, "view_class", None) in excluded_views:
+            return {"status": 400, "headers": {}, "body": {
+                "detail": "Этот адрес нельзя вызывать в пакете."
+            }}
+        subrequest.resolver_match = match
+        try:
+            response = match.func(subrequest, *match.args, **match.kwargs)
+        except Exception as error:
+            response = response_for_exception(subrequest, error)
+    if hasattr(response, "render"):
+        response = response.render()
+    return {
+        "status": response.status_code,
+        "headers": dict(response.items()),
+        "body": get_body(response),
+    }
+
+
+def dispatch_in_thread(subrequest, excluded_views=()):
+    try:
+        return dispatch(subrequest, excluded_views)
+    finally:
+        connection.close()
+
+
+def run_batch(request, items, parallel=False, max_workers=4,
+              excluded_views=()):
+    """Run sub-requests in order and return their results.
+    Sub-requests run one by one use the DB connection of the batch
+    request. With `parallel` consecutive GETs run concurrently in
+    a thread pool, each thread with its own connection closed after
+    the sub-request; writes are run alone and keep their position.
+    """
+    subrequests = [build_request(request, item) for item in items]
+    if not parallel:
+        return [
+            dispatch(subrequest, excluded_views) for subrequest in subrequests
+        ]
+    results = []
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        group = []
+        for subrequest in subrequests + [None]:
+            if subrequest is not None and subrequest.method == "GET":
+                group.append(subrequest)
+                continue
+            if len(group) > 1:
+                results.extend(executor.map(
+                    lambda each: dispatch_in_thread(each, excluded_views),
+                    group,
+                ))
+            elif group:
+                results.append(dispatch(group[0], excluded_views))
+            group = []
+            if subrequest is not None:
+                results.append(dispatch(subrequest, excluded_views))
+    return results
@@ -0,0 +1,170 @@
+"""Bulk writes of API objects with per-item results."""
+from django.db import IntegrityError, connection, transaction
+from rest_framework import permissions, status, views
+from rest_framework.response import Response
+
+
+def bulk_insert(model, objects, batch_size=None, natural_key=None):
+    """`bulk_create` that sets primary keys on every backend.
+
+    SQLite can't return ids from bulk inserts. There rows are re-read
+    by `natural_key` fields if given. Otherwise every batch is inserted
+    by one statement under the write lock, which gives its rows
+    consecutive ids ending with `last_insert_rowid()`.
+    """
+    if connection.features.can_return_rows_from_bulk_insert:
+        return model.objects.bulk_create(objects, batch_size=batch_size)
+    if natural_key:
+        with transaction.atomic():
+            model.objects.bulk_create(objects, batch_size=batch_size)
+            set_pks_by_natural_key(model, objects, natural_key)
+        return objects
+    fields = model._meta.concrete_fields
+    size = max(connection.ops.bulk_batch_size(fields, objects), 1)
+    if batch_size:
+        size = min(size, batch_size)
+    with transaction.atomic(), connection.cursor() as cursor:
+        for start in range(0, len(objects), size):
+            batch = objects[start:start + size]
+            model.objects.bulk_create(batch, batch_size=len(batch))
+            cursor.execute("SELECT last_insert_rowid()")
+            last = cursor.fetchone()[0]
+            for offset, obj in enumerate(reversed(batch)):
+                obj.pk = last - offset
+    for obj in objects:
+        obj._state.adding = False
+    return objects
+
+
+def set_pks_by_natural_key(model, objects, natural_key):
+    def get_key(values):
+        return tuple(values[name] for name in natural_key)
+
+    rows = model.objects.filter(**{
+        f"{name}__in": {getattr(obj, name) for obj in objects}
+        for name in natural_key
+    }).values("pk", *natural_key)
+    pks = {get_key(row): row["pk"] for row in rows}
+    for obj in objects:
+        obj.pk = pks[get_key(obj.__dict__)]
+        obj._state.adding = False
+
+
+class BulkCreateView(views.APIView):
+    """Base view creating objects from a list of items.
+
+    Items are validated by `serializer_class` one by one, then
+    `check_batch` validates the whole batch with set-based queries,
+    and valid items are inserted by one `bulk_create` in a transaction,
+    see `create` for conflicts with concurrent writes.
+    Response lists `{"status", "data"}` or `{"status", "errors"}`
+    for every item in order.
+    """
+
+    permission_classes = (permissions.IsAuthenticated,)
+    serializer_class = None
+    max_items = 1000
+    # Unique fields to read back ids of inserted rows on SQLite.
+    natural_key = None
+
+    def post(self, request):
+        if not isinstance(request.data, list):
+            return Response(
+                {"detail": "Ожидается список объектов."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if len(request.data) > self.max_items:
+            return Response(
+                {"detail": f"Не больше {self.max_items} объектов за запрос."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        results = [None] * len(request.data)
+        valid = {}
+        for index, item in enumerate(request.data):
+            serializer = self.get_serializer(data=item)
+            if serializer.is_valid():
+                valid[index] = serializer.validated_data
+            else:
+                results[index] = self.get_error(serializer.errors)
+        for index, errors in self.check_batch(valid).items():
+            del valid[index]
+            results[index] = self.get_error(errors)
+        created = self.create(valid, results)
+        for index, obj in created.items():
+            results[index] = {
+                "status": status.HTTP_201_CREATED,
+                "data": self.get_serializer(obj).data,
+            }
+        return Response(
+            results,
+            status=(
+                status.HTTP_201_CREATED if len(created) == len(results)
+                else status.HTTP_207_MULTI_STATUS
+            ),
+        )
+
+    def create(self, valid, results):
+        """Insert valid items, return `{index: instance}`.
+        If a concurrent write breaks a constraint, the batch is checked
+        again and the rest is inserted one by one in savepoints, so
+        conflicts are reported per item.
+        """
+        if not valid:
+            return {}
+        try:
+            return self.insert(valid)
+        except IntegrityError:
+            pass
+        for index, errors in self.check_batch(valid).items():
+            del valid[index]
+            results[index] = self.get_error(errors)
+        created = {}
+        with transaction.atomic():
+            for index, data in valid.items():
+                obj = self.build(data)
+                try:
+                    with transaction.atomic():
+                        self.insert_objects([obj])
+                except IntegrityError:
+                    results[index] = self.get_error({"non_field_errors": [
+                        "Конфликт с одновременной записью."
+                    ]})
+                else:
+                    created[index] = obj
+            if created:
+                self.after_create(list(created.values()))
+        return created
+
+    def insert(self, valid):
+        objects = [self.build(data) for data in valid.values()]
+        with transaction.atomic():
+            self.insert_objects(objects)
+            self.after_create(objects)
+        return dict(zip(valid, objects))
+
+    def insert_objects(self, objects):
+        bulk_insert(
+            self.serializer_class.Meta.model, objects,
+            natural_key=self.natural_key,
+        )
+
+    def get_serializer(self, *args, **kwargs):
+        return self.serializer_class(
+            *args, context={"request": self.request, "view": self}, **kwargs
+        )
+
+    def get_error(self, errors):
+        return {"status": status.HTTP_400_BAD_REQUEST, "errors": errors}
+
+    def check_batch(self, valid):
+        """Return {index: errors} of items invalid within the batch."""
+        return {}
+
+    def build(self, data):
+        """Return unsaved model instance from validated `data`."""
+        return self.serializer_class.Meta.model(
+            author=self.request.user, **data
+        )
+
+    def after_create(self, objects):
+        """Hook run in the transaction after `objects` are inserted."""
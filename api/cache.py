@@ -0,0 +1,31 @@
+import time
+
+from django.core.cache import cache
+
+GENERATION_KEY = "generation:{}"
+
+
+def _initial_generation():
+    """Start evicted generations from a new value to skip stale entries."""
+    return int(time.time() * 1000)
+
+
+def get_generations(*labels):
+    """Return current generation numbers of models with given labels."""
+    keys = [GENERATION_KEY.format(label) for label in labels]
+    generations = cache.get_many(keys)
+    for key in keys:
+        if key not in generations:
+            cache.add(key, _initial_generation(), timeout=None)
+            generations[key] = cache.get(key)
+    return tuple(generations[key] for key in keys)
+
+
+def bump_generation(*labels):
+    """Invalidate every cache entry keyed on generations of the models."""
+    for label in labels:
+        key = GENERATION_KEY.format(label)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, _initial_generation(), timeout=None)
@@ -0,0 +1,84 @@
+"""Change feed of the catalog for incremental sync."""
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from api.models import ChangeLog
+from api.serializers import (BulkCommentSerializer, BulkReviewSerializer,
+                             CategorySerializer, FastReadTitleSerializer,
+                             GenreSerializer)
+from reviews.models import Category, Comment, Genre, Review, Title
+
+
+def get_titles(keys, context):
+    rows = FastReadTitleSerializer.get_rows(Title.objects.filter(pk__in=keys))
+    return FastReadTitleSerializer(rows, many=True, context=context).data
+
+
+# Current state of changed objects: model -> (serialize keys, key field).
+CHANGE_DATA = {
+    "title": (get_titles, "id"),
+    "category": (lambda keys, context: CategorySerializer(
+        Category.objects.filter(slug__in=keys), many=True
+    ).data, "slug"),
+    "genre": (lambda keys, context: GenreSerializer(
+        Genre.objects.filter(slug__in=keys), many=True
+    ).data, "slug"),
+    "review": (lambda keys, context: BulkReviewSerializer(
+        Review.objects.filter(pk__in=keys).select_related("author"),
+        many=True,
+        context=context,
+    ).data, "id"),
+    "comment": (lambda keys, context: BulkCommentSerializer(
+        Comment.objects.filter(pk__in=keys).select_related("author"),
+        many=True,
+        context=context,
+    ).data, "id"),
+}
+
+
+def get_changes_page(since, limit, context):
+    """Return `(results, next cursor, has more)` after cursor `since`.
+    Only the latest entry of every object in the page is kept, current
+    data of changed objects is fetched with one query per model.
+
+    Ids are taken at insert but transactions commit in any order, so an
+    entry may appear below the cursor of an earlier read. The page ends
+    before entries younger than `CHANGES_SAFETY_WINDOW` seconds, which
+    must be longer than the longest writing transaction.
+    """
+    entries = list(
+        ChangeLog.objects.filter(pk__gt=since).order_by("pk")[:limit + 1]
+    )
+    cutoff = timezone.now() - timedelta(
+        seconds=getattr(settings, "CHANGES_SAFETY_WINDOW", 5)
+    )
+    settled = 0
+    while settled < len(entries) and entries[settled].changed_at <= cutoff:
+        settled += 1
+    has_more = settled > limit
+    entries = entries[:min(settled, limit)]
+    latest = {(entry.model, entry.key): entry for entry in entries}
+    keys = {}
+    for entry in latest.values():
+        if not entry.deleted:
+            keys.setdefault(entry.model, []).append(entry.key)
+    data = {}
+    for model, model_keys in keys.items():
+        serialize, key_field = CHANGE_DATA[model]
+        for item in serialize(model_keys, context):
+            data[(model, str(item[key_field]))] = item
+    results = [
+        {
+            "cursor": str(entry.pk),
+            "model": entry.model,
+            "key": entry.key,
+            "deleted": entry.deleted,
+            "changed_at": entry.changed_at,
+            "data": data.get((entry.model, entry.key)),
+        }
+        for entry in sorted(latest.values(), key=lambda entry: entry.pk)
+    ]
+    next_cursor = entries[-1].pk if entries else since
+    return results, str(next_cursor), has_more
@@ -1,6 +1,8 @@
+from django.db.models import Count, Exists, OuterRef
 from django_filters import rest_framework as filters
 
-from reviews.models import Category, Genre, Title
+from api.search import search_titles
+from reviews.models import Category, Genre, GenreTitle, Title
 
 
 class CategoriesFilter(filters.FilterSet):
@@ -25,20 +27,50 @@ class GenresFilter(filters.FilterSet):
         fields = ['name']
 
 
+def split_values(value):
+    """Return unique items of comma-separated `value`, keeping order."""
+    return list(dict.fromkeys(
+        slug.strip() for slug in value.split(",") if slug.strip()
+    ))
+
+
 class TitleFilter(filters.FilterSet):
     """Filter for title.
-    `category` & `genre` filters via slug.
+    `category` & `genre` - exact slugs, comma-separated for several.
+    Slugs are resolved to ids by an `IN` subquery over the unique slug
+    index, titles are matched by indexed `category_id` & `EXISTS`/`IN`
+    over the genre table, so no joins and no duplicated rows.
+    `genre_mode` - `any` (default) or `all` of the listed genres.
+    `year__gte` & `year__lte` - year range.
+    `rating`, `rating__gte` & `rating__lte` use indexed title rating.
+    `search` - full-text search by name & description, ordered by relevance.
     """
 
+    GENRE_MODE_ANY = "any"
+    GENRE_MODE_ALL = "all"
+    GENRE_MODES = (
+        (GENRE_MODE_ANY, "любой из жанров"),
+        (GENRE_MODE_ALL, "все жанры"),
+    )
+
     name = filters.CharFilter(
         field_name="name", lookup_expr="contains"
     )
-    category = filters.CharFilter(
-        field_name="category__slug", lookup_expr="contains"
+    category = filters.CharFilter(method="filter_category")
+    genre = filters.CharFilter(method="filter_genre")
+    genre_mode = filters.ChoiceFilter(
+        choices=GENRE_MODES, method="filter_genre_mode"
+    )
+    year__gte = filters.NumberFilter(field_name="year", lookup_expr="gte")
+    year__lte = filters.NumberFilter(field_name="year", lookup_expr="lte")
+    rating = filters.NumberFilter(field_name="rating")
+    rating__gte = filters.NumberFilter(
+        field_name="rating", lookup_expr="gte"
     )
-    genre = filters.CharFilter(
-        field_name="genre__slug", lookup_expr="contains"
+    rating__lte = filters.NumberFilter(
+        field_name="rating", lookup_expr="lte"
     )
+    search = filters.CharFilter(method="filter_search")
 
     class Meta:
         model = Title
@@ -46,5 +78,44 @@ class TitleFilter(filters.FilterSet):
             "name",
             "category",
             "genre",
+            "genre_mode",
             "year",
+            "rating",
+            "search",
+        )
+
+    def filter_category(self, queryset, name, value):
+        slugs = split_values(value)
+        if not slugs:
+            return queryset
+        return queryset.filter(
+            category_id__in=Category.objects.filter(slug__in=slugs).values(
+                "id"
+            )
+        )
+
+    def filter_genre(self, queryset, name, value):
+        slugs = split_values(value)
+        if not slugs:
+            return queryset
+        genres = GenreTitle.objects.filter(
+            genre_id__in=Genre.objects.filter(slug__in=slugs).values("id")
         )
+        if self.form.cleaned_data.get("genre_mode") == self.GENRE_MODE_ALL:
+            matching = (
+                genres.values("title_id")
+                .annotate(matched=Count("genre_id"))
+                .filter(matched=len(slugs))
+                .values("title_id")
+            )
+            return queryset.filter(pk__in=matching)
+        return queryset.filter(
+            Exists(genres.filter(title_id=OuterRef("pk")))
+        )
+
+    def filter_genre_mode(self, queryset, name, value):
+        """Only switches `genre` semantics, see `filter_genre`."""
+        return queryset
+
+    def filter_search(self, queryset, name, value):
+        return search_titles(queryset, value)
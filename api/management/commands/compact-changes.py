@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from api.models import ChangeLog
+
+
+class Command(BaseCommand):
+    """Remove superseded entries of the change log
+
+    example: `python manage.py compact-changes`
+    """
+
+    help = (
+        "Удаляет из журнала изменений записи, после которых тот же объект"
+        " менялся еще раз: клиенты все равно получат последнюю."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=5000)
+
+    def handle(self, *args, **options):
+        deleted = 0
+        superseded = ChangeLog.objects.superseded().values_list(
+            "pk", flat=True
+        )
+        while True:
+            batch = list(superseded[:options["batch_size"]])
+            if not batch:
+                break
+            deleted += ChangeLog.objects.filter(pk__in=batch).delete()[0]
+        self.stdout.write(f"Удалено записей: {deleted}")
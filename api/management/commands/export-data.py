@@ -0,0 +1,51 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from api.export import CHUNK_SIZE, EXPORTS, FORMATS, stream_export
+
+
+class Command(BaseCommand):
+    """Export a table into csv or ndjson file
+
+    example: `python manage.py export-data titles --format csv -o titles.csv`
+    """
+
+    help = (
+        "Выгружает произведения, отзывы или комментарии в CSV или NDJSON"
+        " потоком, без загрузки всей таблицы в память."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("resource", choices=sorted(EXPORTS))
+        parser.add_argument(
+            "--format", choices=sorted(FORMATS), default="csv",
+        )
+        parser.add_argument(
+            "-o", "--output", help="file path, stdout by default",
+        )
+        parser.add_argument(
+            "--gzip", action="store_true", help="compress output",
+        )
+        parser.add_argument(
+            "--chunk-size", type=int, default=CHUNK_SIZE,
+            help="rows read from the database at once",
+        )
+
+    def handle(self, *args, **options):
+        chunks = stream_export(
+            options["resource"],
+            options["format"],
+            compress=options["gzip"],
+            chunk_size=options["chunk_size"],
+        )
+        if options["output"] is None:
+            self.write(sys.stdout.buffer, chunks)
+            return
+        with open(options["output"], "wb") as output:
+            self.write(output, chunks)
+
+    def write(self, output, chunks):
+        for chunk in chunks:
+            output.write(chunk)
+        output.flush()
@@ -0,0 +1,58 @@
+from django.core.management.base import BaseCommand
+
+from api.management.generator import DataGenerator
+from reviews.models import Comment, Review, Title, User
+
+
+class Command(BaseCommand):
+    """Fill database with synthetic data of the given volume
+
+    example: `python manage.py generate-data --users 1000000
+    --titles 500000 --reviews 50000000 --comments 100000000`
+    """
+
+    help = (
+        "Генерирует пользователей, произведения, отзывы и комментарии"
+        " с реалистичным перекосом популярности. Одинаковый --seed"
+        " даёт одинаковые данные."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=1000)
+        parser.add_argument("--titles", type=int, default=500)
+        parser.add_argument("--reviews", type=int, default=5000)
+        parser.add_argument("--comments", type=int, default=10000)
+        parser.add_argument("--seed", type=int, default=1)
+        parser.add_argument(
+            "--skew", type=float, default=1.1,
+            help="Zipf exponent of title popularity and user activity",
+        )
+        parser.add_argument(
+            "--batch-size", type=int, default=5000,
+            help="rows inserted at once",
+        )
+        parser.add_argument(
+            "--no-copy", action="store_true",
+            help="use bulk_create instead of PostgreSQL COPY",
+        )
+        parser.add_argument("--locale", default="ru_RU")
+
+    def handle(self, *args, **options):
+        """Generate data and report the number of created rows"""
+        generator = DataGenerator(
+            seed=options["seed"],
+            skew=options["skew"],
+            batch_size=options["batch_size"],
+            use_copy=not options["no_copy"],
+            locale=options["locale"],
+            log=self.stdout.write,
+        )
+        counts = generator.generate(
+            options["users"], options["titles"],
+            options["reviews"], options["comments"],
+        )
+        return (
+            f"Создано пользователей: {counts[User]},"
+            f" произведений: {counts[Title]}, отзывов: {counts[Review]},"
+            f" комментариев: {counts[Comment]}."
+        )
@@ -1,87 +1,123 @@
-import csv
-import glob
 import os
+from concurrent.futures import ThreadPoolExecutor
 
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
 
-from reviews.models import (Category, Comment, Genre, GenreTitle, Review,
-                            Title, User)
-
-MODELS_CONTAINER = [
-    User,
-    Category,
-    Genre,
-    Title,
-    GenreTitle,
-    Review,
-    Comment,
-]
+from api.management.loader import (LEVELS, TableLoader, UpsertLoader,
+                                   finish_load)
 
 
 class Command(BaseCommand):
     """Import a csv files into database
 
-    example: `python manage.py load-csv static/data`
+    example: `python manage.py load-csv static/data --workers 3`
+    nightly sync: `python manage.py load-csv feed/ --mode upsert --dry-run`
     """
 
     help = (
         "Когда вы вызываете функцию, вы должны передать путь к папке"
         " с CSV-файлами. Пример: `python manage.py load-csv static/data"
     )
+    max_reported_errors = 50
 
     def add_arguments(self, parser):
         """Loading a particular folder with csv files"""
         parser.add_argument("csv_folder", help="path to csv file", type=str)
+        parser.add_argument(
+            "--batch-size", type=int, default=5000,
+            help="rows read and inserted at once",
+        )
+        parser.add_argument(
+            "--workers", type=int, default=1,
+            help="independent tables loaded in parallel",
+        )
+        parser.add_argument(
+            "--no-copy", action="store_true",
+            help="use bulk_create instead of PostgreSQL COPY",
+        )
+        parser.add_argument(
+            "--mode", choices=("insert", "upsert"), default="insert",
+            help="upsert inserts, updates and deletes only changed rows",
+        )
+        parser.add_argument(
+            "--dry-run", action="store_true",
+            help="upsert mode: only report what would change",
+        )
+        parser.add_argument(
+            "--prune", action="store_true",
+            help="upsert mode: delete rows missing from csv files",
+        )
 
-    def fields_checker(self, fields_name, model_fields):
-        """Comparing model database fields with csv file fields"""
-        for i, _ in enumerate(fields_name):
-            fields_name[i] = fields_name[i].lower().replace(" ", "_")
-            if not fields_name[i] in model_fields:
-                return False
-        return True
-
-    def file_to_model(self, all_files, all_models):
-        """Create a dictionary with a matching pair of model: csv_file"""
-        model_file_dict = {}
-        csv_file_list = []
-        for csv_file in all_files:
-            if not os.path.isfile(csv_file):
-                return ("Когда вы вызываете функцию, вы должны"
-                        "передать путь к файлам csv")
-            mod_name = csv_file.replace("_", "")
-            mod_name = mod_name.split(os.path.sep).pop().split(".")[0]
-            csv_file_list.append((csv_file, mod_name))
-        for model in all_models:
-            for file_name, compare_name in csv_file_list:
-                if str(model.__name__).lower() == compare_name:
-                    model_file_dict[model] = file_name
-        return model_file_dict
+    def load_table(self, table, path):
+        """Load one table in its own thread and connection"""
+        try:
+            return self.loader.load(table, path)
+        finally:
+            if self.workers > 1:
+                connection.close()
 
     def handle(self, *args, **options):
-        """Read csv file and load data into the db"""
-
-        csv_folder = options.get("csv_folder", "")
-        all_files = glob.glob(csv_folder + "/*.csv")
+        """Read csv files level by level and load data into the db"""
+        csv_folder = options["csv_folder"]
+        if not os.path.isdir(csv_folder):
+            return ("Когда вы вызываете функцию, вы должны"
+                    " передать путь к папке с файлами csv")
+        self.workers = max(options["workers"], 1)
+        self.loader = self.get_loader(options)
+        reports = []
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            for level in LEVELS:
+                tables = [
+                    (table, os.path.join(csv_folder, table.file_name))
+                    for table in level
+                ]
+                tables = [
+                    (table, path) for table, path in tables
+                    if os.path.isfile(path)
+                ]
+                if self.workers > 1:
+                    level_reports = list(executor.map(
+                        lambda args: self.load_table(*args), tables
+                    ))
+                else:
+                    level_reports = [
+                        self.load_table(*args) for args in tables
+                    ]
+                for report in level_reports:
+                    self.stdout.write(str(report))
+                reports += level_reports
+        if not options["dry_run"]:
+            finish_load([report.table.model for report in reports])
+        errors = [error for report in reports for error in report.errors]
+        if errors:
+            self.write_errors(errors)
+            return f"Данные загружены, строк с ошибками: {len(errors)}."
+        return "Данные были успешно загружены в базу данных."
 
-        for (key, value) in self.file_to_model(
-            all_files,
-            MODELS_CONTAINER,
-        ).items():
+    def get_loader(self, options):
+        if options["mode"] == "insert":
+            if options["dry_run"] or options["prune"]:
+                raise CommandError(
+                    "--dry-run и --prune работают только с --mode upsert"
+                )
+            return TableLoader(
+                batch_size=options["batch_size"],
+                use_copy=not options["no_copy"],
+            )
+        return UpsertLoader(
+            batch_size=options["batch_size"],
+            use_copy=not options["no_copy"],
+            dry_run=options["dry_run"],
+            prune=options["prune"],
+        )
 
-            fields_name = []
-            with open(value, "r", encoding="utf-8") as f:
-                reader = csv.reader(f, delimiter=",", quotechar='"')
-                fields_name = next(reader)
-                entity_list = []
-                for raw in reader:
-                    dict_data = {
-                        fields_name[key]: field for key, field in (
-                            enumerate(raw))}
-                    entity_list.append(key(**dict_data))
-                try:
-                    key.objects.bulk_create(entity_list)
-                    print(f"finish {key}")
-                except Exception as e:
-                    return f"Кажется, у вас уже есть эти данные! {e}"
-        return "Данные были успешно загружены в базу данных."
+    def write_errors(self, errors):
+        for error in errors[:self.max_reported_errors]:
+            self.stderr.write(
+                f"{error.file_name}:{error.line}: {error.message}"
+            )
+        if len(errors) > self.max_reported_errors:
+            self.stderr.write(
+                f"... и ещё {len(errors) - self.max_reported_errors} ошибок"
+            )
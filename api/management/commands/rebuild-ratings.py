@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from reviews.models import Title
+
+
+class Command(BaseCommand):
+    """Rebuild or verify persisted title rating aggregates
+
+    example: `python manage.py rebuild-ratings --check`
+    """
+
+    help = (
+        "Пересчитывает сумму, количество оценок и рейтинг произведений."
+        " С флагом --check только проверяет их согласованность с отзывами."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="only report titles with inconsistent aggregates",
+        )
+
+    def handle(self, *args, **options):
+        """Rebuild aggregates of all titles or report broken ones"""
+        if options["check"]:
+            broken = Title.objects.inconsistent_rating().values_list(
+                "id", "rating_sum", "rating_count",
+                "actual_sum", "actual_count",
+            )
+            for title_id, stored_sum, stored_count, real_sum, real_count in (
+                broken
+            ):
+                self.stdout.write(
+                    f"title {title_id}: stored {stored_sum}/{stored_count},"
+                    f" actual {real_sum}/{real_count}"
+                )
+            if broken:
+                raise CommandError(
+                    f"Рейтинг не согласован у {len(broken)} произведений."
+                )
+            self.stdout.write("Рейтинги всех произведений согласованы.")
+            return
+        updated = Title.objects.rebuild_rating()
+        self.stdout.write(f"Пересчитан рейтинг {updated} произведений.")
@@ -0,0 +1,142 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.core.mail import EmailMessage, get_connection
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from api.models import OutboxMessage, OutboxStatus
+
+
+class Command(BaseCommand):
+    """Deliver emails queued in the outbox
+
+    example: `python manage.py send-outbox --workers 4`
+    Several workers need SKIP LOCKED (PostgreSQL), elsewhere one is used.
+    """
+
+    help = (
+        "Отправляет письма из очереди: пачками, через одно SMTP-соединение"
+        " на поток, с повторными попытками и экспоненциальной задержкой."
+    )
+    # Claimed messages are hidden from other workers for this time.
+    lease = timedelta(minutes=5)
+    backoff = timedelta(seconds=30)
+    max_backoff = timedelta(hours=6)
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=4)
+        parser.add_argument("--batch-size", type=int, default=50)
+        parser.add_argument("--max-attempts", type=int, default=8)
+        parser.add_argument(
+            "--interval", type=float, default=5,
+            help="seconds to sleep when the queue is empty",
+        )
+        parser.add_argument(
+            "--once", action="store_true",
+            help="send due messages and exit",
+        )
+        parser.add_argument(
+            "--stats", action="store_true",
+            help="print queue depth and exit",
+        )
+
+    def handle(self, *args, **options):
+        if options["stats"]:
+            self.write_stats()
+            return
+        self.batch_size = options["batch_size"]
+        self.max_attempts = options["max_attempts"]
+        workers = max(options["workers"], 1)
+        if not connection.features.has_select_for_update_skip_locked:
+            # Without SKIP LOCKED workers would claim the same batch.
+            workers = 1
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            while True:
+                sent = sum(executor.map(
+                    lambda _: self.work(), range(workers)
+                ))
+                if sent:
+                    self.stdout.write(f"Отправлено писем: {sent}")
+                if options["once"]:
+                    return
+                if not sent:
+                    time.sleep(options["interval"])
+
+    def write_stats(self):
+        messages = OutboxMessage.objects
+        failed = messages.filter(status=OutboxStatus.FAILED)
+        self.stdout.write(
+            f"pending: {messages.pending().count()},"
+            f" due: {messages.due().count()}, failed: {failed.count()}"
+        )
+
+    def work(self):
+        """Send batches until no due messages left, return sent count"""
+        sent = 0
+        mail_connection = get_connection()
+        try:
+            batch = self.claim()
+            while batch:
+                sent += self.send(mail_connection, batch)
+                batch = self.claim()
+        finally:
+            mail_connection.close()
+            connection.close()
+        return sent
+
+    def claim(self):
+        """Lock a batch of due messages and postpone them by `lease`"""
+        with transaction.atomic():
+            batch = list(
+                OutboxMessage.objects.due().select_for_update(
+                    skip_locked=True
+                )[:self.batch_size]
+            )
+            OutboxMessage.objects.filter(
+                pk__in=[message.pk for message in batch]
+            ).update(
+                next_attempt_at=timezone.now() + self.lease,
+                attempts=F("attempts") + 1,
+            )
+        for message in batch:
+            message.attempts += 1
+        return batch
+
+    def send(self, mail_connection, batch):
+        """Send batch over an open connection, reused between batches"""
+        try:
+            mail_connection.open()
+        except Exception as error:
+            for message in batch:
+                self.retry(message, error)
+            return 0
+        sent = []
+        for message in batch:
+            email = EmailMessage(
+                message.subject, message.body, to=[message.recipient],
+                connection=mail_connection,
+            )
+            try:
+                email.send()
+            except Exception as error:
+                self.retry(message, error)
+            else:
+                sent.append(message.pk)
+        OutboxMessage.objects.filter(pk__in=sent).update(
+            status=OutboxStatus.SENT, sent_at=timezone.now(), last_error=""
+        )
+        return len(sent)
+
+    def retry(self, message, error):
+        """Schedule next attempt with exponential backoff"""
+        message.last_error = str(error)
+        if message.attempts >= self.max_attempts:
+            message.status = OutboxStatus.FAILED
+        message.next_attempt_at = timezone.now() + min(
+            self.backoff * 2 ** (message.attempts - 1), self.max_backoff
+        )
+        message.save(update_fields=("last_error", "status", "next_attempt_at"))
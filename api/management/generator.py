@@ -0,0 +1,267 @@
+"""Synthetic catalog of production size for benchmarks & query plans.
+
+Popularity of titles, activity of users and genres follow a Zipf-like
+law with exponent `skew`: few titles get most reviews, few users write
+most of them. Every title is reviewed by distinct users. Rows get
+explicit ids and are inserted in batches by `insert_instances`, so
+PostgreSQL uses COPY, change log entries included. The same `seed`
+gives the same data.
+"""
+import random
+import time
+from bisect import bisect
+from collections import Counter
+from datetime import datetime, timedelta
+from itertools import accumulate
+
+from django.contrib.auth.hashers import UNUSABLE_PASSWORD_PREFIX
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+from faker import Faker
+
+from api.management.loader import (finish_load, insert_instances,
+                                   preserved_timestamps)
+from api.models import ChangeLog, get_changes
+from reviews.models import (Category, Comment, Genre, GenreTitle, Review,
+                            Title, User)
+
+# Models in the order of insertion, parents before children.
+MODELS = (User, Category, Genre, Title, GenreTitle, Review, Comment)
+CATEGORIES = (("Фильмы", "movie"), ("Книги", "book"), ("Музыка", "music"))
+GENRES = (
+    ("Драма", "drama"), ("Комедия", "comedy"), ("Триллер", "thriller"),
+    ("Ужасы", "horror"), ("Фэнтези", "fantasy"), ("Фантастика", "sci-fi"),
+    ("Детектив", "detective"), ("Мелодрама", "melodrama"),
+    ("Приключения", "adventure"), ("Документальный", "documentary"),
+    ("Биография", "biography"), ("Поэзия", "poetry"), ("Рок", "rock"),
+    ("Джаз", "jazz"), ("Классика", "classic"),
+)
+# Faker is slow for millions of rows, texts are sampled from pools.
+POOL_SIZE = 2000
+HISTORY = timedelta(days=5 * 365)
+SCORES = range(1, 11)
+SCORE_WEIGHTS = (2, 1, 2, 3, 5, 8, 12, 15, 12, 8)
+# Pareto shape of comments per review, heavy tail with finite mean.
+COMMENTS_SHAPE = 2.0
+
+
+def zipf_cum_weights(count, skew):
+    return list(accumulate(1 / (rank + 1) ** skew for rank in range(count)))
+
+
+def allocate(total, cum_weights, cap):
+    """Split `total` by weights into counts not greater than `cap`."""
+    scale = total / cum_weights[-1] if cum_weights else 0
+    previous = 0
+    counts = []
+    for weight in cum_weights:
+        counts.append(min(cap, int((weight - previous) * scale)))
+        previous = weight
+    left = total - sum(counts)
+    while left > 0:
+        open_ranks = [rank for rank, count in enumerate(counts) if count < cap]
+        if not open_ranks:
+            break
+        share = max(1, left // len(open_ranks))
+        for rank in open_ranks:
+            added = min(share, cap - counts[rank], left)
+            counts[rank] += added
+            left -= added
+            if not left:
+                break
+    return counts
+
+
+class DataGenerator:
+    """Generate users, titles, reviews & comments, see module docstring."""
+
+    def __init__(self, seed=1, skew=1.1, batch_size=5000, use_copy=None,
+                 locale="ru_RU", log=None):
+        self.random = random.Random(seed)
+        self.skew = skew
+        self.batch_size = batch_size
+        if use_copy is None:
+            use_copy = connection.vendor == "postgresql"
+        self.use_copy = use_copy and connection.vendor == "postgresql"
+        self.log = log or (lambda message: None)
+        faker = Faker(locale)
+        faker.seed_instance(seed)
+        self.words = [faker.user_name() for _ in range(POOL_SIZE)]
+        self.domains = [faker.free_email_domain() for _ in range(20)]
+        self.first_names = [faker.first_name() for _ in range(POOL_SIZE)]
+        self.last_names = [faker.last_name() for _ in range(POOL_SIZE)]
+        self.names = [
+            faker.sentence(nb_words=3).rstrip(".") for _ in range(POOL_SIZE)
+        ]
+        self.texts = [faker.paragraph() for _ in range(POOL_SIZE)]
+        self.now = timezone.now()
+        self.buffers = {model: [] for model in MODELS}
+        self.counts = Counter()
+
+    def next_id(self, model):
+        return (model.objects.aggregate(last=Max("pk"))["last"] or 0) + 1
+
+    def add(self, obj):
+        buffer = self.buffers[type(obj)]
+        buffer.append(obj)
+        if len(buffer) >= self.batch_size:
+            self.flush(type(obj))
+
+    def flush(self, model):
+        """Insert buffered rows of `model` and of its parents first."""
+        for parent in MODELS[:MODELS.index(model) + 1]:
+            objs = self.buffers[parent]
+            if not objs:
+                continue
+            with transaction.atomic(), preserved_timestamps(
+                parent, ("pub_date",)
+            ):
+                insert_instances(parent, objs, self.use_copy)
+                insert_instances(ChangeLog, ChangeLog.objects.build(
+                    change for obj in objs for change in get_changes(obj)
+                ), self.use_copy)
+            self.counts[parent] += len(objs)
+            self.buffers[parent] = []
+
+    def pick(self, cum_weights):
+        """Return rank drawn with Zipf-like weights."""
+        return bisect(cum_weights, self.random.random() * cum_weights[-1])
+
+    def get_date(self):
+        return self.now - HISTORY * self.random.random()
+
+    def generate(self, users, titles, reviews, comments):
+        """Generate data and restore ratings, caches & sequences."""
+        started = time.monotonic()
+        user_ids = self.generate_users(users)
+        categories, genres = self.get_classifiers()
+        title_ids = self.generate_titles(titles, categories, genres)
+        self.log(
+            f"Пользователи и произведения: {time.monotonic() - started:.1f} с"
+        )
+        review_ids = self.generate_reviews(reviews, title_ids, user_ids)
+        self.generate_comments(comments, review_ids, user_ids)
+        self.flush(MODELS[-1])
+        self.log(f"Отзывы и комментарии: {time.monotonic() - started:.1f} с")
+        finish_load([model for model in MODELS if self.counts[model]])
+        return self.counts
+
+    def generate_users(self, count):
+        first = self.next_id(User)
+        for pk in range(first, first + count):
+            username = f"{self.random.choice(self.words)}_{pk}"
+            self.add(User(
+                pk=pk,
+                username=username,
+                email=f"{username}@{self.random.choice(self.domains)}",
+                first_name=self.random.choice(self.first_names),
+                last_name=self.random.choice(self.last_names),
+                password=UNUSABLE_PASSWORD_PREFIX,
+                date_joined=self.get_date(),
+            ))
+        self.flush(User)
+        user_ids = list(
+            User.objects.order_by("pk").values_list("pk", flat=True)
+        )
+        self.random.shuffle(user_ids)
+        return user_ids
+
+    def get_classifiers(self):
+        """Return existing categories & genres, create them if none."""
+        for model, defaults in ((Category, CATEGORIES), (Genre, GENRES)):
+            if not model.objects.exists():
+                first = self.next_id(model)
+                for offset, (name, slug) in enumerate(defaults):
+                    self.add(model(pk=first + offset, name=name, slug=slug))
+        self.flush(Genre)
+        return tuple(
+            list(model.objects.order_by("pk").values_list("pk", flat=True))
+            for model in (Category, Genre)
+        )
+
+    def generate_titles(self, count, categories, genres):
+        category_weights = zipf_cum_weights(len(categories), self.skew)
+        genre_weights = zipf_cum_weights(len(genres), self.skew)
+        first = self.next_id(Title)
+        link_id = self.next_id(GenreTitle)
+        for pk in range(first, first + count):
+            self.add(Title(
+                pk=pk,
+                name=self.random.choice(self.names),
+                year=self.random.randint(1900, datetime.now().year),
+                description=self.random.choice(self.texts)[:400],
+                category_id=categories[self.pick(category_weights)],
+            ))
+            linked = {
+                genres[self.pick(genre_weights)]
+                for _ in range(self.random.randint(1, 3))
+            }
+            for genre_id in sorted(linked):
+                self.add(
+                    GenreTitle(pk=link_id, title_id=pk, genre_id=genre_id)
+                )
+                link_id += 1
+        title_ids = list(range(first, first + count))
+        self.random.shuffle(title_ids)
+        return title_ids
+
+    def get_authors(self, count, user_ids, user_weights):
+        """Return `count` distinct users, prolific ones more likely."""
+        if count > len(user_ids) // 4:
+            return sorted(self.random.sample(user_ids, count))
+        authors = set()
+        while len(authors) < count:
+            authors.add(user_ids[self.pick(user_weights)])
+        return sorted(authors)
+
+    def generate_reviews(self, total, title_ids, user_ids):
+        """Reviews of titles ranked by popularity, return review ids."""
+        if not title_ids or not user_ids:
+            return range(0)
+        user_weights = zipf_cum_weights(len(user_ids), self.skew)
+        counts = allocate(
+            total, zipf_cum_weights(len(title_ids), self.skew), len(user_ids)
+        )
+        first = pk = self.next_id(Review)
+        for title_id, count in zip(title_ids, counts):
+            for author_id in self.get_authors(count, user_ids, user_weights):
+                self.add(Review(
+                    pk=pk,
+                    title_id=title_id,
+                    author_id=author_id,
+                    text=self.random.choice(self.texts),
+                    score=self.random.choices(SCORES, SCORE_WEIGHTS)[0],
+                    pub_date=self.get_date(),
+                ))
+                pk += 1
+        return range(first, pk)
+
+    def generate_comments(self, total, review_ids, user_ids):
+        """Comments with heavy-tailed number per review."""
+        if not review_ids:
+            return
+        user_weights = zipf_cum_weights(len(user_ids), self.skew)
+        mean = total / len(review_ids)
+        pk = self.next_id(Comment)
+        left = total
+        reviews = iter(review_ids)
+        while left:
+            review_id = next(reviews, None)
+            if review_id is None:
+                count, review_id = 1, self.random.choice(review_ids)
+            else:
+                count = int(
+                    (self.random.paretovariate(COMMENTS_SHAPE) - 1)
+                    * (COMMENTS_SHAPE - 1) * mean + self.random.random()
+                )
+            for _ in range(min(count, left)):
+                self.add(Comment(
+                    pk=pk,
+                    review_id=review_id,
+                    author_id=user_ids[self.pick(user_weights)],
+                    text=self.random.choice(self.texts),
+                    pub_date=self.get_date(),
+                ))
+                pk += 1
+                left -= 1
@@ -0,0 +1,430 @@
+"""Streaming bulk loader of CSV files used by management commands."""
+import csv
+import io
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+from datetime import datetime
+from hashlib import md5
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.core.management.color import no_style
+from django.db import DatabaseError, connection, transaction
+from django.utils import timezone
+
+from api.cache import bump_generation
+from api.models import ChangeLog
+from reviews.models import (Category, Comment, Genre, GenreTitle, Review,
+                            Title, User)
+
+Table = namedtuple("Table", ("file_name", "model", "natural_key"))
+
+USERS = Table("user.csv", User, ("username",))
+CATEGORIES = Table("category.csv", Category, ("slug",))
+GENRES = Table("genre.csv", Genre, ("slug",))
+TITLES = Table("title.csv", Title, ("id",))
+GENRE_TITLES = Table("genre_title.csv", GenreTitle, ("title_id", "genre_id"))
+REVIEWS = Table("review.csv", Review, ("id",))
+COMMENTS = Table("comment.csv", Comment, ("id",))
+
+# Tables of one level depend only on tables of previous levels
+# and may be loaded in parallel.
+LEVELS = (
+    (USERS, CATEGORIES, GENRES),
+    (TITLES,),
+    (GENRE_TITLES, REVIEWS),
+    (COMMENTS,),
+)
+
+RowError = namedtuple("RowError", ("file_name", "line", "message"))
+
+# Optional column of delta feeds marking rows to delete in upsert mode.
+DELETED_COLUMN = "_deleted"
+
+
+class LoadReport:
+    """Counters of a single table load."""
+
+    def __init__(self, table):
+        self.table = table
+        self.rows = 0
+        self.loaded = 0
+        self.updated = 0
+        self.unchanged = 0
+        self.deleted = 0
+        self.errors = []
+        self.started = time.monotonic()
+        self.seconds = 0
+
+    def error(self, line, message):
+        self.errors.append(RowError(self.table.file_name, line, message))
+
+    def finish(self):
+        self.seconds = time.monotonic() - self.started
+        return self
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.seconds if self.seconds else 0
+
+    def __str__(self):
+        return (
+            f"{self.table.file_name}: {self.rows} rows,"
+            f" {self.loaded} inserted,"
+            f" {self.updated} updated, {self.unchanged} unchanged,"
+            f" {self.deleted} deleted, {len(self.errors)} errors,"
+            f" {self.seconds:.1f}s, {self.rows_per_second:.0f} rows/s"
+        )
+
+
+def read_chunks(path, size):
+    """Yield lists of `(line, row)` pairs read from csv file in chunks."""
+    with open(path, "r", encoding="utf-8", newline="") as csv_file:
+        reader = csv.reader(csv_file, delimiter=",", quotechar='"')
+        header = [name.lower().replace(" ", "_") for name in next(reader)]
+        chunk = []
+        for raw in reader:
+            chunk.append((reader.line_num, dict(zip(header, raw))))
+            if len(chunk) >= size:
+                yield header, chunk
+                chunk = []
+        if chunk:
+            yield header, chunk
+
+
+def get_columns(model, header):
+    """Map csv columns to model fields, raise ValueError on unknown ones."""
+    columns = {}
+    for name in header:
+        if name == DELETED_COLUMN:
+            continue
+        try:
+            field = model._meta.get_field(name)
+        except FieldDoesNotExist:
+            raise ValueError(f"unknown column {name}")
+        if field.attname != name and field.is_relation:
+            name = field.attname
+        columns[name] = field
+    return columns
+
+
+def build_instance(model, columns, row):
+    """Create unsaved instance converting csv strings by field types."""
+    values = {}
+    for name, field in columns.items():
+        value = row.get(name, row.get(field.name, ""))
+        if value == "" and field.null:
+            values[name] = None
+            continue
+        target = field.target_field if field.is_relation else field
+        values[name] = target.to_python(value)
+    return model(**values)
+
+
+@contextmanager
+def preserved_timestamps(model, columns):
+    """Keep `auto_now`/`auto_now_add` values provided by csv columns."""
+    fields = [
+        field for field in model._meta.concrete_fields
+        if field.attname in columns
+        and (getattr(field, "auto_now", False)
+             or getattr(field, "auto_now_add", False))
+    ]
+    flags = [(field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, (auto_now, auto_now_add) in zip(fields, flags):
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def copy_value(value):
+    """Render value for `COPY ... (FORMAT csv)`, empty unquoted is NULL."""
+    if value is None:
+        return ""
+    if isinstance(value, (bool, int, float)):
+        return str(value)
+    return '"{}"'.format(str(value).replace('"', '""'))
+
+
+def copy_instances(model, objs):
+    """Insert instances with PostgreSQL `COPY FROM STDIN`."""
+    fields = [
+        field for field in model._meta.local_concrete_fields
+        if not field.primary_key or all(obj.pk is not None for obj in objs)
+    ]
+    buffer = io.StringIO()
+    for obj in objs:
+        buffer.write(",".join(
+            copy_value(
+                field.get_db_prep_save(field.pre_save(obj, True), connection)
+            )
+            for field in fields
+        ))
+        buffer.write("\n")
+    buffer.seek(0)
+    columns = ", ".join(
+        connection.ops.quote_name(field.column) for field in fields
+    )
+    # The raw cursor skips Django's wrapper, so psycopg2 errors are
+    # converted to `DatabaseError` here for the row by row fallback.
+    with connection.cursor() as cursor, connection.wrap_database_errors:
+        cursor.cursor.copy_expert(
+            "COPY {} ({}) FROM STDIN WITH (FORMAT csv)".format(
+                connection.ops.quote_name(model._meta.db_table), columns
+            ),
+            buffer,
+        )
+
+
+def insert_instances(model, objs, use_copy):
+    if use_copy:
+        copy_instances(model, objs)
+    else:
+        # Default batch size is all rows, except backends limiting
+        # the number of query parameters, e.g. SQLite.
+        model.objects.bulk_create(objs)
+
+
+class TableLoader:
+    """Load csv file into a table in batches of `batch_size` rows.
+
+    A failed batch is retried row by row, so a broken row is reported
+    with its line number instead of aborting the whole load.
+    """
+
+    def __init__(self, batch_size=5000, use_copy=None):
+        self.batch_size = batch_size
+        if use_copy is None:
+            use_copy = connection.vendor == "postgresql"
+        self.use_copy = use_copy and connection.vendor == "postgresql"
+
+    def load(self, table, path):
+        report = LoadReport(table)
+        columns = None
+        for header, chunk in read_chunks(path, self.batch_size):
+            if columns is None:
+                try:
+                    columns = get_columns(table.model, header)
+                except ValueError as error:
+                    report.error(1, str(error))
+                    return report.finish()
+            report.rows += len(chunk)
+            with preserved_timestamps(table.model, columns):
+                self.load_chunk(table, columns, chunk, report)
+        return report.finish()
+
+    def load_chunk(self, table, columns, chunk, report):
+        batch = [
+            (line, obj)
+            for line, obj, _ in self.build_batch(table, columns, chunk, report)
+        ]
+        if batch:
+            self.insert_batch(table, batch, report)
+
+    def build_batch(self, table, columns, chunk, report):
+        """Return `(line, instance, row)` for rows converted without errors."""
+        batch = []
+        for line, row in chunk:
+            try:
+                obj = build_instance(table.model, columns, row)
+            except (ValidationError, ValueError, TypeError) as error:
+                report.error(line, "; ".join(getattr(
+                    error, "messages", [str(error)]
+                )))
+                continue
+            batch.append((line, obj, row))
+        return batch
+
+    def insert_batch(self, table, batch, report):
+        try:
+            with transaction.atomic():
+                insert_instances(
+                    table.model, [obj for _, obj in batch], self.use_copy
+                )
+                ChangeLog.objects.record(obj for _, obj in batch)
+            report.loaded += len(batch)
+        except (DatabaseError, ValueError, TypeError):
+            self.load_rows(table, batch, report)
+
+    def load_rows(self, table, batch, report):
+        for line, obj in batch:
+            try:
+                with transaction.atomic():
+                    table.model.objects.bulk_create([obj])
+                    ChangeLog.objects.record([obj])
+                report.loaded += 1
+            except (DatabaseError, ValueError, TypeError) as error:
+                report.error(line, str(error).strip())
+
+
+def normalize(value):
+    """Make values read from csv and from database comparable."""
+    if isinstance(value, datetime) and timezone.is_aware(value):
+        return value.astimezone(timezone.utc)
+    return value
+
+
+def digest(values):
+    return md5(repr(tuple(map(normalize, values))).encode()).hexdigest()
+
+
+class UpsertLoader(TableLoader):
+    """Apply csv file as a delta to existing rows.
+
+    Rows are matched by the natural key of the table and compared by
+    hashes of csv columns: only new rows are inserted and only changed
+    ones are updated. Rows with truthy `_deleted` column are deleted;
+    with `prune` every row missing from the file is deleted too.
+    With `dry_run` nothing is written, only counters are collected.
+    """
+
+    deleted_values = ("1", "true", "yes")
+
+    def __init__(self, batch_size=5000, use_copy=None, dry_run=False,
+                 prune=False):
+        super().__init__(batch_size, use_copy)
+        self.dry_run = dry_run
+        self.prune = prune
+
+    def load(self, table, path):
+        self.seen = set()
+        report = super().load(table, path)
+        if self.prune and not report.errors:
+            self.prune_missing(table, report)
+        return report.finish()
+
+    def get_compared_fields(self, table, columns):
+        return [
+            field for name, field in columns.items()
+            if not field.primary_key
+        ]
+
+    def get_key(self, table, obj):
+        return tuple(getattr(obj, name) for name in table.natural_key)
+
+    def load_chunk(self, table, columns, chunk, report):
+        compared = self.get_compared_fields(table, columns)
+        rows = {}
+        for line, obj, row in self.build_batch(table, columns, chunk, report):
+            rows[self.get_key(table, obj)] = (line, obj, row)
+        self.seen.update(rows)
+        inserts, updates, deletes = self.classify(
+            rows, self.fetch_existing(table, compared, rows), compared, report
+        )
+        if self.dry_run:
+            report.loaded += len(inserts)
+            report.updated += len(updates)
+            report.deleted += len(deletes)
+            return
+        if inserts:
+            self.insert_batch(table, inserts, report)
+        if updates:
+            self.update_batch(table, compared, updates, report)
+        if deletes:
+            table.model.objects.filter(pk__in=deletes).delete()
+            report.deleted += len(deletes)
+
+    def classify(self, rows, existing, compared, report):
+        """Split rows into inserts, updates and pks to delete."""
+        inserts, updates, deletes = [], [], []
+        for key, (line, obj, row) in rows.items():
+            deleted = row.get(DELETED_COLUMN, "").lower() in (
+                self.deleted_values
+            )
+            if key not in existing:
+                if not deleted:
+                    inserts.append((line, obj))
+            elif deleted:
+                deletes.append(existing[key][0])
+            elif existing[key][1] == digest(
+                getattr(obj, field.attname) for field in compared
+            ):
+                report.unchanged += 1
+            else:
+                obj.pk = existing[key][0]
+                updates.append((line, obj))
+        return inserts, updates, deletes
+
+    def fetch_existing(self, table, compared, rows):
+        """Return `{key: (pk, digest)}` of stored rows with given keys."""
+        filters = {
+            f"{name}__in": {key[index] for key in rows}
+            for index, name in enumerate(table.natural_key)
+        }
+        size = len(table.natural_key)
+        stored = table.model.objects.filter(**filters).values_list(
+            "pk", *table.natural_key, *(field.attname for field in compared)
+        )
+        existing = {}
+        for values in stored:
+            key = tuple(values[1:size + 1])
+            if key in rows:
+                existing[key] = (values[0], digest(values[size + 1:]))
+        return existing
+
+    def update_batch(self, table, compared, batch, report):
+        fields = [field.name for field in compared]
+        now = timezone.now()
+        for field in table.model._meta.concrete_fields:
+            if getattr(field, "auto_now", False) and field.name not in fields:
+                fields.append(field.name)
+                for _, obj in batch:
+                    setattr(obj, field.attname, now)
+        try:
+            with transaction.atomic():
+                table.model.objects.bulk_update(
+                    [obj for _, obj in batch], fields,
+                    batch_size=self.batch_size,
+                )
+                ChangeLog.objects.record(obj for _, obj in batch)
+            report.updated += len(batch)
+            return
+        except (DatabaseError, ValueError, TypeError):
+            pass
+        for line, obj in batch:
+            try:
+                with transaction.atomic():
+                    table.model.objects.bulk_update([obj], fields)
+                    ChangeLog.objects.record([obj])
+                report.updated += 1
+            except (DatabaseError, ValueError, TypeError) as error:
+                report.error(line, str(error).strip())
+
+    def prune_missing(self, table, report):
+        """Delete stored rows whose keys are absent from the file."""
+        stale = [
+            values[0]
+            for values in table.model.objects.values_list(
+                "pk", *table.natural_key
+            ).iterator(chunk_size=self.batch_size)
+            if tuple(values[1:]) not in self.seen
+        ]
+        report.deleted += len(stale)
+        if self.dry_run:
+            return
+        for start in range(0, len(stale), self.batch_size):
+            table.model.objects.filter(
+                pk__in=stale[start:start + self.batch_size]
+            ).delete()
+
+
+def reset_sequences(models):
+    """Move primary key sequences past ids loaded explicitly."""
+    statements = connection.ops.sequence_reset_sql(no_style(), models)
+    with connection.cursor() as cursor:
+        for sql in statements:
+            cursor.execute(sql)
+
+
+def finish_load(models):
+    """Restore state normally kept by signals after bulk inserts."""
+    reset_sequences(models)
+    if Review in models:
+        Title.objects.rebuild_rating()
+    bump_generation(*(
+        model._meta.label_lower for model in models
+        if model._meta.app_label == "reviews"
+    ))
@@ -0,0 +1,288 @@
+"""Request metrics in Prometheus text format.
+
+`MetricsMiddleware` records latency, SQL queries & time, response size
+and status of every request by route. Each thread writes to its own
+shard, so recording takes no locks. With `METRICS_MULTIPROC_DIR` set
+every worker process dumps its totals to a file there and `/metrics`
+merges the files of all workers.
+"""
+import json
+import os
+import threading
+import time
+import weakref
+from bisect import bisect_left
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import connection
+from django.http import HttpResponse, HttpResponseForbidden
+
+LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10
+)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+# name: (type, help, buckets)
+METRICS = {
+    "yamdb_http_requests_total": (
+        "counter", "Number of requests by route, method & status.", None
+    ),
+    "yamdb_http_request_duration_seconds": (
+        "histogram", "Request latency.", LATENCY_BUCKETS
+    ),
+    "yamdb_db_queries_per_request": (
+        "histogram", "SQL queries made by one request.", QUERY_BUCKETS
+    ),
+    "yamdb_db_duration_seconds": (
+        "histogram", "Total SQL time of one request.", LATENCY_BUCKETS
+    ),
+    "yamdb_http_response_size_bytes": (
+        "histogram", "Response body size.", SIZE_BUCKETS
+    ),
+}
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class Shard:
+    """Metrics of one thread: counters & non-cumulative histograms."""
+
+    def __init__(self):
+        self.counters = defaultdict(float)
+        self.histograms = {}
+
+    def inc(self, name, labels, value=1):
+        self.counters[(name, labels)] += value
+
+    def observe(self, name, labels, value):
+        buckets = METRICS[name][2]
+        entry = self.histograms.get((name, labels))
+        if entry is None:
+            entry = self.histograms[(name, labels)] = [
+                [0] * (len(buckets) + 1), 0.0, 0
+            ]
+        entry[0][bisect_left(buckets, value)] += 1
+        entry[1] += value
+        entry[2] += 1
+
+
+def merge(snapshots):
+    """Sum snapshots `{"counters": [...], "histograms": [...]}`."""
+    counters = defaultdict(float)
+    histograms = {}
+    for snapshot in snapshots:
+        for name, labels, value in snapshot["counters"]:
+            counters[(name, tuple(map(tuple, labels)))] += value
+        for name, labels, counts, total, count in snapshot["histograms"]:
+            key = (name, tuple(map(tuple, labels)))
+            entry = histograms.setdefault(
+                key, [[0] * len(counts), 0.0, 0]
+            )
+            entry[0] = [old + new for old, new in zip(entry[0], counts)]
+            entry[1] += total
+            entry[2] += count
+    return {
+        "counters": [
+            [name, labels, value]
+            for (name, labels), value in counters.items()
+        ],
+        "histograms": [
+            [name, labels, *entry]
+            for (name, labels), entry in histograms.items()
+        ],
+    }
+
+
+def dump(shard):
+    return {
+        "counters": [
+            [name, labels, value]
+            for (name, labels), value in list(shard.counters.items())
+        ],
+        "histograms": [
+            [name, labels, list(counts), total, count]
+            for (name, labels), (counts, total, count)
+            in list(shard.histograms.items())
+        ],
+    }
+
+
+class Registry:
+    """Per-thread shards of metrics of this process.
+    When a thread is gone its shard is folded into `retired` under
+    a lock, so shards don't pile up with short-lived threads.
+    """
+
+    def __init__(self):
+        self.local = threading.local()
+        self.shards = []
+        self.retired = {"counters": [], "histograms": []}
+        self.lock = threading.Lock()
+        self.flushed_at = 0
+
+    def get_shard(self):
+        shard = getattr(self.local, "shard", None)
+        if shard is None:
+            shard = self.local.shard = Shard()
+            with self.lock:
+                self.shards.append(shard)
+            weakref.finalize(threading.current_thread(), self.retire, shard)
+        return shard
+
+    def retire(self, shard):
+        with self.lock:
+            self.retired = merge([self.retired, dump(shard)])
+            self.shards.remove(shard)
+
+    def snapshot(self):
+        with self.lock:
+            return merge(
+                [self.retired] + [dump(shard) for shard in self.shards]
+            )
+
+    def get_worker_path(self):
+        directory = getattr(settings, "METRICS_MULTIPROC_DIR", None)
+        if directory:
+            return os.path.join(directory, f"worker-{os.getpid()}.json")
+        return None
+
+    def flush(self, force=False):
+        """Dump totals of this process for other workers' `/metrics`."""
+        path = self.get_worker_path()
+        interval = getattr(settings, "METRICS_FLUSH_INTERVAL", 5)
+        now = time.monotonic()
+        if path is None or not force and now - self.flushed_at < interval:
+            return
+        self.flushed_at = now
+        temporary = f"{path}.{threading.get_ident()}.tmp"
+        with open(temporary, "w") as output:
+            json.dump(self.snapshot(), output)
+        os.replace(temporary, path)
+
+    def collect(self):
+        """Return merged metrics of all workers or of this process."""
+        path = self.get_worker_path()
+        if path is None:
+            return self.snapshot()
+        self.flush(force=True)
+        directory = os.path.dirname(path)
+        snapshots = []
+        for name in os.listdir(directory):
+            if name.startswith("worker-") and name.endswith(".json"):
+                try:
+                    with open(os.path.join(directory, name)) as source:
+                        snapshots.append(json.load(source))
+                except (OSError, ValueError):
+                    continue
+        return merge(snapshots)
+
+
+registry = Registry()
+
+
+def format_labels(labels, extra=()):
+    def escape(value):
+        return str(value).replace("\\", "\\\\").replace(
+            "\n", "\\n"
+        ).replace('"', '\\"')
+
+    pairs = [*labels, *extra]
+    if not pairs:
+        return ""
+    return "{" + ",".join(
+        f'{name}="{escape(value)}"' for name, value in pairs
+    ) + "}"
+
+
+def render(snapshot):
+    """Render merged snapshot in Prometheus text format."""
+    samples = defaultdict(list)
+    for name, labels, value in snapshot["counters"]:
+        samples[name].append(f"{name}{format_labels(labels)} {value:g}")
+    for name, labels, counts, total, count in snapshot["histograms"]:
+        cumulative = 0
+        for bound, bucket in zip(
+            (*METRICS[name][2], "+Inf"), counts
+        ):
+            cumulative += bucket
+            samples[name].append(
+                f"{name}_bucket{format_labels(labels, [('le', bound)])}"
+                f" {cumulative}"
+            )
+        samples[name].append(f"{name}_sum{format_labels(labels)} {total:g}")
+        samples[name].append(f"{name}_count{format_labels(labels)} {count}")
+    lines = []
+    for name, (kind, description, _) in METRICS.items():
+        lines += [f"# HELP {name} {description}", f"# TYPE {name} {kind}"]
+        lines += sorted(samples[name])
+    return "\n".join(lines) + "\n"
+
+
+class QueryCounter:
+    """`execute_wrapper` counting queries & their time."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.duration += time.perf_counter() - started
+
+
+def get_route(request):
+    match = getattr(request, "resolver_match", None)
+    return match.view_name if match else "unmatched"
+
+
+class MetricsMiddleware:
+    """Record metrics of every request, see module docstring."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        counter = QueryCounter()
+        started = time.perf_counter()
+        with connection.execute_wrapper(counter):
+            response = self.get_response(request)
+        duration = time.perf_counter() - started
+        route = (("route", get_route(request)),)
+        shard = registry.get_shard()
+        shard.inc(
+            "yamdb_http_requests_total",
+            route + (
+                ("method", request.method),
+                ("status", response.status_code),
+            ),
+        )
+        shard.observe("yamdb_http_request_duration_seconds", route, duration)
+        shard.observe("yamdb_db_queries_per_request", route, counter.count)
+        shard.observe("yamdb_db_duration_seconds", route, counter.duration)
+        if not response.streaming:
+            shard.observe(
+                "yamdb_http_response_size_bytes", route, len(response.content)
+            )
+        registry.flush()
+        return response
+
+
+def has_access(request):
+    """Bearer `METRICS_TOKEN` if set, otherwise staff or `DEBUG` mode."""
+    token = getattr(settings, "METRICS_TOKEN", None)
+    if token:
+        return request.META.get("HTTP_AUTHORIZATION") == f"Bearer {token}"
+    user = getattr(request, "user", None)
+    return settings.DEBUG or bool(user and user.is_staff)
+
+
+def metrics_view(request):
+    """Metrics of all workers, see `has_access`."""
+    if not has_access(request):
+        return HttpResponseForbidden()
+    return HttpResponse(render(registry.collect()), content_type=CONTENT_TYPE)
@@ -0,0 +1,55 @@
+# Generated by Django 3.0.5 on 2026-10-18 04:54
+
+from django.db import migrations, models
+
+
+SEEDED_MODELS = (
+    ('category', 'slug'),
+    ('genre', 'slug'),
+    ('title', 'pk'),
+    ('review', 'pk'),
+    ('comment', 'pk'),
+)
+
+
+def seed_change_log(apps, schema_editor):
+    """Log existing objects, so a sync from scratch reads them all."""
+    ChangeLog = apps.get_model('api', 'ChangeLog')
+    for name, key in SEEDED_MODELS:
+        keys = apps.get_model('reviews', name).objects.order_by(
+            'pk'
+        ).values_list(key, flat=True)
+        ChangeLog.objects.bulk_create(
+            (ChangeLog(model=name, key=str(value)) for value in keys.iterator()),
+            batch_size=5000,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0001_initial'),
+        ('reviews', '0008_category_genre_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeLog',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model', models.CharField(max_length=16, verbose_name='модель')),
+                ('key', models.CharField(max_length=50, verbose_name='ключ объекта')),
+                ('deleted', models.BooleanField(default=False, verbose_name='удален')),
+                ('changed_at', models.DateTimeField(auto_now=True, verbose_name='дата изменения')),
+            ],
+            options={
+                'verbose_name': 'изменение',
+                'verbose_name_plural': 'журнал изменений',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='changelog',
+            index=models.Index(fields=['model', 'key'], name='changelog_model_key_idx'),
+        ),
+        migrations.RunPython(seed_change_log, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 3.0.5 on 2026-10-18 04:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_changelog'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SlowQuery',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sql', models.TextField(verbose_name='запрос')),
+                ('duration', models.FloatField(verbose_name='время, мс')),
+                ('view', models.CharField(max_length=100, verbose_name='представление')),
+                ('method', models.CharField(max_length=10, verbose_name='метод')),
+                ('path', models.CharField(max_length=255, verbose_name='адрес')),
+                ('stack', models.TextField(blank=True, verbose_name='стек вызовов')),
+                ('plan', models.TextField(blank=True, verbose_name='план запроса')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='дата')),
+            ],
+            options={
+                'verbose_name': 'медленный запрос',
+                'verbose_name_plural': 'медленные запросы',
+                'ordering': ('-id',),
+            },
+        ),
+    ]
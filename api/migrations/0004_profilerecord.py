@@ -0,0 +1,36 @@
+# Generated by Django 3.0.5 on 2026-10-18 05:01
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('api', '0003_slowquery'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProfileRecord',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('view', models.CharField(max_length=100, verbose_name='представление')),
+                ('method', models.CharField(max_length=10, verbose_name='метод')),
+                ('path', models.CharField(max_length=255, verbose_name='адрес')),
+                ('status', models.PositiveSmallIntegerField(verbose_name='статус ответа')),
+                ('duration', models.FloatField(verbose_name='время, мс')),
+                ('stats', models.BinaryField(verbose_name='данные cProfile')),
+                ('collapsed', models.TextField(blank=True, verbose_name='свернутые стеки')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='дата')),
+                ('user', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='пользователь')),
+            ],
+            options={
+                'verbose_name': 'профиль запроса',
+                'verbose_name_plural': 'профили запросов',
+                'ordering': ('-id',),
+            },
+        ),
+    ]
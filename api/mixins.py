@@ -0,0 +1,157 @@
+from hashlib import md5
+
+from django.core.cache import cache
+from django.db.models import Count, Max
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe
+from rest_framework.response import Response
+
+from api.cache import get_generations
+
+VALIDATOR_HEADERS = ("ETag", "Last-Modified")
+
+
+def get_not_modified_response(request, headers):
+    """Return 304 (or 412) response if the request validators match
+    `ETag` & `Last-Modified` in `headers`, otherwise None.
+    """
+    stub = HttpResponse()
+    for name, value in headers.items():
+        stub[name] = value
+    last_modified = headers.get("Last-Modified")
+    response = get_conditional_response(
+        request,
+        etag=headers.get("ETag"),
+        last_modified=last_modified and parse_http_date_safe(last_modified),
+        response=stub,
+    )
+    return None if response is stub else response
+
+
+def get_request_signature(request, kwargs):
+    """Hash of the view kwargs, normalized query params & media type."""
+    params = sorted(
+        (name, values) for name, values in request.query_params.lists()
+    )
+    return md5(repr(
+        (sorted(kwargs.items()), params, request.accepted_media_type)
+    ).encode()).hexdigest()
+
+
+class CachedResponseMixin:
+    """Shared cache of anonymous `list` & `retrieve` responses.
+    Keys include scheme, host, normalized query params and generations of
+    `cache_dependencies`, so any write to these models invalidates them.
+    Validators of cached responses are kept to answer conditional GETs.
+    """
+
+    cache_dependencies = ()
+    response_cache_timeout = 300
+
+    def list(self, request, *args, **kwargs):
+        return self.get_cached_response(
+            super().list, request, *args, **kwargs
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.get_cached_response(
+            super().retrieve, request, *args, **kwargs
+        )
+
+    def get_cached_response(self, handler, request, *args, **kwargs):
+        if request.user.is_authenticated:
+            return handler(request, *args, **kwargs)
+        key = self.get_response_cache_key(request)
+        cached = cache.get(key)
+        if cached is not None:
+            data, headers = cached
+            return get_not_modified_response(request, headers) or Response(
+                data, headers=headers
+            )
+        response = handler(request, *args, **kwargs)
+        if response.status_code == 200:
+            headers = {
+                name: response[name]
+                for name in VALIDATOR_HEADERS if response.has_header(name)
+            }
+            cache.set(
+                key, (response.data, headers), self.response_cache_timeout
+            )
+        return response
+
+    def get_response_cache_key(self, request):
+        generations = ".".join(
+            str(generation)
+            for generation in get_generations(*self.cache_dependencies)
+        )
+        # Bodies hold absolute pagination links, so scheme & host matter.
+        signature = md5(repr((
+            request.scheme,
+            request.get_host(),
+            get_request_signature(request, self.kwargs),
+        )).encode()).hexdigest()
+        return f"response:{self.basename}:{self.action}:{generations}:" + (
+            signature
+        )
+
+
+class ConditionalGetMixin:
+    """`ETag` & `Last-Modified` for `list` & `retrieve`.
+
+    Validators are computed from `MAX(updated_at)` and `COUNT(*)` of the
+    filtered queryset plus generations of `etag_dependencies` (models
+    rendered inside the objects), so 304 is answered without
+    serializing the page. `Last-Modified` is sent for single objects
+    only: for lists it would miss deletions.
+    """
+
+    etag_dependencies = ()
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        return self.get_conditional_response(
+            queryset, False, super().list, request, *args, **kwargs
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        queryset = self.filter_queryset(self.get_queryset()).filter(
+            **{self.lookup_field: self.kwargs[lookup_url_kwarg]}
+        )
+        return self.get_conditional_response(
+            queryset, True, super().retrieve, request, *args, **kwargs
+        )
+
+    def get_conditional_response(self, queryset, detail, handler, request,
+                                 *args, **kwargs):
+        state = queryset.order_by().aggregate(
+            last_modified=Max("updated_at"), count=Count("pk")
+        )
+        if not state["count"]:
+            return handler(request, *args, **kwargs)
+        headers = self.get_validator_headers(request, state, detail)
+        response = get_not_modified_response(request, headers)
+        if response is not None:
+            return response
+        response = handler(request, *args, **kwargs)
+        if response.status_code == 200:
+            for name, value in headers.items():
+                response[name] = value
+        return response
+
+    def get_validator_headers(self, request, state, detail):
+        etag = md5(repr((
+            self.basename,
+            self.action,
+            get_request_signature(request, self.kwargs),
+            state["last_modified"].isoformat(),
+            state["count"],
+            get_generations(*self.etag_dependencies),
+        )).encode()).hexdigest()
+        headers = {"ETag": f'"{etag}"'}
+        if detail:
+            headers["Last-Modified"] = http_date(
+                state["last_modified"].timestamp()
+            )
+        return headers
@@ -0,0 +1,247 @@
+from django.conf import settings
+from django.db import models
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+
+class OutboxStatus:
+    PENDING = "pending"
+    SENT = "sent"
+    FAILED = "failed"
+
+
+OUTBOX_STATUS_CHOICES = (
+    (OutboxStatus.PENDING, "в очереди"),
+    (OutboxStatus.SENT, "отправлено"),
+    (OutboxStatus.FAILED, "не отправлено"),
+)
+
+
+class OutboxMessageQuerySet(models.QuerySet):
+
+    def enqueue(self, subject, body, recipient):
+        """Put email into the outbox, `send-outbox` delivers it."""
+        return self.create(subject=subject, body=body, recipient=recipient)
+
+    def pending(self):
+        return self.filter(status=OutboxStatus.PENDING)
+
+    def due(self):
+        """Pending messages whose next attempt time has come."""
+        return self.pending().filter(
+            next_attempt_at__lte=timezone.now()
+        ).order_by("next_attempt_at", "id")
+
+
+class OutboxMessage(models.Model):
+    """Email waiting for delivery by `send-outbox` worker."""
+
+    subject = models.CharField(verbose_name="тема", max_length=255)
+    body = models.TextField(verbose_name="текст")
+    recipient = models.EmailField(verbose_name="получатель")
+    status = models.CharField(
+        verbose_name="статус",
+        max_length=16,
+        choices=OUTBOX_STATUS_CHOICES,
+        default=OutboxStatus.PENDING,
+    )
+    attempts = models.PositiveSmallIntegerField(
+        verbose_name="попыток отправки",
+        default=0,
+    )
+    next_attempt_at = models.DateTimeField(
+        verbose_name="следующая попытка",
+        default=timezone.now,
+    )
+    created_at = models.DateTimeField(
+        verbose_name="дата создания",
+        auto_now_add=True,
+    )
+    sent_at = models.DateTimeField(
+        verbose_name="дата отправки",
+        null=True,
+        blank=True,
+    )
+    last_error = models.TextField(verbose_name="последняя ошибка", blank=True)
+
+    objects = OutboxMessageQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = "письмо"
+        verbose_name_plural = "исходящие письма"
+        indexes = [
+            models.Index(
+                fields=("status", "next_attempt_at"),
+                name="outbox_status_next_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.recipient}: {self.subject}"
+
+
+# Tracked catalog models and fields identifying their objects in API.
+CHANGE_KEYS = {
+    "category": "slug",
+    "genre": "slug",
+    "title": "pk",
+    "review": "pk",
+    "comment": "pk",
+}
+
+
+def get_changes(obj, deleted=False):
+    """Return `[(model, key, deleted)]` changed by write of `obj`.
+    Genre links and reviews change their titles too.
+    """
+    name = obj._meta.model_name
+    if obj._meta.app_label != "reviews":
+        return []
+    if name == "genretitle":
+        return [("title", str(obj.title_id), False)]
+    if name not in CHANGE_KEYS:
+        return []
+    key = getattr(obj, CHANGE_KEYS[name])
+    if key is None:
+        return []
+    changes = [(name, str(key), deleted)]
+    if name == "review":
+        changes.append(("title", str(obj.title_id), False))
+    return changes
+
+
+class ChangeLogQuerySet(models.QuerySet):
+
+    def record(self, objects, deleted=False):
+        """Log writes of `objects`, see `get_changes`."""
+        return self.record_changes(
+            change for obj in objects for change in get_changes(obj, deleted)
+        )
+
+    def build(self, changes):
+        """Return unsaved entries of `(model, key, deleted)` changes,
+        one per object.
+        """
+        entries = {(model, key): deleted for model, key, deleted in changes}
+        return [
+            self.model(model=model, key=key, deleted=deleted)
+            for (model, key), deleted in entries.items()
+        ]
+
+    def record_changes(self, changes):
+        """Log `(model, key, deleted)` changes with one insert."""
+        return self.bulk_create(self.build(changes))
+
+    def superseded(self):
+        """Entries followed by a later change of the same object."""
+        return self.filter(Exists(
+            self.model.objects.filter(
+                model=OuterRef("model"),
+                key=OuterRef("key"),
+                pk__gt=OuterRef("pk"),
+            )
+        ))
+
+
+class ChangeLog(models.Model):
+    """Append-only log of catalog changes, read by `/changes/`.
+    `key` - slug of categories & genres, id of other objects.
+    `compact-changes` removes superseded entries.
+    """
+
+    model = models.CharField(verbose_name="модель", max_length=16)
+    key = models.CharField(verbose_name="ключ объекта", max_length=50)
+    deleted = models.BooleanField(verbose_name="удален", default=False)
+    changed_at = models.DateTimeField(
+        verbose_name="дата изменения",
+        auto_now=True,
+    )
+
+    objects = ChangeLogQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = "изменение"
+        verbose_name_plural = "журнал изменений"
+        indexes = [
+            models.Index(
+                fields=("model", "key"),
+                name="changelog_model_key_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.model}:{self.key}"
+
+
+class RingBufferQuerySet(models.QuerySet):
+
+    def trim(self, limit):
+        """Keep only the last `limit` queries, like a ring buffer."""
+        last = self.order_by("-pk").values_list("pk", flat=True)
+        return self.filter(
+            pk__lte=models.Subquery(last[limit:limit + 1])
+        ).delete()
+
+
+class SlowQuery(models.Model):
+    """SQL query slower than `SLOW_QUERY_THRESHOLD`, see `slow_queries`.
+    `plan` - output of `EXPLAIN (ANALYZE, BUFFERS)` if it was sampled.
+    """
+
+    sql = models.TextField(verbose_name="запрос")
+    duration = models.FloatField(verbose_name="время, мс")
+    view = models.CharField(verbose_name="представление", max_length=100)
+    method = models.CharField(verbose_name="метод", max_length=10)
+    path = models.CharField(verbose_name="адрес", max_length=255)
+    stack = models.TextField(verbose_name="стек вызовов", blank=True)
+    plan = models.TextField(verbose_name="план запроса", blank=True)
+    created_at = models.DateTimeField(
+        verbose_name="дата",
+        auto_now_add=True,
+    )
+
+    objects = RingBufferQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = "медленный запрос"
+        verbose_name_plural = "медленные запросы"
+        ordering = ("-id",)
+
+    def __str__(self):
+        return f"{self.view}: {self.duration:.0f} мс"
+
+
+class ProfileRecord(models.Model):
+    """Profile of one request taken by `profiling.ProfilingMiddleware`.
+    `stats` - cProfile data in the `pstats` file format,
+    `collapsed` - sampled stacks in the collapsed flamegraph format.
+    """
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        verbose_name="пользователь",
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name="+",
+    )
+    view = models.CharField(verbose_name="представление", max_length=100)
+    method = models.CharField(verbose_name="метод", max_length=10)
+    path = models.CharField(verbose_name="адрес", max_length=255)
+    status = models.PositiveSmallIntegerField(verbose_name="статус ответа")
+    duration = models.FloatField(verbose_name="время, мс")
+    stats = models.BinaryField(verbose_name="данные cProfile")
+    collapsed = models.TextField(verbose_name="свернутые стеки", blank=True)
+    created_at = models.DateTimeField(
+        verbose_name="дата",
+        auto_now_add=True,
+    )
+
+    objects = RingBufferQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = "профиль запроса"
+        verbose_name_plural = "профили запросов"
+        ordering = ("-id",)
+
+    def __str__(self):
+        return f"{self.method} {self.path}: {self.duration:.0f} мс"
@@ -0,0 +1,149 @@
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections import OrderedDict
+from hashlib import md5
+
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet
+from django.db import connections
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework import pagination
+from rest_framework.exceptions import NotFound
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from api.cache import get_generations
+
+
+class CachedCountPagination(pagination.LimitOffsetPagination):
+    """Limit/offset pagination without `COUNT(*)` on every request.
+
+    Unfiltered lists of big PostgreSQL tables report the planner
+    estimate from `pg_class.reltuples` and set `count_is_approximate`.
+    Other counts are exact but cached until the model is written to
+    or `count_cache_timeout` expires.
+    """
+
+    count_cache_timeout = 60
+    estimate_threshold = 100000
+
+    def get_count(self, queryset):
+        self.count_is_approximate = False
+        if not queryset.query.where:
+            estimate = self.estimate_count(queryset)
+            if estimate is not None and estimate >= self.estimate_threshold:
+                self.count_is_approximate = True
+                return estimate
+        return self.get_cached_count(queryset)
+
+    def estimate_count(self, queryset):
+        """Return planner row estimate of the table or None."""
+        connection = connections[queryset.db]
+        if connection.vendor != "postgresql":
+            return None
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT reltuples FROM pg_class WHERE oid = %s::regclass",
+                [queryset.model._meta.db_table],
+            )
+            row = cursor.fetchone()
+        if row is None or row[0] < 0:
+            return None
+        return int(row[0])
+
+    def get_cached_count(self, queryset):
+        model = queryset.model._meta.label_lower
+        try:
+            query = md5(
+                str(queryset.query.sql_with_params()).encode()
+            ).hexdigest()
+        except EmptyResultSet:
+            return 0
+        key = "count:{}:{}:{}".format(model, *get_generations(model), query)
+        count = cache.get(key)
+        if count is None:
+            count = super().get_count(queryset)
+            cache.set(key, count, self.count_cache_timeout)
+        return count
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ("count", self.count),
+            ("count_is_approximate", self.count_is_approximate),
+            ("next", self.get_next_link()),
+            ("previous", self.get_previous_link()),
+            ("results", data),
+        ]))
+
+
+class KeysetPagination(CachedCountPagination):
+    """Limit/offset pagination with opt-in keyset mode.
+
+    Passing `cursor` (empty for the first page) switches to pages keyed
+    on `(pub_date, id)`: every page is an index range scan without
+    OFFSET and without `COUNT(*)`. The response then contains only
+    `next` and `results`.
+    """
+
+    cursor_query_param = "cursor"
+    invalid_cursor_message = "Неверный курсор."
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = self.cursor_query_param in request.query_params
+        if not self.keyset:
+            return super().paginate_queryset(queryset, request, view)
+        self.request = request
+        self.limit = self.get_limit(request) or self.max_limit or 100
+        position = self.decode_cursor(
+            request.query_params[self.cursor_query_param]
+        )
+        queryset = queryset.order_by("pub_date", "id")
+        if position is not None:
+            pub_date, pk = position
+            queryset = queryset.filter(
+                Q(pub_date__gt=pub_date) | Q(pub_date=pub_date, id__gt=pk)
+            )
+        page = list(queryset[:self.limit + 1])
+        self.next_position = None
+        if len(page) > self.limit:
+            page = page[:self.limit]
+            self.next_position = (page[-1].pub_date, page[-1].id)
+        return page
+
+    def get_paginated_response(self, data):
+        if not self.keyset:
+            return super().get_paginated_response(data)
+        return Response(OrderedDict([
+            ("next", self.get_next_cursor_link()),
+            ("results", data),
+        ]))
+
+    def get_next_cursor_link(self):
+        if self.next_position is None:
+            return None
+        url = remove_query_param(
+            self.request.build_absolute_uri(), self.offset_query_param
+        )
+        return replace_query_param(
+            url, self.cursor_query_param,
+            self.encode_cursor(*self.next_position),
+        )
+
+    def encode_cursor(self, pub_date, pk):
+        position = f"{pub_date.isoformat()}|{pk}".encode()
+        return urlsafe_b64encode(position).decode()
+
+    def decode_cursor(self, cursor):
+        """Return `(pub_date, id)` of the last seen row or None."""
+        if not cursor:
+            return None
+        try:
+            pub_date, pk = urlsafe_b64decode(
+                cursor.encode()
+            ).decode().split("|")
+            position = (parse_datetime(pub_date), int(pk))
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if position[0] is None:
+            raise NotFound(self.invalid_cursor_message)
+        return position
@@ -0,0 +1,134 @@
+"""Profiling of single requests on demand of admins.
+
+A request with `X-Profile: 1` header or `?profile=1` of a user passing
+`IsAdmin` runs under cProfile and a sampling profiler. The result is
+saved to `ProfileRecord`, its id and download address are returned in
+`X-Profile-Id` & `X-Profile-Url` headers. Other requests pay only for
+the check of the header and query string.
+"""
+import cProfile
+import marshal
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.urls import reverse
+from rest_framework.exceptions import APIException
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from api.models import ProfileRecord
+from api.permissions import IsAdmin
+
+PROFILE_HEADER = "HTTP_X_PROFILE"
+PROFILE_PARAM = "profile"
+
+
+def get_frame_name(frame):
+    """Return `path:function` of frame, path relative to its root."""
+    path = frame.f_code.co_filename
+    for root in (settings.BASE_DIR, *sys.path):
+        if root and path.startswith(root + os.sep):
+            path = path[len(root) + 1:]
+            break
+    return f"{path}:{frame.f_code.co_name}"
+
+
+class Sampler(threading.Thread):
+    """Thread counting stacks of thread `thread_id` every `interval`."""
+
+    def __init__(self, thread_id, interval):
+        super().__init__(daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            names = []
+            while frame is not None:
+                names.append(get_frame_name(frame))
+                frame = frame.f_back
+            if names:
+                self.stacks[";".join(reversed(names))] += 1
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+    def get_collapsed(self):
+        return "".join(
+            f"{stack} {count}\n" for stack, count in self.stacks.items()
+        )
+
+
+def is_requested(request):
+    return (
+        request.META.get(PROFILE_HEADER, "0") not in ("", "0")
+        or request.GET.get(PROFILE_PARAM, "0") not in ("", "0")
+    )
+
+
+def get_admin(request):
+    """Return user of API request if the user passes `IsAdmin`."""
+    api_request = Request(request, authenticators=[
+        authentication() for authentication
+        in api_settings.DEFAULT_AUTHENTICATION_CLASSES
+    ])
+    try:
+        if IsAdmin().has_permission(api_request, None):
+            return api_request.user
+    except APIException:
+        pass
+    return None
+
+
+class ProfilingMiddleware:
+    """Profile requests of admins asking for it, see module docstring."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not is_requested(request):
+            return self.get_response(request)
+        user = get_admin(request)
+        if user is None:
+            return self.get_response(request)
+        profile = cProfile.Profile()
+        sampler = Sampler(
+            threading.get_ident(),
+            getattr(settings, "PROFILE_SAMPLE_INTERVAL", 0.005),
+        )
+        sampler.start()
+        started = time.perf_counter()
+        profile.enable()
+        try:
+            response = self.get_response(request)
+        finally:
+            profile.disable()
+            duration = (time.perf_counter() - started) * 1000
+            sampler.stop()
+        profile.create_stats()
+        match = getattr(request, "resolver_match", None)
+        record = ProfileRecord.objects.create(
+            user=user,
+            view=(match.view_name if match else "unmatched")[:100],
+            method=request.method,
+            path=request.path[:255],
+            status=response.status_code,
+            duration=duration,
+            stats=marshal.dumps(profile.stats),
+            collapsed=sampler.get_collapsed(),
+        )
+        ProfileRecord.objects.trim(getattr(settings, "PROFILE_LIMIT", 50))
+        response["X-Profile-Id"] = record.pk
+        response["X-Profile-Url"] = request.build_absolute_uri(
+            reverse("profile", kwargs={"pk": record.pk, "fmt": "prof"})
+        )
+        return response
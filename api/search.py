@@ -0,0 +1,143 @@
+"""Full-text search of titles by `name` and `description`.
+
+PostgreSQL uses the GIN indexes created by migration
+`reviews.0006_title_search`: `tsvector` matching with `ts_rank` plus
+trigram similarity of names for typos and partial words. Other
+databases (SQLite in tests and local setups) use an in-process
+inverted index rebuilt whenever titles change; it returns only the
+`FALLBACK_LIMIT` most relevant titles.
+"""
+import re
+import threading
+from bisect import bisect_left
+from collections import defaultdict
+
+from django.db import connections
+from django.db.models import BooleanField, Case, FloatField, Value, When
+from django.db.models.expressions import RawSQL
+
+from api.cache import get_generations
+
+SEARCH_CONFIG = "russian"
+# Must match the indexed expression to use `title_search_idx`.
+SEARCH_VECTOR = (
+    "to_tsvector('russian', coalesce({table}.name, '') || ' ' || "
+    "coalesce({table}.description, ''))"
+)
+SEARCH_QUERY = "plainto_tsquery('russian', %s)"
+TOKEN_PATTERN = re.compile(r"\w+")
+NAME_WEIGHT = 2
+FALLBACK_LIMIT = 500
+DESCRIPTION_WEIGHT = 1
+
+
+def tokenize(text):
+    return TOKEN_PATTERN.findall((text or "").lower())
+
+
+def search_titles(queryset, query):
+    """Filter titles matching `query`, most relevant first."""
+    if not tokenize(query):
+        return queryset.none()
+    if connections[queryset.db].vendor == "postgresql":
+        return search_postgresql(queryset, query)
+    return search_inverted_index(queryset, query)
+
+
+def search_postgresql(queryset, query):
+    # The first alias is the base table, `Title._meta.db_table` unless
+    # the query relabeled it.
+    table = connections[queryset.db].ops.quote_name(next(
+        iter(queryset.query.alias_map), queryset.model._meta.db_table
+    ))
+    vector = SEARCH_VECTOR.format(table=table)
+    match = RawSQL(
+        f"({vector} @@ {SEARCH_QUERY}) OR {table}.name %% %s",
+        [query, query],
+        output_field=BooleanField(),
+    )
+    rank = RawSQL(
+        f"ts_rank({vector}, {SEARCH_QUERY})"
+        f" + similarity({table}.name, %s)",
+        [query, query],
+        output_field=FloatField(),
+    )
+    return queryset.filter(match).annotate(search_rank=rank).order_by(
+        "-search_rank", "id"
+    )
+
+
+class InvertedIndex:
+    """Token to `{title_id: weight}` map with prefix lookups."""
+
+    def __init__(self, rows):
+        postings = defaultdict(lambda: defaultdict(int))
+        for title_id, name, description in rows:
+            for token in tokenize(name):
+                postings[token][title_id] += NAME_WEIGHT
+            for token in tokenize(description):
+                postings[token][title_id] += DESCRIPTION_WEIGHT
+        self.postings = dict(postings)
+        self.tokens = sorted(self.postings)
+
+    def lookup(self, prefix):
+        """Scores of titles having a token starting with `prefix`."""
+        scores = defaultdict(int)
+        position = bisect_left(self.tokens, prefix)
+        while (position < len(self.tokens)
+               and self.tokens[position].startswith(prefix)):
+            for title_id, weight in self.postings[
+                self.tokens[position]
+            ].items():
+                scores[title_id] += weight
+            position += 1
+        return scores
+
+    def search(self, query):
+        """Return `{title_id: score}` of titles matching all tokens."""
+        result = None
+        for token in tokenize(query):
+            scores = self.lookup(token)
+            if result is None:
+                result = scores
+                continue
+            result = {
+                title_id: score + scores[title_id]
+                for title_id, score in result.items() if title_id in scores
+            }
+        return result or {}
+
+
+_index_lock = threading.Lock()
+_index = {}
+
+
+def get_inverted_index(queryset):
+    """Return index of all titles, rebuilt after any title write."""
+    generation = get_generations("reviews.title")
+    with _index_lock:
+        if _index.get("generation") != generation:
+            _index["index"] = InvertedIndex(
+                queryset.model.objects.using(queryset.db).values_list(
+                    "id", "name", "description"
+                ).iterator()
+            )
+            _index["generation"] = generation
+        return _index["index"]
+
+
+def search_inverted_index(queryset, query):
+    scores = get_inverted_index(queryset).search(query)
+    if not scores:
+        return queryset.none()
+    scores = dict(sorted(
+        scores.items(), key=lambda item: (-item[1], item[0])
+    )[:FALLBACK_LIMIT])
+    rank = Case(
+        *(When(id=title_id, then=Value(score))
+          for title_id, score in scores.items()),
+        output_field=FloatField(),
+    )
+    return queryset.filter(id__in=scores).annotate(search_rank=rank).order_by(
+        "-search_rank", "id"
+    )
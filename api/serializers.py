@@ -1,7 +1,14 @@
+from collections import defaultdict
+
 from django.core.exceptions import ValidationError
+from django.db.models import QuerySet
+from django.utils import timezone
 from rest_framework import serializers
+from rest_framework.relations import MANY_RELATION_KWARGS
 
-from reviews.models import Category, Comment, Genre, Review, Title, User
+from api.bulk import bulk_insert
+from reviews.models import (Category, Comment, Genre, GenreTitle, Review,
+                            Title, User)
 
 
 class ConfirmationTokenSerializer(serializers.Serializer):
@@ -55,14 +62,140 @@ class GenreSerializer(serializers.ModelSerializer):
         fields = ("name", "slug")
 
 
+class BatchedManyRelatedField(serializers.ManyRelatedField):
+    """Many related slugs resolved with one query."""
+
+    def to_internal_value(self, data):
+        if isinstance(data, str) or not hasattr(data, "__iter__"):
+            self.fail("not_a_list", input_type=type(data).__name__)
+        if not self.allow_empty and len(data) == 0:
+            self.fail("empty")
+        self.child_relation.resolve(data)
+        return [self.child_relation.to_internal_value(item) for item in data]
+
+
+class BatchedSlugRelatedField(serializers.SlugRelatedField):
+    """Slug related field with objects cached on the root serializer.
+    Slugs are fetched in batches by `resolve`, lists of objects call it
+    for the whole payload, so each slug is looked up once.
+    """
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        list_kwargs = {"child_relation": cls(*args, **kwargs)}
+        for key in kwargs:
+            if key in MANY_RELATION_KWARGS:
+                list_kwargs[key] = kwargs[key]
+        return BatchedManyRelatedField(**list_kwargs)
+
+    def get_cache(self):
+        caches = self.root.__dict__.setdefault("_slug_cache", {})
+        return caches.setdefault(self.get_queryset().model, {})
+
+    def resolve(self, slugs):
+        """Fetch objects of not yet cached `slugs` with one query."""
+        cache = self.get_cache()
+        missing = {
+            str(slug) for slug in slugs if isinstance(slug, (str, int))
+        } - cache.keys()
+        if missing:
+            cache.update(dict.fromkeys(missing))
+            cache.update(
+                (getattr(obj, self.slug_field), obj)
+                for obj in self.get_queryset().filter(
+                    **{f"{self.slug_field}__in": missing}
+                )
+            )
+        return cache
+
+    def to_internal_value(self, data):
+        if not isinstance(data, (str, int)):
+            self.fail("invalid")
+        obj = self.resolve([data])[str(data)]
+        if obj is None:
+            self.fail(
+                "does_not_exist", slug_name=self.slug_field, value=str(data)
+            )
+        return obj
+
+
+class WriteTitleListSerializer(serializers.ListSerializer):
+    """Creates & updates many titles with bulk queries.
+    Slugs of the whole payload are resolved before validating items.
+    """
+
+    batch_size = 1000
+
+    def to_internal_value(self, data):
+        if isinstance(data, list):
+            items = [item for item in data if isinstance(item, dict)]
+            for name, field in self.child.fields.items():
+                if isinstance(field, BatchedManyRelatedField):
+                    field.child_relation.resolve(
+                        slug for item in items
+                        if isinstance(item.get(name), list)
+                        for slug in item[name]
+                    )
+                elif isinstance(field, BatchedSlugRelatedField):
+                    field.resolve(item.get(name) for item in items)
+        return super().to_internal_value(data)
+
+    def create(self, validated_data):
+        titles = [
+            Title(**{
+                name: value for name, value in data.items()
+                if name != "genre"
+            })
+            for data in validated_data
+        ]
+        bulk_insert(Title, titles, batch_size=self.batch_size)
+        self.add_genres(titles, validated_data)
+        return titles
+
+    def update(self, instances, validated_data):
+        fields = {"updated_at"}
+        now = timezone.now()
+        for title, data in zip(instances, validated_data):
+            for name, value in data.items():
+                if name != "genre":
+                    setattr(title, name, value)
+                    fields.add(name)
+            title.updated_at = now
+        Title.objects.bulk_update(
+            instances, fields, batch_size=self.batch_size
+        )
+        changed = [
+            (title, data) for title, data in zip(instances, validated_data)
+            if "genre" in data
+        ]
+        if changed:
+            titles, genres = zip(*changed)
+            GenreTitle.objects.filter(title__in=titles).delete()
+            self.add_genres(titles, genres)
+        return instances
+
+    def add_genres(self, titles, validated_data):
+        """Link `titles` to their genres with one bulk insert."""
+        GenreTitle.objects.bulk_create(
+            (
+                GenreTitle(title=title, genre=genre)
+                for title, data in zip(titles, validated_data)
+                for genre in dict.fromkeys(data.get("genre", ()))
+            ),
+            batch_size=self.batch_size,
+        )
+
+
 class WriteTitleSerializer(serializers.ModelSerializer):
-    """Serializer for write request for titles."""
+    """Serializer for write request for titles.
+    Genre & category slugs are resolved in batches.
+    """
 
-    category = serializers.SlugRelatedField(
+    category = BatchedSlugRelatedField(
         slug_field="slug",
         queryset=Category.objects.all(),
     )
-    genre = serializers.SlugRelatedField(
+    genre = BatchedSlugRelatedField(
         many=True,
         slug_field="slug",
         queryset=Genre.objects.all(),
@@ -71,28 +204,165 @@ class WriteTitleSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Title
-        fields = "__all__"
+        fields = (
+            "id", "genre", "category", "rating", "name", "year", "description"
+        )
+        list_serializer_class = WriteTitleListSerializer
 
     def get_rating(self, obj):
         """Return 0 after creation."""
         return 0
 
 
+# Output fields of titles, `?fields=` selects from them.
+TITLE_FIELDS = (
+    "id", "genre", "category", "rating", "name", "year", "description"
+)
+# Related data embedded into titles with `?expand=`.
+TITLE_EXPANSIONS = ("reviews", "category")
+LATEST_REVIEWS_LIMIT = 5
+
+
 class ReadTitleSerializer(serializers.ModelSerializer):
-    """Serializer for read requests for titles."""
+    """Serializer for read requests for titles.
+    `fields` in context - output fields, `TITLE_FIELDS` by default.
+    `reviews` are expected prefetched to `latest_reviews`.
+    """
 
     genre = GenreSerializer(many=True)
     category = CategorySerializer()
-    rating = serializers.SerializerMethodField()
+    reviews = serializers.SerializerMethodField()
 
     class Meta:
         model = Title
-        fields = "__all__"
-        read_only_fields = ("name", "year", "description", "genre", "category")
+        fields = TITLE_FIELDS + ("reviews",)
+        read_only_fields = (
+            "name", "year", "description", "genre", "category", "rating"
+        )
 
-    def get_rating(self, obj):
-        """Return object rating calculated in viewset."""
-        return obj.rating
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        fields = self.context.get("fields", TITLE_FIELDS)
+        for name in set(self.fields) - set(fields):
+            self.fields.pop(name)
+
+    def get_reviews(self, obj):
+        return ReviewSerializer(
+            obj.latest_reviews, many=True, context=self.context
+        ).data
+
+
+class FastReadTitleListSerializer(serializers.ListSerializer):
+    """Serializes a page of titles in a single pass.
+    Genres & reviews of all titles are fetched by one query each
+    and grouped by title.
+    """
+
+    def to_representation(self, data):
+        fields = self.child.output_fields
+        rows = list(self.child.get_rows(data, fields))
+        related = self.child.get_related([row["id"] for row in rows])
+        return [self.child.build(row, related) for row in rows]
+
+
+class FastReadTitleSerializer(serializers.BaseSerializer):
+    """Read-only serializer for lists of titles.
+    Builds the same output as `ReadTitleSerializer` from `.values()`
+    rows, without model instances and per-field DRF machinery.
+    `instance` - row, or titles queryset / rows with `many=True`.
+    """
+
+    # Columns selected for every output field.
+    row_fields = {
+        "id": ("id",),
+        "genre": (),
+        "category": ("category__name", "category__slug"),
+        "rating": ("rating",),
+        "name": ("name",),
+        "year": ("year",),
+        "description": ("description",),
+        "reviews": (),
+    }
+
+    class Meta:
+        list_serializer_class = FastReadTitleListSerializer
+
+    @property
+    def output_fields(self):
+        return self.context.get("fields", TITLE_FIELDS)
+
+    @classmethod
+    def get_rows(cls, data, fields=TITLE_FIELDS):
+        """Return `.values()` rows of titles queryset `data`
+        with columns of `fields` only.
+        """
+        if not isinstance(data, QuerySet):
+            return data
+        columns = ["id"]
+        for name in fields:
+            columns.extend(
+                column for column in cls.row_fields[name]
+                if column not in columns
+            )
+        return data.prefetch_related(None).values(*columns)
+
+    def get_related(self, title_ids):
+        """Return {field: {title_id: [...]}} for related output fields."""
+        related = {}
+        if "genre" in self.output_fields:
+            related["genre"] = self.get_genres(title_ids)
+        if "reviews" in self.output_fields:
+            related["reviews"] = self.get_reviews(title_ids)
+        return related
+
+    def get_genres(self, title_ids):
+        """Return {title_id: [genre, ...]} ordered as `Genre.Meta`."""
+        genres = defaultdict(list)
+        links = GenreTitle.objects.filter(title_id__in=title_ids).order_by(*(
+            f"-genre__{field[1:]}" if field.startswith("-")
+            else f"genre__{field}"
+            for field in Genre._meta.ordering
+        ))
+        for title_id, name, slug in links.values_list(
+            "title_id", "genre__name", "genre__slug"
+        ):
+            genres[title_id].append({"name": name, "slug": slug})
+        return genres
+
+    def get_reviews(self, title_ids):
+        """Return {title_id: [review, ...]}, newest first."""
+        latest = list(
+            Review.objects.latest_per_title(LATEST_REVIEWS_LIMIT)
+            .filter(title_id__in=title_ids)
+            .select_related("author")
+        )
+        data = ReviewSerializer(latest, many=True, context=self.context).data
+        reviews = defaultdict(list)
+        for review, item in zip(latest, data):
+            reviews[review.title_id].append(item)
+        return reviews
+
+    def build(self, row, related):
+        category = None
+        if row.get("category__slug") is not None:
+            category = {
+                "name": row["category__name"],
+                "slug": row["category__slug"],
+            }
+        item = {
+            "id": row["id"],
+            "genre": related.get("genre", {}).get(row["id"], []),
+            "category": category,
+            "rating": row.get("rating"),
+            "name": row.get("name"),
+            "year": row.get("year"),
+            "description": row.get("description"),
+            "reviews": related.get("reviews", {}).get(row["id"], []),
+        }
+        return {name: item[name] for name in self.output_fields}
+
+    def to_representation(self, instance):
+        return self.build(instance, self.get_related([instance["id"]]))
 
 
 class ReviewSerializer(serializers.ModelSerializer):
@@ -138,3 +408,59 @@ class CommentSerializer(serializers.ModelSerializer):
     class Meta:
         model = Comment
         fields = ("id", "text", "author", "pub_date")
+
+
+class BulkReviewSerializer(ReviewSerializer):
+    """Serializer for reviews of bulk create, `title` - title id.
+    Titles & uniqueness are checked for the whole batch by the view.
+    """
+
+    title = serializers.IntegerField(source="title_id")
+
+    class Meta(ReviewSerializer.Meta):
+        fields = ("id", "title", "text", "author", "score", "pub_date")
+
+    def validate(self, attrs):
+        return attrs
+
+
+class BulkCommentSerializer(CommentSerializer):
+    """Serializer for comments of bulk create, `review` - review id."""
+
+    review = serializers.IntegerField(source="review_id")
+
+    class Meta(CommentSerializer.Meta):
+        fields = ("id", "review", "text", "author", "pub_date")
+
+
+class BatchItemSerializer(serializers.Serializer):
+    """Serializer for a sub-request of a batch."""
+
+    method = serializers.ChoiceField(
+        choices=("GET", "POST", "PUT", "PATCH", "DELETE"), default="GET"
+    )
+    url = serializers.RegexField(r"^/")
+    body = serializers.JSONField(required=False)
+    headers = serializers.DictField(
+        child=serializers.CharField(), required=False
+    )
+
+
+class BatchSerializer(serializers.Serializer):
+    """Serializer for batch of sub-requests.
+    `parallel` - run consecutive GETs concurrently.
+    """
+
+    max_requests = 20
+
+    requests = BatchItemSerializer(many=True)
+    parallel = serializers.BooleanField(default=False)
+
+    def validate_requests(self, value):
+        if not value:
+            raise serializers.ValidationError("Передайте хотя бы один запрос.")
+        if len(value) > self.max_requests:
+            raise serializers.ValidationError(
+                f"Не больше {self.max_requests} запросов в пакете."
+            )
+        return value
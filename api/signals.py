@@ -0,0 +1,104 @@
+from django.apps import apps
+from django.core.cache import cache
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete, pre_save)
+from django.dispatch import receiver
+
+from api.authentication import get_user_cache_key
+from api.cache import bump_generation
+from api.models import ChangeLog
+from reviews.models import (Category, Comment, Genre, GenreTitle, Review,
+                            Title, User, ratings_updated)
+
+
+def bump_generation_on_write(sender, instance, **kwargs):
+    """Invalidate cached counts & responses built from `reviews` models.
+    For M2M changes both sides of the relation are invalidated.
+    """
+    action = kwargs.get("action")
+    if action is not None and not action.startswith("post_"):
+        return
+    models = [type(instance)]
+    if action is not None:
+        models.append(kwargs["model"])
+    bump_generation(*(model._meta.label_lower for model in models))
+
+
+for model in apps.get_app_config("reviews").get_models():
+    post_save.connect(bump_generation_on_write, sender=model)
+    post_delete.connect(bump_generation_on_write, sender=model)
+    for field in model._meta.local_many_to_many:
+        m2m_changed.connect(
+            bump_generation_on_write, sender=field.remote_field.through
+        )
+
+
+@receiver(ratings_updated)
+def bump_generation_on_ratings_update(sender, **kwargs):
+    """Invalidate titles after ratings were written with `update()`."""
+    bump_generation(sender._meta.label_lower)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def drop_cached_user(sender, instance, **kwargs):
+    """Forget user snapshot of `CachedJWTAuthentication`."""
+    cache.delete(get_user_cache_key(instance.pk))
+
+
+def record_change(sender, instance, **kwargs):
+    """Log writes of catalog objects for `/changes/`, deletes as
+    tombstones.
+    """
+    ChangeLog.objects.using(kwargs.get("using")).record(
+        [instance], deleted="created" not in kwargs
+    )
+
+
+# Explicit senders keep other models out and their deletes fast.
+for model in (Category, Genre, Title, GenreTitle, Review, Comment):
+    post_save.connect(record_change, sender=model)
+    post_delete.connect(record_change, sender=model)
+
+
+@receiver(m2m_changed, sender=Title.genre.through)
+def record_genre_change(sender, instance, action, reverse, pk_set, **kwargs):
+    """Log titles whose genres were changed."""
+    if not action.startswith("post_"):
+        return
+    titles = (pk_set or ()) if reverse else [instance.pk]
+    ChangeLog.objects.using(kwargs.get("using")).record_changes(
+        ("title", str(pk), False) for pk in titles
+    )
+
+
+@receiver(pre_delete, sender=Category)
+def record_category_delete(sender, instance, **kwargs):
+    """Log titles losing the category, they are updated without signals."""
+    titles = Title.objects.using(kwargs.get("using")).filter(
+        category=instance
+    ).values_list("pk", flat=True)
+    ChangeLog.objects.using(kwargs.get("using")).record_changes(
+        ("title", str(pk), False) for pk in titles
+    )
+
+
+@receiver(pre_save, sender=Category)
+@receiver(pre_save, sender=Genre)
+def remember_slug(sender, instance, **kwargs):
+    """Keep slug before save, objects are logged by slug."""
+    if instance.pk is not None:
+        instance._saved_slug = sender.objects.using(
+            kwargs.get("using")
+        ).filter(pk=instance.pk).values_list("slug", flat=True).first()
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_save, sender=Genre)
+def record_slug_rename(sender, instance, **kwargs):
+    """Log renamed slug as a tombstone of the old key."""
+    saved_slug = instance.__dict__.pop("_saved_slug", None)
+    if saved_slug is not None and saved_slug != instance.slug:
+        ChangeLog.objects.using(kwargs.get("using")).record_changes(
+            [(sender._meta.model_name, saved_slug, True)]
+        )
@@ -0,0 +1,119 @@
+"""Opt-in capture of slow SQL queries with their view & stack.
+
+`SlowQueryMiddleware` is off until `SLOW_QUERY_THRESHOLD` (ms) is set.
+Queries slower than it are collected during the request and saved to
+`SlowQuery` after the response is built, so capture doesn't run inside
+the request's own queries. On PostgreSQL a `SLOW_QUERY_EXPLAIN_RATE`
+share of slow SELECTs is run again under `EXPLAIN (ANALYZE, BUFFERS)`
+in a savepoint that is rolled back.
+"""
+import logging
+import os
+import random
+import time
+import traceback
+
+from django.conf import settings
+from django.db import DatabaseError, connection, transaction
+
+from api.models import SlowQuery
+
+STACK_DEPTH = 15
+
+logger = logging.getLogger(__name__)
+
+
+def get_stack():
+    """Return calls of project code leading to the current query."""
+    frames = [
+        frame for frame in traceback.extract_stack()
+        if frame.filename.startswith(settings.BASE_DIR)
+        and frame.filename != __file__
+        and os.sep + "site-packages" + os.sep not in frame.filename
+    ]
+    return "".join(traceback.format_list(frames[-STACK_DEPTH:]))
+
+
+def explain(sql, params):
+    """Return `EXPLAIN (ANALYZE, BUFFERS)` of SELECT on PostgreSQL."""
+    statement = sql.split(None, 1)[0].upper() if sql.strip() else ""
+    if connection.vendor != "postgresql":
+        return ""
+    if statement not in ("SELECT", "WITH"):
+        return ""
+    try:
+        with transaction.atomic():
+            transaction.set_rollback(True)
+            with connection.cursor() as cursor:
+                cursor.execute("EXPLAIN (ANALYZE, BUFFERS) " + sql, params)
+                return "\n".join(row[0] for row in cursor.fetchall())
+    except DatabaseError as error:
+        return f"EXPLAIN не выполнен: {error}"
+
+
+class SlowQueryCollector:
+    """`execute_wrapper` keeping queries slower than `threshold` ms."""
+
+    def __init__(self, request, threshold):
+        self.request = request
+        self.threshold = threshold
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = (time.perf_counter() - started) * 1000
+            if duration >= self.threshold:
+                self.queries.append((sql, params, many, duration, get_stack()))
+
+    def save(self):
+        match = getattr(self.request, "resolver_match", None)
+        view = match.view_name if match else "unmatched"
+        rate = getattr(settings, "SLOW_QUERY_EXPLAIN_RATE", 0)
+        SlowQuery.objects.bulk_create(
+            SlowQuery(
+                sql=sql,
+                duration=duration,
+                view=view[:100],
+                method=self.request.method,
+                path=self.request.path[:255],
+                stack=stack,
+                plan=(
+                    explain(sql, params)
+                    if not many and random.random() < rate else ""
+                ),
+            )
+            for sql, params, many, duration, stack in self.queries
+        )
+        SlowQuery.objects.trim(getattr(settings, "SLOW_QUERY_LIMIT", 1000))
+
+
+class SlowQueryMiddleware:
+    """Capture slow queries of requests, see module docstring."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        threshold = getattr(settings, "SLOW_QUERY_THRESHOLD", None)
+        if threshold is None:
+            return self.get_response(request)
+        collector = SlowQueryCollector(request, threshold)
+        try:
+            with connection.execute_wrapper(collector):
+                return self.get_response(request)
+        finally:
+            if collector.queries:
+                self.save(collector)
+
+    def save(self, collector):
+        """Save captured queries, logging a failure instead of raising it,
+        so it doesn't replace the response or the request's own error.
+        """
+        try:
+            with transaction.atomic():
+                collector.save()
+        except Exception:
+            logger.exception("Не удалось сохранить медленные запросы")
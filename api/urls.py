@@ -1,11 +1,13 @@
-from django.urls import path
+from django.urls import path, re_path
 from django.urls.conf import include
 from rest_framework.routers import DefaultRouter
 from rest_framework_simplejwt.views import TokenRefreshView
 
-from api.views import (CategoryViewSet, CommentViewSet, ConfirmationViewSet,
-                       GenreViewSet, RegistrationView, ReviewViewSet,
-                       TitleViewSet, UserViewSet)
+from api.views import (BatchView, CategoryViewSet, ChangesView,
+                       CommentBulkView, CommentViewSet, ConfirmationViewSet,
+                       ExportView, GenreViewSet, ProfileView, RegistrationView,
+                       ReviewBulkView, ReviewViewSet, TitleViewSet,
+                       UserViewSet)
 
 v1_router = DefaultRouter()
 
@@ -31,6 +33,22 @@ authpatterns = [
 ]
 
 urlpatterns = [
+    path("v1/batch/", BatchView.as_view(), name="batch"),
+    path("v1/changes/", ChangesView.as_view(), name="changes"),
+    path("v1/reviews/bulk/", ReviewBulkView.as_view(), name="reviews_bulk"),
+    path(
+        "v1/comments/bulk/", CommentBulkView.as_view(), name="comments_bulk"
+    ),
+    re_path(
+        r"^v1/export/(?P<resource>\w+)\.(?P<fmt>csv|ndjson)(?P<gz>\.gz)?$",
+        ExportView.as_view(),
+        name="export",
+    ),
+    re_path(
+        r"^v1/profiles/(?P<pk>\d+)\.(?P<fmt>prof|txt)$",
+        ProfileView.as_view(),
+        name="profile",
+    ),
     path("v1/", include(v1_router.urls)),
     path("v1/auth/", include(authpatterns)),
 ]
@@ -1,19 +1,32 @@
-from smtplib import SMTPException
-
-from django.core.mail import EmailMessage
-from django.db.models import Avg, ExpressionWrapper, Func, Q, fields
-from django.http import JsonResponse
+from django.db import transaction
+from django.db.models import Prefetch, Q
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
 from django.http import response as response_http
+from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import (filters, generics, mixins, pagination, permissions,
                             response, status, views, viewsets)
 from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.negotiation import BaseContentNegotiation
 from rest_framework_simplejwt.tokens import RefreshToken
 
-from api.filters import TitleFilter
+from api.batch import run_batch
+from api.bulk import BulkCreateView
+from api.cache import bump_generation
+from api.changes import get_changes_page
+from api.export import EXPORTS, FORMATS, stream_export
+from api.filters import TitleFilter, split_values
+from api.mixins import CachedResponseMixin, ConditionalGetMixin
+from api.models import ChangeLog, OutboxMessage, ProfileRecord
+from api.pagination import CachedCountPagination, KeysetPagination
 from api.permissions import (IsAdmin, IsAdminOrReadOnly,
                              OwnerAdminModeratorOrReadOnly)
-from api.serializers import (CategorySerializer, CommentSerializer,
-                             ConfirmationTokenSerializer, GenreSerializer,
+from api.serializers import (LATEST_REVIEWS_LIMIT, TITLE_EXPANSIONS,
+                             TITLE_FIELDS, BatchSerializer,
+                             BulkCommentSerializer, BulkReviewSerializer,
+                             CategorySerializer, CommentSerializer,
+                             ConfirmationTokenSerializer,
+                             FastReadTitleSerializer, GenreSerializer,
                              ReadTitleSerializer, RegistrationSerializer,
                              ReviewSerializer, UserSerializer,
                              WriteTitleSerializer)
@@ -49,7 +62,7 @@ class ConfirmationViewSet(views.APIView):
 
 
 class RegistrationView(generics.CreateAPIView):
-    """ "Create a new user and send a confirmation code
+    """ "Create a new user and queue a confirmation code
     message to the user's email using the 'send_mail' function
     """
 
@@ -58,23 +71,16 @@ class RegistrationView(generics.CreateAPIView):
     serializer_class = RegistrationSerializer
 
     def send_mail(self, user):
-        """Send confirmation_code to user"""
+        """Queue confirmation_code email, `send-outbox` delivers it"""
         confirmation_code = account_activation_token.make_token(user)
-        try:
-            message = (
-                f"{user.username} Пожалуйста, подтвердите свой адрес"
-                " электронной почты, чтобы"
-                "завершите регистрацию, используя"
-                f" токен: {confirmation_code}"
-            )
-            to_email = user.email
-            mail_subject = "Активируйте вашу учетную запись."
-            email = EmailMessage(mail_subject, message, to=[to_email])
-            email.send()
-        except Exception as e:
-            raise SMTPException(
-                f"Что-то пошло не так. Не могу отправить письмо: {e}",
-            )
+        message = (
+            f"{user.username} Пожалуйста, подтвердите свой адрес"
+            " электронной почты, чтобы"
+            "завершите регистрацию, используя"
+            f" токен: {confirmation_code}"
+        )
+        mail_subject = "Активируйте вашу учетную запись."
+        OutboxMessage.objects.enqueue(mail_subject, message, user.email)
 
     def create(self, request):
         serializer = RegistrationSerializer(data=request.data)
@@ -105,7 +111,7 @@ class UserViewSet(viewsets.ModelViewSet):
     lookup_field = "username"
     filter_backends = (filters.SearchFilter,)
     search_fields = ("username",)
-    pagination_class = pagination.LimitOffsetPagination
+    pagination_class = CachedCountPagination
 
     @action(
         detail=False,
@@ -130,13 +136,6 @@ class UserViewSet(viewsets.ModelViewSet):
         return response.Response(serializer.data, status=status.HTTP_200_OK)
 
 
-class Round(Func):
-    """Round query output to integer."""
-
-    function = "ROUND"
-    template = "%(function)s(%(expressions)s)"
-
-
 class CustomizedListCreateDestroyViewSet(
     mixins.ListModelMixin,
     mixins.CreateModelMixin,
@@ -156,63 +155,265 @@ class CustomizedListCreateDestroyViewSet(
     permission_classes = [IsAdminOrReadOnly]
 
 
-class CategoryViewSet(CustomizedListCreateDestroyViewSet):
+class CategoryViewSet(CachedResponseMixin,
+                      CustomizedListCreateDestroyViewSet):
     """Viewset for Categories."""
 
     queryset = Category.objects.all()
+    cache_dependencies = ("reviews.category",)
     serializer_class = CategorySerializer
 
 
-class GenreViewSet(CustomizedListCreateDestroyViewSet):
+class GenreViewSet(CachedResponseMixin, CustomizedListCreateDestroyViewSet):
     """Viewset for Genres."""
 
     queryset = Genre.objects.all()
+    cache_dependencies = ("reviews.genre",)
     serializer_class = GenreSerializer
 
 
-class TitleViewSet(viewsets.ModelViewSet):
-    """Viewset for Titles."""
+class TitleViewSet(CachedResponseMixin, ConditionalGetMixin,
+                   viewsets.ModelViewSet):
+    """Viewset for Titles.
+    Anonymous reads are cached until a title, genre, category
+    or review changes.
+    `?fields=id,name` - output fields, only their columns are selected.
+    `?expand=reviews` - embed latest reviews of every title.
+    """
 
-    queryset = Title.objects.prefetch_related("reviews").annotate(
-        rating=ExpressionWrapper(
-            Round(Avg("reviews__score")),
-            output_field=fields.IntegerField(),
-        )
+    queryset = Title.objects.select_related("category").prefetch_related(
+        "genre"
     )
-    ordering_fields = ("name",)
+    filter_backends = (DjangoFilterBackend, filters.OrderingFilter)
+    ordering_fields = ("name", "year", "rating")
     filterset_class = TitleFilter
-    pagination_class = pagination.LimitOffsetPagination
+    pagination_class = CachedCountPagination
     permission_classes = [IsAdminOrReadOnly]
+    # Max number of titles in one `bulk` request.
+    bulk_limit = 200
+    # Max number of titles in one bulk create or update.
+    bulk_write_limit = 5000
+    # Models rendered inside titles by `?expand=`.
+    expand_dependencies = {"reviews": ("reviews.review", "reviews.user")}
+
+    @property
+    def cache_dependencies(self):
+        return (
+            "reviews.title", "reviews.genre", "reviews.category",
+            "reviews.review",
+        ) + self.get_expand_dependencies()
+
+    @property
+    def etag_dependencies(self):
+        return (
+            "reviews.genre", "reviews.category"
+        ) + self.get_expand_dependencies()
+
+    def get_expand_dependencies(self):
+        return tuple(
+            label
+            for name in self.get_title_fields()
+            for label in self.expand_dependencies.get(name, ())
+        )
+
+    def get_title_fields(self):
+        """Return output fields for `?fields=` & `?expand=`,
+        ordered as in `ReadTitleSerializer`.
+        """
+        if hasattr(self, "_title_fields"):
+            return self._title_fields
+        params = self.request.query_params
+        fields = split_values(params.get("fields", "")) or TITLE_FIELDS
+        expand = split_values(params.get("expand", ""))
+        errors = {}
+        unknown = set(fields) - set(TITLE_FIELDS)
+        if unknown:
+            errors["fields"] = "Неизвестные поля: {}.".format(
+                ", ".join(sorted(unknown))
+            )
+        unknown = set(expand) - set(TITLE_EXPANSIONS)
+        if unknown:
+            errors["expand"] = "Неизвестные связи: {}.".format(
+                ", ".join(sorted(unknown))
+            )
+        if errors:
+            raise ValidationError(errors)
+        selected = set(fields) | set(expand)
+        self._title_fields = tuple(
+            name for name in TITLE_FIELDS + ("reviews",) if name in selected
+        )
+        return self._title_fields
+
+    def get_queryset(self):
+        """Select only columns & relations of requested fields
+        for `retrieve`, `list` is narrowed in `paginate_queryset`.
+        """
+        queryset = super().get_queryset()
+        if self.action != "retrieve":
+            return queryset
+        fields = self.get_title_fields()
+        columns = ["id"] + [
+            name for name in ("rating", "name", "year", "description")
+            if name in fields
+        ]
+        if "category" in fields:
+            columns += ["category__name", "category__slug"]
+        else:
+            queryset = queryset.select_related(None)
+        if "genre" not in fields:
+            queryset = queryset.prefetch_related(None)
+        if "reviews" in fields:
+            queryset = queryset.prefetch_related(Prefetch(
+                "reviews",
+                queryset=Review.objects.latest_per_title(
+                    LATEST_REVIEWS_LIMIT
+                ).select_related("author"),
+                to_attr="latest_reviews",
+            ))
+        return queryset.only(*columns)
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if self.action in ("list", "retrieve", "bulk"):
+            context["fields"] = self.get_title_fields()
+        return context
 
     def get_serializer_class(self):
         """Manage serializer.
-        `list`&`retreive` - ReadTitleSerializer.
+        `list` & `bulk` - FastReadTitleSerializer over `.values()` rows.
+        `retreive` - ReadTitleSerializer.
         For other actions - WriteTitleSerializer.
         """
-        if self.action == "retrieve" or self.action == "list":
+        if self.action == "list" or (
+            self.action == "bulk" and self.request.method == "GET"
+        ):
+            return FastReadTitleSerializer
+        if self.action == "retrieve":
             return ReadTitleSerializer
         return WriteTitleSerializer
 
+    def paginate_queryset(self, queryset):
+        """Paginate `list` as rows for FastReadTitleSerializer."""
+        if self.action == "list":
+            queryset = FastReadTitleSerializer.get_rows(
+                queryset, self.get_title_fields()
+            )
+        return super().paginate_queryset(queryset)
 
-class ReviewViewSet(viewsets.ModelViewSet):
+    def get_bulk_ids(self):
+        """Return unique ids from `?ids=1,2,3` in requested order."""
+        try:
+            ids = [int(pk) for pk in split_values(
+                self.request.query_params.get("ids", "")
+            )]
+        except ValueError:
+            raise ValidationError({"ids": "Неверный список id."})
+        ids = list(dict.fromkeys(ids))
+        if not ids:
+            raise ValidationError({"ids": "Передайте id произведений."})
+        if len(ids) > self.bulk_limit:
+            raise ValidationError(
+                {"ids": f"Не больше {self.bulk_limit} id за запрос."}
+            )
+        return ids
+
+    @action(detail=False, methods=["GET", "POST", "PATCH"], url_path="bulk")
+    def bulk(self, request):
+        """GET - titles by `?ids=` in requested order, one query per
+        relation, missing ids are listed in `missing`.
+        POST - create a list of titles, PATCH - update a list of titles
+        with `id`, both with bulk queries, responding as GET.
+        """
+        if request.method != "GET":
+            self.check_bulk_payload()
+        if request.method == "POST":
+            return self.bulk_write(WriteTitleSerializer(
+                data=request.data, many=True
+            ), status.HTTP_201_CREATED)
+        if request.method == "PATCH":
+            return self.bulk_write(WriteTitleSerializer(
+                self.get_bulk_instances(), data=request.data,
+                many=True, partial=True,
+            ), status.HTTP_200_OK)
+        return self.get_bulk_response(self.get_bulk_ids())
+
+    def get_bulk_response(self, ids, status_code=status.HTTP_200_OK):
+        rows = FastReadTitleSerializer.get_rows(
+            self.get_queryset().filter(pk__in=ids), self.get_title_fields()
+        )
+        found = {row["id"]: row for row in rows}
+        serializer = FastReadTitleSerializer(
+            [found[pk] for pk in ids if pk in found],
+            many=True,
+            context=self.get_serializer_context(),
+        )
+        return response.Response({
+            "results": serializer.data,
+            "missing": [pk for pk in ids if pk not in found],
+        }, status=status_code)
+
+    def check_bulk_payload(self):
+        data = self.request.data
+        if not isinstance(data, list) or len(data) > self.bulk_write_limit:
+            raise ValidationError({"non_field_errors": [
+                f"Ожидается список до {self.bulk_write_limit} объектов."
+            ]})
+
+    def get_bulk_instances(self):
+        """Return titles for `id` of every item of a bulk update."""
+        ids = [
+            item.get("id") if isinstance(item, dict) else None
+            for item in self.request.data
+        ]
+        if not all(isinstance(pk, int) for pk in ids):
+            raise ValidationError({"id": ["Укажите id каждого объекта."]})
+        if len(set(ids)) < len(ids):
+            raise ValidationError({"id": ["id не должны повторяться."]})
+        titles = Title.objects.in_bulk(ids)
+        missing = [pk for pk in ids if pk not in titles]
+        if missing:
+            raise ValidationError(
+                {"id": [f"Произведения не найдены: {missing}."]}
+            )
+        return [titles[pk] for pk in ids]
+
+    def bulk_write(self, serializer, status_code):
+        """Validate & save titles of a bulk write in one transaction."""
+        serializer.is_valid(raise_exception=True)
+        with transaction.atomic():
+            titles = serializer.save()
+            ChangeLog.objects.record(titles)
+        bump_generation("reviews.title", "reviews.genre")
+        return self.get_bulk_response(
+            [title.pk for title in titles], status_code
+        )
+
+
+class ReviewViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     """Viewset for reviews."""
 
     serializer_class = ReviewSerializer
-    pagination_class = pagination.LimitOffsetPagination
+    pagination_class = KeysetPagination
     permission_classes = (
         OwnerAdminModeratorOrReadOnly,
     )
+    etag_dependencies = ("reviews.user",)
+
+    def get_title(self):
+        """Return title from `title_id`, fetched once per request."""
+        if not hasattr(self, "_title"):
+            self._title = generics.get_object_or_404(
+                Title,
+                id=self.kwargs.get("title_id"),
+            )
+        return self._title
 
     def get_queryset(self):
         """Return queryset for ViewSet.
         Get particular title with `title_id`.
         Get all reviews for patricular title.
         """
-        title = generics.get_object_or_404(
-            Title,
-            id=self.kwargs.get("title_id"),
-        )
-        return title.reviews.select_related("author").all()
+        return self.get_title().reviews.select_related("author").all()
 
     def perform_create(self, serializer):
         """Creating review.
@@ -220,36 +421,215 @@ class ReviewViewSet(viewsets.ModelViewSet):
         Explicitly point review`s title.
         Explicitly point review`s author.
         """
-        title_id = self.kwargs.get("title_id")
-        title = generics.get_object_or_404(Title, id=title_id)
-        serializer.save(author=self.request.user, title=title)
+        serializer.save(author=self.request.user, title=self.get_title())
 
 
-class CommentViewSet(viewsets.ModelViewSet):
+class CommentViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     """Viewset for comments."""
 
     serializer_class = CommentSerializer
-    pagination_class = pagination.LimitOffsetPagination
+    pagination_class = KeysetPagination
     permission_classes = (
         OwnerAdminModeratorOrReadOnly,
     )
+    etag_dependencies = ("reviews.user",)
+
+    def get_review(self):
+        """Return review from `review_id`, fetched once per request."""
+        if not hasattr(self, "_review"):
+            self._review = generics.get_object_or_404(
+                Review,
+                id=self.kwargs.get("review_id"),
+            )
+        return self._review
 
     def get_queryset(self):
         """Return queryset for ViewSet.
         Get particular review with `review_id`.
         Get all comments for patricular review.
         """
-        review = generics.get_object_or_404(
-            Review,
-            id=self.kwargs.get("review_id"),
-        )
-        return review.comments.select_related("author").all()
+        return self.get_review().comments.select_related("author").all()
 
     def perform_create(self, serializer):
         """Creating comment.
         Explicitly point comment`s author.
         Explicitly point comment`s review.
         """
-        review_id = self.kwargs.get("review_id")
-        review = generics.get_object_or_404(Review, id=review_id)
-        serializer.save(author=self.request.user, review=review)
+        serializer.save(author=self.request.user, review=self.get_review())
+
+
+class ReviewBulkView(BulkCreateView):
+    """Create many reviews of the current user in one transaction.
+    Ratings of touched titles are rebuilt once for the batch.
+    """
+
+    serializer_class = BulkReviewSerializer
+    natural_key = ("author_id", "title_id")
+
+    def check_batch(self, valid):
+        title_ids = {data["title_id"] for data in valid.values()}
+        existing = set(
+            Title.objects.filter(pk__in=title_ids).values_list(
+                "pk", flat=True
+            )
+        )
+        reviewed = set(
+            Review.objects.filter(
+                author=self.request.user, title_id__in=existing
+            ).values_list("title_id", flat=True)
+        )
+        errors = {}
+        for index, data in valid.items():
+            if data["title_id"] not in existing:
+                errors[index] = {"title": ["Произведение не найдено."]}
+            elif data["title_id"] in reviewed:
+                errors[index] = {"non_field_errors": [
+                    "Автор может оставлять ревью на каждое произведение "
+                    "только один раз"
+                ]}
+            reviewed.add(data["title_id"])
+        return errors
+
+    def after_create(self, objects):
+        Title.objects.filter(
+            pk__in={review.title_id for review in objects}
+        ).rebuild_rating()
+        ChangeLog.objects.record(objects)
+        bump_generation("reviews.review", "reviews.title")
+
+
+class CommentBulkView(BulkCreateView):
+    """Create many comments of the current user in one transaction."""
+
+    serializer_class = BulkCommentSerializer
+
+    def check_batch(self, valid):
+        existing = set(
+            Review.objects.filter(
+                pk__in={data["review_id"] for data in valid.values()}
+            ).values_list("pk", flat=True)
+        )
+        return {
+            index: {"review": ["Отзыв не найден."]}
+            for index, data in valid.items()
+            if data["review_id"] not in existing
+        }
+
+    def after_create(self, objects):
+        ChangeLog.objects.record(objects)
+        bump_generation("reviews.comment")
+
+
+class BatchView(views.APIView):
+    """Run several API requests in one round trip.
+    Sub-requests are dispatched in-process through the URL router
+    with the caller's authentication, responses are returned in order.
+    Middleware is not run for sub-requests, see `api.batch`.
+    """
+
+    permission_classes = (permissions.AllowAny,)
+    max_workers = 4
+
+    def post(self, request):
+        serializer = BatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        results = run_batch(
+            request,
+            serializer.validated_data["requests"],
+            parallel=serializer.validated_data["parallel"],
+            max_workers=self.max_workers,
+            excluded_views=(BatchView,),
+        )
+        return response.Response({"responses": results})
+
+
+class FirstRendererNegotiation(BaseContentNegotiation):
+    """Ignore `Accept` of clients downloading files."""
+
+    def select_parser(self, request, parsers):
+        return parsers[0]
+
+    def select_renderer(self, request, renderers, format_suffix=None):
+        return renderers[0], renderers[0].media_type
+
+
+class ExportView(views.APIView):
+    """Stream a whole table as file.
+    `/export/titles.csv`, `/export/reviews.ndjson.gz` - resource,
+    format & optional gzip, rows are read in chunks with constant memory.
+    """
+
+    permission_classes = (IsAdmin,)
+    content_negotiation_class = FirstRendererNegotiation
+
+    def get(self, request, resource, fmt, gz=None):
+        if resource not in EXPORTS:
+            raise NotFound("Неизвестный ресурс.")
+        file_name = f"{resource}.{fmt}{gz or ''}"
+        response = StreamingHttpResponse(
+            stream_export(resource, fmt, compress=bool(gz)),
+            content_type="application/gzip" if gz else FORMATS[fmt],
+        )
+        response["Content-Disposition"] = (
+            f'attachment; filename="{file_name}"'
+        )
+        return response
+
+
+class ProfileView(views.APIView):
+    """Download request profile taken by `profiling.ProfilingMiddleware`.
+    `/profiles/<id>.prof` - cProfile data for `pstats` or snakeviz,
+    `/profiles/<id>.txt` - collapsed stacks for flamegraph tools.
+    """
+
+    permission_classes = (IsAdmin,)
+    content_negotiation_class = FirstRendererNegotiation
+
+    def get(self, request, pk, fmt):
+        record = ProfileRecord.objects.filter(pk=pk).first()
+        if record is None:
+            raise NotFound("Профиль не найден.")
+        if fmt == "prof":
+            response = HttpResponse(
+                bytes(record.stats), content_type="application/octet-stream"
+            )
+        else:
+            response = HttpResponse(
+                record.collapsed, content_type="text/plain; charset=utf-8"
+            )
+        response["Content-Disposition"] = (
+            f'attachment; filename="profile-{pk}.{fmt}"'
+        )
+        return response
+
+
+class ChangesView(views.APIView):
+    """Feed of catalog changes for incremental sync.
+    `?since=<cursor>` - return changes after cursor, `0` for all.
+    Deleted objects come as tombstones with `"deleted": true`.
+    The newest changes are held back, see `get_changes_page`.
+    """
+
+    permission_classes = (permissions.AllowAny,)
+    default_limit = 100
+    max_limit = 1000
+
+    def get(self, request):
+        try:
+            since = int(request.query_params.get("since", 0))
+        except ValueError:
+            raise ValidationError({"since": "Неверный курсор."})
+        try:
+            limit = int(request.query_params.get("limit", self.default_limit))
+        except ValueError:
+            raise ValidationError({"limit": "Неверный размер страницы."})
+        results, next_cursor, has_more = get_changes_page(
+            since,
+            min(max(limit, 1), self.max_limit),
+            {"request": request, "view": self},
+        )
+        return response.Response({
+            "next": next_cursor,
+            "has_more": has_more,
+            "results": results,
+        })
@@ -25,6 +25,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "api.metrics.MetricsMiddleware",
+    "api.slow_queries.SlowQueryMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -32,6 +34,7 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "api.profiling.ProfilingMiddleware",
 ]
 
 ROOT_URLCONF = "api_yamdb.urls"
@@ -112,7 +115,7 @@ REST_FRAMEWORK = {
     "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
     "PAGE_SIZE": 10,
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "api.authentication.CachedJWTAuthentication",
     ],
     "DEFAULT_FILTER_BACKENDS": ["django_filters.rest_framework.DjangoFilterBackend"],
 }
@@ -160,9 +163,15 @@ EMAIL_BACKEND = "django.core.mail.backends.filebased.EmailBackend"
 # EMAIL_FILE_PATH = os.path.join(BASE_DIR, "sent_emails")
 EMAIL_FILE_PATH = os.environ.get('EMAIL_FILE_PATH', default='/code/sent_emails/')
 
+# Кэш должен быть общим для всех воркеров gunicorn: локально файловый,
+# на сервере memcached или redis через CACHE_BACKEND и CACHE_LOCATION.
 CACHES = {
     "default": {
-        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "BACKEND": os.environ.get(
+            "CACHE_BACKEND",
+            default="django.core.cache.backends.filebased.FileBasedCache",
+        ),
+        "LOCATION": os.environ.get("CACHE_LOCATION", default="/tmp/yamdb_cache"),
     }
 }
 
@@ -175,3 +184,33 @@ SWAGGER_SETTINGS = {
         }
     }
 }
+
+# Метрики запросов для Prometheus на /metrics. Под gunicorn каждый воркер
+# сбрасывает свои метрики в файл в METRICS_MULTIPROC_DIR (не реже раза
+# в METRICS_FLUSH_INTERVAL секунд), /metrics складывает файлы всех воркеров.
+# Каталог нужно очищать при перезапуске сервиса.
+METRICS_MULTIPROC_DIR = os.environ.get("METRICS_MULTIPROC_DIR") or None
+METRICS_FLUSH_INTERVAL = 5
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN") or None
+
+# Запись медленных SQL-запросов в админку (модель SlowQuery). Выключена,
+# пока не задан порог SLOW_QUERY_THRESHOLD_MS. Доля SLOW_QUERY_EXPLAIN_RATE
+# медленных SELECT на PostgreSQL повторяется с EXPLAIN (ANALYZE, BUFFERS).
+SLOW_QUERY_THRESHOLD = (
+    float(os.environ["SLOW_QUERY_THRESHOLD_MS"])
+    if os.environ.get("SLOW_QUERY_THRESHOLD_MS") else None
+)
+SLOW_QUERY_EXPLAIN_RATE = float(
+    os.environ.get("SLOW_QUERY_EXPLAIN_RATE", default=0)
+)
+SLOW_QUERY_LIMIT = 1000
+
+# Профилирование отдельного запроса администратором: заголовок X-Profile: 1
+# или параметр ?profile=1. Хранятся последние PROFILE_LIMIT профилей.
+PROFILE_SAMPLE_INTERVAL = 0.005
+PROFILE_LIMIT = 50
+
+# Лента /api/v1/changes/ не отдаёт записи моложе этого числа секунд:
+# транзакции фиксируются не в порядке id записей журнала, и окно должно
+# быть дольше самой долгой пишущей транзакции.
+CHANGES_SAFETY_WINDOW = 5
@@ -0,0 +1,552 @@
+"""End-to-end load of the API by a recorded or synthetic request mix.
+
+Requests go through the WSGI application in-process, or to a running
+server with `--url`. Both modes use the configured database to prepare
+data, users and their JWT tokens, so the server must share it:
+
+    python -m benchmarks.bench_load run --requests 2000 -o before.json
+    python -m benchmarks.bench_load run --url http://localhost:8000 \\
+        --concurrency 8 --traffic traffic.jsonl -o after.json
+    python -m benchmarks.bench_load compare before.json after.json
+
+Synthetic mix `--mix browse=80,review=15,signup=5`: anonymous catalog
+browsing, reviews posted by benchmark users, signup followed by token.
+`--traffic` replays a JSON lines file instead, each line a request
+`{"method", "path", "body", "user"}` or a list of them run in order;
+`user` is `null`, `"user"` or `"admin"`.
+
+Reports p50/p95/p99 latency, throughput and SQL queries per request by
+endpoint. In `--url` mode queries are read from the server's `/metrics`
+by route, so `METRICS_MULTIPROC_DIR` must be set for several workers
+and `METRICS_TOKEN` must match the server's one.
+`compare` flags endpoints slower or making more queries than allowed
+and lists endpoints present in only one of the runs.
+"""
+import argparse
+import http.client
+import io
+import json
+import os
+import queue
+import random
+import re
+import sys
+import threading
+import time
+import urllib.parse
+from collections import Counter, defaultdict
+from itertools import product
+
+from benchmarks.common import percentile, setup_django
+
+USERS = 20
+BROWSE_PATHS = (
+    "/api/v1/titles/?page={page}",
+    "/api/v1/titles/{title}/",
+    "/api/v1/titles/{title}/reviews/",
+    "/api/v1/titles/?genre={genre}",
+    "/api/v1/genres/",
+    "/api/v1/categories/",
+)
+
+
+def parse_mix(value):
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        mix[name.strip()] = float(weight or 1)
+    unknown = set(mix) - set(SCENARIOS)
+    if unknown:
+        raise argparse.ArgumentTypeError(f"unknown scenarios: {unknown}")
+    return mix
+
+
+def browse(context, generator):
+    return [{
+        "method": "GET",
+        "path": generator.choice(BROWSE_PATHS).format(
+            page=generator.randint(1, context["pages"]),
+            title=generator.choice(context["titles"]),
+            genre=generator.choice(context["genres"]),
+        ),
+    }]
+
+
+def review(context, generator):
+    if not context["pairs"]:
+        return browse(context, generator)
+    username, title = context["pairs"].pop()
+    return [{
+        "method": "POST",
+        "path": f"/api/v1/titles/{title}/reviews/",
+        "body": {"text": "Отзыв из нагрузочного теста", "score": 7},
+        "user": username,
+    }]
+
+
+def signup(context, generator):
+    context["signups"] += 1
+    username = f"bench-{context['run']}-{context['signups']}"
+    return [
+        {
+            "method": "POST",
+            "path": "/api/v1/auth/signup/",
+            "body": {"username": username, "email": f"{username}@bench.fake"},
+        },
+        {
+            "method": "POST",
+            "path": "/api/v1/auth/token/",
+            "body": {"username": username},
+            "confirm": username,
+        },
+    ]
+
+
+SCENARIOS = {"browse": browse, "review": review, "signup": signup}
+
+
+def prepare(args):
+    """Fill catalog, create benchmark users, return scenario context."""
+    from django.conf import settings
+
+    from benchmarks.bench_serializers import fill_catalog
+    from reviews.models import Genre, Review, Title, User
+
+    fill_catalog(args.titles, 5000, args.seed)
+    users = [
+        User.objects.get_or_create(
+            username=f"bench-user-{number}",
+            defaults={"email": f"bench-user-{number}@bench.fake"},
+        )[0]
+        for number in range(USERS)
+    ]
+    users.append(User.objects.get_or_create(
+        username="bench-admin",
+        defaults={"email": "bench-admin@bench.fake", "role": "admin"},
+    )[0])
+    titles = list(Title.objects.values_list("id", flat=True)[:args.titles])
+    reviewed = set(Review.objects.filter(
+        author__in=users
+    ).values_list("author__username", "title_id"))
+    generator = random.Random(args.seed)
+    pairs = [
+        pair for pair in product(
+            (user.username for user in users[:USERS]), titles
+        )
+        if pair not in reviewed
+    ]
+    generator.shuffle(pairs)
+    return {
+        "run": int(time.time()),
+        "titles": titles,
+        "pages": max(1, len(titles) // settings.REST_FRAMEWORK["PAGE_SIZE"]),
+        "genres": list(Genre.objects.values_list("slug", flat=True)),
+        "pairs": pairs,
+        "signups": 0,
+        "users": {"user": users[0].username, "admin": users[-1].username},
+    }
+
+
+def build_sessions(args, context):
+    if args.traffic:
+        with open(args.traffic) as source:
+            lines = (json.loads(line) for line in source if line.strip())
+            return [
+                line if isinstance(line, list) else [line] for line in lines
+            ]
+    generator = random.Random(args.seed)
+    names = list(args.mix)
+    weights = [args.mix[name] for name in names]
+    sessions = []
+    count = 0
+    while count < args.requests:
+        name = generator.choices(names, weights)[0]
+        sessions.append(SCENARIOS[name](context, generator))
+        count += len(sessions[-1])
+    return sessions
+
+
+def get_endpoint(method, path):
+    from django.urls import Resolver404, resolve
+
+    try:
+        view_name = resolve(urllib.parse.urlsplit(path).path).view_name
+    except Resolver404:
+        view_name = "unmatched"
+    return f"{method} {view_name}"
+
+
+class Tokens:
+    """JWT access tokens of users by username, made once."""
+
+    def __init__(self, aliases):
+        self.aliases = aliases
+        self.tokens = {}
+        self.lock = threading.Lock()
+
+    def get(self, username):
+        from rest_framework_simplejwt.tokens import RefreshToken
+
+        from reviews.models import User
+
+        username = self.aliases.get(username, username)
+        with self.lock:
+            if username not in self.tokens:
+                self.tokens[username] = str(RefreshToken.for_user(
+                    User.objects.get(username=username)
+                ).access_token)
+            return self.tokens[username]
+
+
+def get_confirmation_code(username):
+    from reviews.models import User
+    from reviews.tokens import account_activation_token
+
+    return account_activation_token.make_token(
+        User.objects.get(username=username)
+    )
+
+
+class WSGIClient:
+    """Calls the WSGI application in-process, counts SQL queries."""
+
+    def __init__(self, url=None):
+        from django.core.wsgi import get_wsgi_application
+
+        self.application = get_wsgi_application()
+
+    def send(self, method, path, body, headers):
+        from django.db import connection
+
+        from api.metrics import QueryCounter
+
+        path, _, query = path.partition("?")
+        environ = {
+            "REQUEST_METHOD": method,
+            "PATH_INFO": path,
+            "QUERY_STRING": query,
+            "SERVER_NAME": "testserver",
+            "SERVER_PORT": "80",
+            "SERVER_PROTOCOL": "HTTP/1.1",
+            "CONTENT_TYPE": "application/json",
+            "CONTENT_LENGTH": str(len(body)),
+            "wsgi.input": io.BytesIO(body),
+            "wsgi.errors": sys.stderr,
+            "wsgi.url_scheme": "http",
+            "wsgi.version": (1, 0),
+            "wsgi.multithread": True,
+            "wsgi.multiprocess": False,
+            "wsgi.run_once": False,
+        }
+        for name, value in headers.items():
+            environ["HTTP_" + name.upper().replace("-", "_")] = value
+        statuses = []
+        counter = QueryCounter()
+        with connection.execute_wrapper(counter):
+            result = self.application(
+                environ, lambda status, headers: statuses.append(status)
+            )
+            try:
+                for _ in result:
+                    pass
+            finally:
+                if hasattr(result, "close"):
+                    result.close()
+        return int(statuses[0].split()[0]), counter.count
+
+    def close(self):
+        from django.db import connection
+
+        connection.close()
+
+
+class HTTPClient:
+    """Keep-alive HTTP connection to a running server."""
+
+    def __init__(self, url):
+        parts = urllib.parse.urlsplit(url)
+        connection_class = (
+            http.client.HTTPSConnection if parts.scheme == "https"
+            else http.client.HTTPConnection
+        )
+        self.connection = connection_class(parts.netloc, timeout=60)
+
+    def send(self, method, path, body, headers, retry=True):
+        try:
+            self.connection.request(method, path, body=body, headers={
+                "Content-Type": "application/json", **headers
+            })
+            response = self.connection.getresponse()
+            response.read()
+        except (ConnectionError, http.client.HTTPException):
+            # The server closed the keep-alive connection, reconnect.
+            self.connection.close()
+            if not retry:
+                raise
+            return self.send(method, path, body, headers, retry=False)
+        return response.status, None
+
+    def close(self):
+        from django.db import connection
+
+        self.connection.close()
+        connection.close()
+
+
+def worker(client, sessions, tokens, results):
+    try:
+        while True:
+            try:
+                session = sessions.get_nowait()
+            except queue.Empty:
+                return
+            run_session(client, session, tokens, results)
+    finally:
+        client.close()
+
+
+def run_session(client, session, tokens, results):
+    for request in session:
+        body = dict(request.get("body") or {})
+        if request.get("confirm"):
+            body["confirmation_code"] = get_confirmation_code(
+                request["confirm"]
+            )
+        headers = {}
+        if request.get("user"):
+            headers["Authorization"] = (
+                f"Bearer {tokens.get(request['user'])}"
+            )
+        started = time.perf_counter()
+        status, queries = client.send(
+            request["method"],
+            request["path"],
+            json.dumps(body).encode() if body else b"",
+            headers,
+        )
+        results.append((
+            get_endpoint(request["method"], request["path"]),
+            (time.perf_counter() - started) * 1000,
+            status,
+            queries,
+        ))
+
+
+def scrape_queries(url):
+    """Return `{route: [queries sum, requests]}` from server `/metrics`."""
+    client = HTTPClient(url)
+    headers = {}
+    if os.environ.get("METRICS_TOKEN"):
+        headers["Authorization"] = f"Bearer {os.environ['METRICS_TOKEN']}"
+    client.connection.request("GET", "/metrics", headers=headers)
+    response = client.connection.getresponse()
+    content = response.read().decode()
+    client.connection.close()
+    if response.status != 200:
+        raise SystemExit(
+            f"GET {url}/metrics returned {response.status}: set"
+            " METRICS_TOKEN to the server's token to count queries"
+        )
+    totals = defaultdict(lambda: [0.0, 0.0])
+    for kind, route, value in re.findall(
+        r'^yamdb_db_queries_per_request_(sum|count)\{route="([^"]*)"\} (\S+)$',
+        content,
+        re.MULTILINE,
+    ):
+        totals[route][kind == "count"] = float(value)
+    return totals
+
+
+def report(results, duration, server_queries=None):
+    grouped = defaultdict(list)
+    for endpoint, latency, status, queries in results:
+        grouped[endpoint].append((latency, status, queries))
+    endpoints = {}
+    for endpoint, rows in sorted(grouped.items()):
+        latencies = [latency for latency, status, queries in rows]
+        counted = [queries for latency, status, queries in rows
+                   if queries is not None]
+        if counted:
+            queries = sum(counted) / len(counted)
+        else:
+            route = endpoint.split(" ", 1)[1]
+            total, count = (server_queries or {}).get(route, (0, 0))
+            queries = total / count if count else None
+        endpoints[endpoint] = {
+            "requests": len(rows),
+            "statuses": dict(Counter(str(status) for _, status, _ in rows)),
+            "p50": percentile(latencies, 50),
+            "p95": percentile(latencies, 95),
+            "p99": percentile(latencies, 99),
+            "rps": len(rows) / duration,
+            "queries": queries,
+        }
+    latencies = [latency for _, latency, _, _ in results]
+    requests = sum(
+        row["requests"] for row in endpoints.values()
+        if row["queries"] is not None
+    )
+    return {
+        "duration": duration,
+        "total": {
+            "requests": len(results),
+            "p50": percentile(latencies, 50),
+            "p95": percentile(latencies, 95),
+            "p99": percentile(latencies, 99),
+            "rps": len(results) / duration,
+            "queries": sum(
+                row["queries"] * row["requests"] for row in endpoints.values()
+                if row["queries"] is not None
+            ) / requests if requests else None,
+        },
+        "endpoints": endpoints,
+    }
+
+
+def format_report(result):
+    lines = [
+        f"{'endpoint':<32} {'n':>6} {'p50 ms':>9} {'p95 ms':>9}"
+        f" {'p99 ms':>9} {'rps':>8} {'queries':>8}  statuses"
+    ]
+    rows = sorted(result["endpoints"].items()) + [("total", result["total"])]
+    for name, row in rows:
+        queries = row.get("queries")
+        lines.append(
+            f"{name:<32} {row['requests']:>6} {row['p50']:>9.2f}"
+            f" {row['p95']:>9.2f} {row['p99']:>9.2f} {row['rps']:>8.1f}"
+            f" {'-' if queries is None else f'{queries:.1f}':>8}"
+            f"  {row.get('statuses', '')}"
+        )
+    return "\n".join(lines)
+
+
+def run(args):
+    setup_django(args.settings)
+    context = prepare(args)
+    sessions = queue.Queue()
+    for session in build_sessions(args, context):
+        sessions.put(session)
+    tokens = Tokens(context["users"])
+    client_class = HTTPClient if args.url else WSGIClient
+    results = []
+    server_queries = scrape_queries(args.url) if args.url else None
+    threads = [
+        threading.Thread(target=worker, args=(
+            client_class(args.url), sessions, tokens, results
+        ))
+        for _ in range(args.concurrency)
+    ]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    duration = time.perf_counter() - started
+    if args.url:
+        after = scrape_queries(args.url)
+        server_queries = {
+            route: [total - server_queries[route][0],
+                    count - server_queries[route][1]]
+            for route, (total, count) in after.items()
+        }
+    result = report(results, duration, server_queries)
+    result["options"] = {
+        "url": args.url,
+        "concurrency": args.concurrency,
+        "traffic": args.traffic,
+        "mix": args.mix,
+        "seed": args.seed,
+    }
+    print(format_report(result))
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(result, output, indent=2)
+
+
+def compare(args):
+    """Print changes of `new` run against `base`, exit 1 on regressions."""
+    with open(args.base) as source:
+        base = json.load(source)
+    with open(args.new) as source:
+        new = json.load(source)
+    regressions = []
+    names = sorted(set(base["endpoints"]) | set(new["endpoints"]))
+    rows = [("total", base["total"], new["total"])] + [
+        (name, base["endpoints"].get(name), new["endpoints"].get(name))
+        for name in names
+    ]
+
+    def value(data, key, spec):
+        if data is None or data.get(key) is None:
+            return "-"
+        return format(data[key], spec)
+
+    print(f"{'endpoint':<32} {'p95 ms':>19} {'rps':>17} {'queries':>13}")
+    for name, old, row in rows:
+        flags = []
+        if old is None or row is None:
+            # Nothing to compare with, listed to keep coverage visible.
+            note = "only in " + ("new run" if old is None else "base run")
+        else:
+            if row["p95"] > old["p95"] * (1 + args.threshold / 100):
+                flags.append("p95")
+            if row["rps"] < old["rps"] * (1 - args.threshold / 100):
+                flags.append("rps")
+            if (
+                row.get("queries") is not None
+                and old.get("queries") is not None
+                and row["queries"] > old["queries"] + args.query_threshold
+            ):
+                flags.append("queries")
+            note = "REGRESSION: " + ", ".join(flags) if flags else ""
+        if flags:
+            regressions.append(name)
+        print(
+            f"{name:<32} {value(old, 'p95', '.2f'):>8}"
+            f" -> {value(row, 'p95', '.2f'):>8}"
+            f" {value(old, 'rps', '.1f'):>7} -> {value(row, 'rps', '.1f'):>7}"
+            f" {value(old, 'queries', '.1f'):>5}"
+            f" -> {value(row, 'queries', '.1f'):>5}"
+            f"  {note}"
+        )
+    if regressions:
+        raise SystemExit(f"{len(regressions)} regressions")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+    run_parser = commands.add_parser("run")
+    run_parser.add_argument("--url", help="running server, default in-process")
+    run_parser.add_argument("--traffic", help="JSON lines file to replay")
+    run_parser.add_argument(
+        "--mix", type=parse_mix,
+        default=parse_mix("browse=80,review=15,signup=5"),
+    )
+    run_parser.add_argument("--requests", type=int, default=1000)
+    run_parser.add_argument("--concurrency", type=int, default=1)
+    run_parser.add_argument("--titles", type=int, default=1000)
+    run_parser.add_argument("--seed", type=int, default=1)
+    run_parser.add_argument("--settings", default="api_yamdb.settings")
+    run_parser.add_argument("-o", "--output", help="save result as JSON")
+    run_parser.set_defaults(handler=run)
+    compare_parser = commands.add_parser("compare")
+    compare_parser.add_argument("base")
+    compare_parser.add_argument("new")
+    compare_parser.add_argument(
+        "--threshold", type=float, default=10,
+        help="allowed p95 & throughput change, percent",
+    )
+    compare_parser.add_argument(
+        "--query-threshold", type=float, default=0.5,
+        help="allowed growth of queries per request",
+    )
+    compare_parser.set_defaults(handler=compare)
+    args = parser.parse_args(argv)
+    args.handler(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""Latency of title search at scale.
+
+Fills the configured database with synthetic titles up to `--titles`
+(1M by default) and compares `?search=` with the old `name__contains`
+filter. Results are meaningful on PostgreSQL with migrations applied:
+
+    python -m benchmarks.bench_search --titles 1000000
+"""
+import argparse
+import random
+
+from benchmarks.common import measure, setup_django, summary
+
+WORDS = (
+    "побег любовь война мир тайна город ночь море дом звезда дорога"
+    " король сказка легенда охота остров письмо зима лето тень огонь"
+    " песня время память брат сестра отец сын путь небо солнце"
+).split()
+
+
+def fill_titles(count, batch_size, seed):
+    from reviews.models import Title
+
+    existing = Title.objects.count()
+    generator = random.Random(seed)
+    batch = []
+    for _ in range(existing, count):
+        batch.append(Title(
+            name=" ".join(generator.choices(WORDS, k=generator.randint(1, 4))),
+            description=" ".join(generator.choices(WORDS, k=12)),
+            year=generator.randint(1900, 2020),
+        ))
+        if len(batch) >= batch_size:
+            Title.objects.bulk_create(batch)
+            batch = []
+    if batch:
+        Title.objects.bulk_create(batch)
+    return max(count - existing, 0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--titles", type=int, default=1000000)
+    parser.add_argument("--batch-size", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument(
+        "--query", action="append",
+        help="search phrase, may be repeated",
+    )
+    args = parser.parse_args()
+    setup_django()
+
+    from django.db import connection
+
+    from api.search import search_titles
+    from reviews.models import Title
+
+    created = fill_titles(args.titles, args.batch_size, args.seed)
+    total = Title.objects.count()
+    print(f"{connection.vendor}: {total} titles ({created} created)")
+    for query in args.query or ["побег", "тайна острова", "звезда"]:
+        first_page = Title.objects.order_by("year")
+        print(summary(f"contains {query!r}", measure(
+            lambda: list(first_page.filter(name__contains=query)[:10]),
+            args.repeat,
+        )))
+        print(summary(f"search {query!r}", measure(
+            lambda: list(search_titles(Title.objects.all(), query)[:10]),
+            args.repeat,
+        )))
+
+
+if __name__ == "__main__":
+    main()
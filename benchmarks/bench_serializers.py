@@ -0,0 +1,90 @@
+"""CPU cost of serializing titles.
+
+Fills the configured database with synthetic titles up to `--titles`
+(10k by default), each with a category and a few genres, and compares
+`ReadTitleSerializer` with `FastReadTitleSerializer` on the same
+queryset, checking that the rendered JSON is identical:
+
+    python -m benchmarks.bench_serializers --titles 10000
+"""
+import argparse
+import random
+
+from benchmarks.common import measure, setup_django, summary
+
+GENRES = ("drama", "comedy", "thriller", "horror", "fantasy", "documentary")
+CATEGORIES = ("movie", "book", "music")
+
+
+def fill_catalog(count, batch_size, seed):
+    from reviews.models import Category, Genre, GenreTitle, Title
+
+    categories = [
+        Category.objects.get_or_create(name=slug, slug=slug)[0]
+        for slug in CATEGORIES
+    ]
+    genres = [
+        Genre.objects.get_or_create(name=slug, slug=slug)[0]
+        for slug in GENRES
+    ]
+    existing = Title.objects.count()
+    generator = random.Random(seed)
+    created = 0
+    while existing + created < count:
+        size = min(batch_size, count - existing - created)
+        Title.objects.bulk_create(
+            Title(
+                name=f"Произведение {existing + created + number}",
+                year=generator.randint(1900, 2020),
+                category=generator.choice(categories),
+            )
+            for number in range(size)
+        )
+        created += size
+    linked = GenreTitle.objects.values("title_id")
+    GenreTitle.objects.bulk_create(
+        GenreTitle(title_id=title_id, genre=genre)
+        for title_id in Title.objects.exclude(pk__in=linked).values_list(
+            "id", flat=True
+        ).iterator()
+        for genre in generator.sample(genres, generator.randint(1, 3))
+    )
+    return created
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--titles", type=int, default=10000)
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    setup_django()
+
+    from django.db import connection
+    from rest_framework.renderers import JSONRenderer
+
+    from api.serializers import FastReadTitleSerializer, ReadTitleSerializer
+    from reviews.models import Title
+
+    created = fill_catalog(args.titles, args.batch_size, args.seed)
+    queryset = Title.objects.select_related("category").prefetch_related(
+        "genre"
+    ).order_by("id")[:args.titles]
+    print(f"{connection.vendor}: {len(queryset)} titles ({created} created)")
+
+    def render(serializer_class):
+        return JSONRenderer().render(
+            serializer_class(queryset.all(), many=True).data
+        )
+
+    if render(ReadTitleSerializer) != render(FastReadTitleSerializer):
+        raise SystemExit("outputs differ")
+    for serializer_class in (ReadTitleSerializer, FastReadTitleSerializer):
+        print(summary(serializer_class.__name__, measure(
+            lambda: render(serializer_class), args.repeat
+        )))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+"""Helpers shared by benchmark scripts.
+
+Run benchmarks from the project root, e.g.
+`python -m benchmarks.bench_search --titles 1000000`.
+"""
+import os
+import statistics
+import time
+
+
+def setup_django(settings_module="api_yamdb.settings"):
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", settings_module)
+    import django
+
+    django.setup()
+
+
+def measure(function, repeat):
+    """Run `function` `repeat` times, return timings in milliseconds."""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+def percentile(values, percent):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, round(percent / 100 * (len(ordered) - 1)))
+    return ordered[index]
+
+
+def summary(name, timings):
+    return (
+        f"{name:<40} median {statistics.median(timings):9.2f} ms"
+        f"  p95 {percentile(timings, 95):9.2f} ms"
+        f"  min {min(timings):9.2f} ms"
+    )
@@ -21,12 +21,20 @@ class ReviewAdmin(admin.ModelAdmin):
     list_display = ('text', 'title', 'score')
 
 
+class GenreTitleInline(admin.TabularInline):
+    """Genres of a title, admin skips M2M fields with a custom through."""
+
+    model = models.GenreTitle
+    extra = 1
+
+
 @admin.register(models.Title)
 class TitleAdmin(admin.ModelAdmin):
     list_display = (
         "name", "year", "description", "category",
     )
     search_fields = ("name",)
+    inlines = (GenreTitleInline,)
     empty_value_display = '-empty-'
 
 
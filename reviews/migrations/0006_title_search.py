@@ -0,0 +1,52 @@
+from django.db import migrations
+
+try:
+    from django.contrib.postgres.operations import TrigramExtension
+except ImportError:
+    # psycopg2 is installed only with PostgreSQL, other backends
+    # don't need the extension.
+    TrigramExtension = None
+
+SEARCH_INDEXES = (
+    (
+        "CREATE INDEX IF NOT EXISTS title_search_idx ON reviews_title "
+        "USING GIN ((to_tsvector('russian', coalesce(name, '') || ' ' || "
+        "coalesce(description, ''))))",
+        "DROP INDEX IF EXISTS title_search_idx",
+    ),
+    (
+        "CREATE INDEX IF NOT EXISTS title_name_trgm_idx ON reviews_title "
+        "USING GIN (name gin_trgm_ops)",
+        "DROP INDEX IF EXISTS title_name_trgm_idx",
+    ),
+)
+
+
+def create_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for sql, _ in SEARCH_INDEXES:
+        schema_editor.execute(sql)
+
+
+def drop_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for _, sql in reversed(SEARCH_INDEXES):
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0005_updated_at'),
+    ]
+
+    # Creating pg_trgm needs a superuser before PostgreSQL 13 and
+    # the CREATE privilege on the database since then. Without it
+    # the extension has to be created by the database administrator
+    # before `migrate`, see README.
+    operations = [
+        *([TrigramExtension()] if TrigramExtension else []),
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
@@ -3,8 +3,11 @@ from datetime import datetime
 from django.contrib.auth.models import AbstractUser
 from django.contrib.auth.validators import UnicodeUsernameValidator
 from django.core.validators import MaxValueValidator, MinValueValidator
-from django.db import models
-from django.db.models import Q
+from django.db import models, transaction
+from django.db.models import (Count, ExpressionWrapper, F, OuterRef, Q,
+                              Subquery, Sum)
+from django.db.models.functions import Coalesce, Now, NullIf
+from django.dispatch import Signal
 
 
 class UserRole:
@@ -84,6 +87,11 @@ class Category(models.Model):
         unique=True,
     )
     slug = models.SlugField(max_length=50, unique=True)
+    updated_at = models.DateTimeField(
+        verbose_name="дата изменения",
+        auto_now=True,
+        db_index=True,
+    )
 
     class Meta:
         ordering = ["name"]
@@ -103,6 +111,11 @@ class Genre(models.Model):
         unique=True,
     )
     slug = models.SlugField(max_length=50, unique=True)
+    updated_at = models.DateTimeField(
+        verbose_name="дата изменения",
+        auto_now=True,
+        db_index=True,
+    )
 
     class Meta:
         ordering = ["name"]
@@ -113,8 +126,105 @@ class Genre(models.Model):
         return self.name[:30]
 
 
+def rating_expression(rating_sum, rating_count):
+    """Build SQL for a rounded average of the rating aggregates.
+
+    Integer arithmetic `(2 * sum + count) / (2 * count)` rounds half up
+    in the same way as `ROUND(AVG(score))` and gives NULL for titles
+    without reviews.
+    """
+    return ExpressionWrapper(
+        (rating_sum * 2 + rating_count) / NullIf(rating_count * 2, 0),
+        output_field=models.IntegerField(),
+    )
+
+
+# Sent with `using` after stored ratings of titles were changed.
+ratings_updated = Signal()
+
+
+class TitleQuerySet(models.QuerySet):
+    """Queryset with helpers maintaining persisted title ratings.
+    Ratings are written by `update()` without `post_save`, so both
+    helpers send `ratings_updated` instead.
+    """
+
+    def update_rating(self, score_delta, count_delta):
+        """Shift rating aggregates of selected titles in one UPDATE."""
+        rating_sum = F("rating_sum") + score_delta
+        rating_count = F("rating_count") + count_delta
+        try:
+            return self.update(
+                rating_sum=rating_sum,
+                rating_count=rating_count,
+                rating=rating_expression(rating_sum, rating_count),
+                updated_at=Now(),
+            )
+        finally:
+            ratings_updated.send(sender=self.model, using=self.db)
+
+    def with_actual_rating(self):
+        """Annotate `actual_sum` & `actual_count` calculated by reviews."""
+        reviews = Review.objects.filter(
+            title=OuterRef("pk")
+        ).order_by().values("title")
+        return self.annotate(
+            actual_sum=Coalesce(
+                Subquery(reviews.annotate(total=Sum("score")).values("total")),
+                0,
+            ),
+            actual_count=Coalesce(
+                Subquery(reviews.annotate(total=Count("id")).values("total")),
+                0,
+            ),
+        )
+
+    def inconsistent_rating(self):
+        """Return titles whose stored aggregates differ from reviews."""
+        return self.with_actual_rating().exclude(
+            rating_sum=F("actual_sum"),
+            rating_count=F("actual_count"),
+        )
+
+    def rebuild_rating(self):
+        """Recalculate rating aggregates of selected titles from reviews."""
+        try:
+            with transaction.atomic(using=self.db):
+                self.with_actual_rating().update(
+                    rating_sum=F("actual_sum"),
+                    rating_count=F("actual_count"),
+                )
+                return self.update(
+                    rating=rating_expression(
+                        F("rating_sum"), F("rating_count")
+                    ),
+                    updated_at=Now(),
+                )
+        finally:
+            ratings_updated.send(sender=self.model, using=self.db)
+
+
+class ReviewQuerySet(models.QuerySet):
+    """Queryset of reviews."""
+
+    def latest_per_title(self, limit):
+        """Keep at most `limit` newest reviews of every title.
+        Bounded by a correlated subquery over the `(title, pub_date, id)`
+        index, so any number of titles is served by one query.
+        """
+        latest = self.model.objects.filter(
+            title_id=OuterRef("title_id")
+        ).order_by("-pub_date", "-id").values("id")[:limit]
+        return self.filter(pk__in=Subquery(latest)).order_by(
+            "-pub_date", "-id"
+        )
+
+
 class Title(models.Model):
-    """Model for titles."""
+    """Model for titles.
+    `rating_sum`, `rating_count` & `rating` are maintained by
+    `reviews.signals` on every review change.
+    """
 
     name = models.CharField(
         verbose_name="название произведения",
@@ -142,7 +252,7 @@ class Title(models.Model):
         Genre,
         related_name='titles',  # added new
         verbose_name="жанр произведения",
-        # through="GenreTitle",
+        through="GenreTitle",
         blank=True,
     )
     category = models.ForeignKey(
@@ -152,20 +262,69 @@ class Title(models.Model):
         related_name="titles",
         null=True,
     )
+    rating_sum = models.PositiveIntegerField(
+        verbose_name="сумма оценок",
+        default=0,
+        editable=False,
+    )
+    rating_count = models.PositiveIntegerField(
+        verbose_name="количество оценок",
+        default=0,
+        editable=False,
+    )
+    rating = models.PositiveSmallIntegerField(
+        verbose_name="рейтинг произведения",
+        null=True,
+        blank=True,
+        editable=False,
+        db_index=True,
+    )
+    updated_at = models.DateTimeField(
+        verbose_name="дата изменения",
+        auto_now=True,
+        db_index=True,
+    )
+
+    objects = TitleQuerySet.as_manager()
 
     class Meta:
         verbose_name = "произведение"
         verbose_name_plural = "произведения"
         ordering = ['year']
+        indexes = [
+            models.Index(
+                fields=("category", "year"),
+                name="title_category_year_idx",
+            ),
+        ]
 
     def __str__(self):
         return self.name
 
-# class GenreTitle(models.Model):
-#     """Through this model Genre and Title models ale linked."""
 
-#     title = models.ForeignKey(Title, on_delete=models.CASCADE)
-#     genre = models.ForeignKey(Genre, on_delete=models.CASCADE)
+class GenreTitle(models.Model):
+    """Through this model Genre and Title models are linked.
+    Keeps the table of the former implicit M2M and adds
+    `(genre_id, title_id)` index for filtering titles by genre.
+    """
+
+    title = models.ForeignKey(Title, on_delete=models.CASCADE)
+    genre = models.ForeignKey(Genre, on_delete=models.CASCADE)
+
+    class Meta:
+        db_table = "reviews_title_genre"
+        verbose_name = "жанр произведения"
+        verbose_name_plural = "жанры произведений"
+        unique_together = ("title", "genre")
+        indexes = [
+            models.Index(
+                fields=("genre", "title"),
+                name="genre_title_genre_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.title_id}: {self.genre_id}"
 
 
 class Review(models.Model):
@@ -206,10 +365,23 @@ class Review(models.Model):
         db_index=True,
         auto_now_add=True,
     )
+    updated_at = models.DateTimeField(
+        verbose_name="дата изменения",
+        auto_now=True,
+        db_index=True,
+    )
+
+    objects = ReviewQuerySet.as_manager()
 
     class Meta:
         verbose_name = "Ревью"
         verbose_name_plural = "Ревью"
+        indexes = [
+            models.Index(
+                fields=("title", "pub_date", "id"),
+                name="review_title_pub_date_idx",
+            ),
+        ]
         constraints = [
             models.UniqueConstraint(
                 fields=("author", "title"),
@@ -220,6 +392,19 @@ class Review(models.Model):
     def __str__(self):
         return self.text[:50]
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """Remember stored title and score to apply rating deltas."""
+        instance = super().from_db(db, field_names, values)
+        if "title_id" in field_names and "score" in field_names:
+            instance._rating_state = (instance.title_id, instance.score)
+        return instance
+
+    def save(self, *args, **kwargs):
+        """Save review and title rating in one transaction."""
+        with transaction.atomic(using=kwargs.get("using")):
+            super().save(*args, **kwargs)
+
 
 class Comment(models.Model):
     """Model for comments.
@@ -246,11 +431,22 @@ class Comment(models.Model):
         db_index=True,
         auto_now_add=True,
     )
+    updated_at = models.DateTimeField(
+        verbose_name="дата изменения",
+        auto_now=True,
+        db_index=True,
+    )
 
     class Meta:
         verbose_name = "Комментарий"
         verbose_name_plural = "Комментарии"
         ordering = ['pub_date']
+        indexes = [
+            models.Index(
+                fields=("review", "pub_date", "id"),
+                name="comment_review_pub_date_idx",
+            ),
+        ]
 
     def __str__(self):
         return self.text[:30]
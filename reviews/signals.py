@@ -0,0 +1,41 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from reviews.models import Review, Title
+
+
+@receiver(post_save, sender=Review)
+def update_rating_on_review_save(sender, instance, created, **kwargs):
+    """Apply score delta of created or re-scored review to its title."""
+    current = (instance.title_id, instance.score)
+    previous = getattr(instance, "_rating_state", None)
+    titles = Title.objects.using(kwargs.get("using"))
+    if created:
+        titles.filter(pk=instance.title_id).update_rating(instance.score, 1)
+    elif previous is None:
+        titles.filter(pk=instance.title_id).rebuild_rating()
+    elif previous != current:
+        previous_title_id, previous_score = previous
+        if previous_title_id == instance.title_id:
+            titles.filter(pk=instance.title_id).update_rating(
+                instance.score - previous_score, 0
+            )
+        else:
+            titles.filter(pk=previous_title_id).update_rating(
+                -previous_score, -1
+            )
+            titles.filter(pk=instance.title_id).update_rating(
+                instance.score, 1
+            )
+    instance._rating_state = current
+
+
+@receiver(post_delete, sender=Review)
+def update_rating_on_review_delete(sender, instance, **kwargs):
+    """Remove score of deleted review, including cascade deletes."""
+    title_id, score = getattr(
+        instance, "_rating_state", (instance.title_id, instance.score)
+    )
+    Title.objects.using(kwargs.get("using")).filter(
+        pk=title_id
+    ).update_rating(-score, -1)
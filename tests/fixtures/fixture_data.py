@@ -0,0 +1,60 @@
+import pytest
+
+
+@pytest.fixture
+def category():
+    from reviews.models import Category
+
+    return Category.objects.create(name='Фильм', slug='movie')
+
+
+@pytest.fixture
+def genres():
+    from reviews.models import Genre
+
+    return [
+        Genre.objects.create(name='Драма', slug='drama'),
+        Genre.objects.create(name='Комедия', slug='comedy'),
+    ]
+
+
+@pytest.fixture
+def titles(category, genres):
+    from reviews.models import Title
+
+    result = []
+    for number in range(3):
+        title = Title.objects.create(
+            name=f'Произведение {number}', year=2000 + number,
+            category=category
+        )
+        title.genre.set(genres[:number + 1])
+        result.append(title)
+    return result
+
+
+@pytest.fixture
+def title(titles):
+    return titles[0]
+
+
+@pytest.fixture
+def reviews(title, user, another_user):
+    from reviews.models import Review
+
+    return [
+        Review.objects.create(title=title, author=user, text='Да', score=7),
+        Review.objects.create(
+            title=title, author=another_user, text='Нет', score=4
+        ),
+    ]
+
+
+@pytest.fixture
+def comments(reviews, user, another_user):
+    from reviews.models import Comment
+
+    return [
+        Comment.objects.create(review=reviews[0], author=author, text='Ок')
+        for author in (user, another_user, user)
+    ]
@@ -0,0 +1,53 @@
+import pytest
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+
+def get_token_client(user):
+    client = APIClient()
+    token = RefreshToken.for_user(user).access_token
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+    return client
+
+
+@pytest.mark.django_db
+class TestCachedJWTAuthentication:
+
+    def test_user_not_queried_twice(self, admin, django_assert_num_queries):
+        client = get_token_client(admin)
+        client.get('/api/v1/users/me/')
+        # only count and page, without user lookup
+        with django_assert_num_queries(2):
+            response = client.get('/api/v1/users/')
+        assert response.status_code == 200
+
+    def test_me_without_queries(self, user, django_assert_num_queries):
+        client = get_token_client(user)
+        client.get('/api/v1/users/me/')
+        with django_assert_num_queries(0):
+            data = client.get('/api/v1/users/me/').json()
+        assert data['username'] == user.username, (
+            'Проверьте, что профиль отдаётся из снимка без запросов'
+        )
+
+    def test_deferred_fields_loaded(self, user):
+        client = get_token_client(user)
+        client.get('/api/v1/users/me/')
+        data = client.get('/api/v1/users/me/').json()
+        assert data['email'] == user.email, (
+            'Проверьте, что поля вне снимка пользователя загружаются'
+        )
+        response = client.patch('/api/v1/users/me/', {'bio': 'Обо мне'})
+        assert response.json()['bio'] == 'Обо мне'
+        user.refresh_from_db()
+        assert (user.bio, user.email) == ('Обо мне', 'testuser@yamdb.fake')
+
+    def test_role_change_invalidates(self, user, admin_client):
+        client = get_token_client(user)
+        assert client.get('/api/v1/users/').status_code == 403
+        admin_client.patch(
+            f'/api/v1/users/{user.username}/', {'role': 'admin'}
+        )
+        assert client.get('/api/v1/users/').status_code == 200, (
+            'Проверьте, что смена роли сбрасывает кэш пользователя'
+        )
@@ -0,0 +1,67 @@
+import pytest
+
+
+@pytest.mark.django_db
+class TestBatch:
+
+    url = '/api/v1/batch/'
+
+    def test_reads_in_one_round_trip(self, user_client, user, title):
+        response = user_client.post(self.url, {'requests': [
+            {'url': f'/api/v1/titles/{title.id}/?fields=id,name'},
+            {'url': f'/api/v1/titles/{title.id}/reviews/'},
+            {'url': '/api/v1/users/me/'},
+            {'url': '/api/v1/unknown/'},
+        ]}, format='json')
+        assert response.status_code == 200
+        results = response.json()['responses']
+        assert [result['status'] for result in results] == [
+            200, 200, 200, 404
+        ]
+        assert results[0]['body'] == {'id': title.id, 'name': title.name}
+        assert results[2]['body']['username'] == user.username, (
+            'Проверьте, что подзапросы выполняются от имени автора пакета'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_writes_run_in_order(self, user_client, title):
+        reviews_url = f'/api/v1/titles/{title.id}/reviews/'
+        response = user_client.post(self.url, {'parallel': True, 'requests': [
+            {'method': 'POST', 'url': reviews_url,
+             'body': {'text': 'Да', 'score': 8}},
+            {'url': reviews_url},
+            {'url': f'/api/v1/titles/{title.id}/'},
+        ]}, format='json')
+        results = response.json()['responses']
+        assert results[0]['status'] == 201
+        assert results[1]['body']['results'][0]['id'] == (
+            results[0]['body']['id']
+        )
+        assert results[2]['body']['rating'] == 8
+
+    def test_responses_are_rendered(self, user_client, title):
+        url = f'/api/v1/titles/{title.id}/'
+        response = user_client.post(self.url, {'requests': [
+            {'url': url},
+        ]}, format='json')
+        result = response.json()['responses'][0]
+        assert result['headers']['Content-Type'].startswith(
+            'application/json'
+        ), 'Проверьте, что ответы подзапросов отрисовываются'
+        assert result['body'] == user_client.get(url).json()
+
+    def test_anonymous_is_not_authenticated(self, client):
+        response = client.post(self.url, {'requests': [
+            {'url': '/api/v1/users/me/'},
+        ]}, format='json')
+        assert response.json()['responses'][0]['status'] == 401
+
+    def test_nested_batch_and_limits(self, client):
+        response = client.post(self.url, {'requests': [
+            {'method': 'POST', 'url': self.url, 'body': {'requests': []}},
+        ]}, format='json')
+        assert response.json()['responses'][0]['status'] == 400
+        response = client.post(self.url, {'requests': [
+            {'url': '/api/v1/genres/'}
+        ] * 21}, format='json')
+        assert response.status_code == 400
@@ -0,0 +1,103 @@
+import json
+
+import pytest
+
+from benchmarks import bench_load
+
+
+def write_result(path, endpoints):
+    row = {'requests': 10, 'p50': 5, 'p95': 10, 'p99': 12, 'rps': 100,
+           'queries': 3}
+    path.write_text(json.dumps({
+        'duration': 1,
+        'total': row,
+        'endpoints': {name: dict(row, **changes)
+                      for name, changes in endpoints.items()},
+    }))
+    return str(path)
+
+
+class TestCompare:
+
+    def test_regressions_and_unmatched(self, tmp_path, capsys):
+        base = write_result(tmp_path / 'base.json', {
+            'GET /api/v1/genres/': {},
+            'GET /api/v1/titles/': {},
+            'GET /api/v1/users/me/': {},
+        })
+        new = write_result(tmp_path / 'new.json', {
+            'GET /api/v1/genres/': {'p95': 20},
+            'GET /api/v1/titles/': {'queries': 5},
+            'POST /api/v1/auth/token/': {},
+        })
+        with pytest.raises(SystemExit, match='2 regressions'):
+            bench_load.main(['compare', base, new])
+        lines = capsys.readouterr().out.splitlines()
+
+        def line(name):
+            return next(line for line in lines if line.startswith(name))
+
+        assert 'REGRESSION: p95' in line('GET /api/v1/genres/')
+        assert 'REGRESSION: queries' in line('GET /api/v1/titles/')
+        assert 'only in base run' in line('GET /api/v1/users/me/'), (
+            'Проверьте, что выводятся адреса только из одного прогона'
+        )
+        assert 'only in new run' in line('POST /api/v1/auth/token/')
+
+    def test_no_regressions(self, tmp_path):
+        base = write_result(tmp_path / 'base.json', {'GET /api/v1/': {}})
+        new = write_result(tmp_path / 'new.json', {'GET /api/v1/': {}})
+        bench_load.main(['compare', base, new])
+
+
+@pytest.mark.django_db(transaction=True)
+class TestRun:
+
+    def test_in_process_smoke(self, tmp_path, capsys):
+        output = tmp_path / 'result.json'
+        bench_load.main([
+            'run', '--requests', '10', '--titles', '5',
+            '--settings', 'tests.settings_qa', '-o', str(output),
+        ])
+        result = json.loads(output.read_text())
+        assert result['total']['requests'] >= 10
+        assert result['endpoints'], 'Проверьте, что отчет содержит адреса'
+        assert not any(
+            status.startswith('5')
+            for row in result['endpoints'].values()
+            for status in row['statuses']
+        ), 'Проверьте, что сценарии выполняются без ошибок сервера'
+        assert all(
+            row['queries'] is not None for row in result['endpoints'].values()
+        ), 'Проверьте, что в процессе считаются SQL-запросы'
+        assert 'total' in capsys.readouterr().out
+
+
+class TestScrapeQueries:
+
+    def test_refused_metrics(self):
+        import threading
+        from http.server import BaseHTTPRequestHandler, HTTPServer
+
+        class Forbidden(BaseHTTPRequestHandler):
+
+            def do_GET(self):
+                self.send_response(403)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        server = HTTPServer(('127.0.0.1', 0), Forbidden)
+        thread = threading.Thread(target=server.serve_forever)
+        thread.start()
+        try:
+            with pytest.raises(SystemExit, match='403'):
+                bench_load.scrape_queries(
+                    f'http://127.0.0.1:{server.server_port}'
+                )
+        finally:
+            server.shutdown()
+            thread.join()
+            server.server_close()
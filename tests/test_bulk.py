@@ -0,0 +1,227 @@
+import pytest
+
+
+@pytest.mark.django_db
+class TestTitleBulk:
+
+    def test_order_and_missing(
+        self, client, titles, django_assert_num_queries
+    ):
+        ids = [titles[2].id, 999, titles[0].id, titles[2].id]
+        with django_assert_num_queries(2):
+            response = client.get(
+                '/api/v1/titles/bulk/?ids=' + ','.join(map(str, ids))
+            )
+        assert response.status_code == 200
+        data = response.json()
+        assert [item['id'] for item in data['results']] == [
+            titles[2].id, titles[0].id
+        ], 'Проверьте, что порядок id сохраняется'
+        assert data['missing'] == [999]
+
+    def test_same_as_detail(self, client, titles, reviews):
+        data = client.get(f'/api/v1/titles/bulk/?ids={titles[0].id}').json()
+        detail = client.get(f'/api/v1/titles/{titles[0].id}/').json()
+        assert data['results'] == [detail]
+
+    @pytest.mark.parametrize(
+        'ids', ['', '1,x', ','.join(map(str, range(201)))]
+    )
+    def test_invalid_ids(self, client, ids):
+        response = client.get(f'/api/v1/titles/bulk/?ids={ids}')
+        assert response.status_code == 400
+
+
+@pytest.mark.django_db
+class TestReviewBulkCreate:
+
+    url = '/api/v1/reviews/bulk/'
+
+    def test_create_with_item_results(self, user_client, user, titles,
+                                      django_assert_max_num_queries):
+        from reviews.models import Review, Title
+
+        Review.objects.create(
+            title=titles[2], author=user, text='Было', score=1
+        )
+        payload = [
+            {'title': titles[0].id, 'text': 'Да', 'score': 8},
+            {'title': titles[1].id, 'text': 'Да', 'score': 6},
+            {'title': titles[0].id, 'text': 'Опять', 'score': 1},
+            {'title': titles[2].id, 'text': 'Уже есть', 'score': 1},
+            {'title': 999, 'text': 'Нет', 'score': 1},
+            {'title': titles[1].id, 'text': 'Нет', 'score': 11},
+        ]
+        with django_assert_max_num_queries(13):
+            response = user_client.post(self.url, payload, format='json')
+        assert response.status_code == 207
+        results = response.json()
+        assert [result['status'] for result in results] == [
+            201, 201, 400, 400, 400, 400
+        ], 'Проверьте, что ошибки возвращаются для каждого объекта'
+        review = Review.objects.get(pk=results[0]['data']['id'])
+        assert (review.title_id, review.author, review.score) == (
+            titles[0].id, user, 8
+        )
+        assert results[1]['data']['author'] == user.username
+        assert Title.objects.get(pk=titles[0].id).rating == 8
+        assert not Title.objects.inconsistent_rating().exists()
+
+    def test_all_created(self, user_client, titles):
+        response = user_client.post(self.url, [
+            {'title': title.id, 'text': 'Да', 'score': 5} for title in titles
+        ], format='json')
+        assert response.status_code == 201
+        ids = [result['data']['id'] for result in response.json()]
+        assert len(set(ids)) == len(titles)
+
+    def test_concurrent_duplicate_reported_per_item(self, user_client, user,
+                                                    titles, monkeypatch):
+        from api.views import ReviewBulkView
+        from reviews.models import Review
+
+        check_batch = ReviewBulkView.check_batch
+        calls = []
+
+        def check_after_race(view, valid):
+            calls.append(valid)
+            if len(calls) == 1:
+                Review.objects.create(
+                    title=titles[0], author=user, text='Параллельно', score=2
+                )
+                return {}
+            return check_batch(view, valid)
+
+        monkeypatch.setattr(ReviewBulkView, 'check_batch', check_after_race)
+        response = user_client.post(self.url, [
+            {'title': titles[0].id, 'text': 'Да', 'score': 8},
+            {'title': titles[1].id, 'text': 'Да', 'score': 6},
+        ], format='json')
+        assert response.status_code == 207, (
+            'Проверьте, что конфликт с параллельной записью не даёт 500'
+        )
+        results = response.json()
+        assert [result['status'] for result in results] == [400, 201]
+        assert Review.objects.get(
+            pk=results[1]['data']['id']
+        ).title_id == titles[1].id
+
+    def test_requires_list_and_auth(self, client, user_client):
+        assert client.post(self.url, [], format='json').status_code == 401
+        response = user_client.post(self.url, {'title': 1}, format='json')
+        assert response.status_code == 400
+
+
+@pytest.mark.django_db
+class TestCommentBulkCreate:
+
+    def test_create(self, user_client, user, reviews):
+        from reviews.models import Comment
+
+        response = user_client.post('/api/v1/comments/bulk/', [
+            {'review': reviews[0].id, 'text': 'Первый'},
+            {'review': reviews[1].id, 'text': 'Второй'},
+            {'review': 999, 'text': 'Нет'},
+        ], format='json')
+        assert response.status_code == 207
+        results = response.json()
+        assert [result['status'] for result in results] == [201, 201, 400]
+        comment = Comment.objects.get(pk=results[1]['data']['id'])
+        assert (comment.review_id, comment.author, comment.text) == (
+            reviews[1].id, user, 'Второй'
+        )
+
+    def test_ids_with_higher_and_deleted_rows(self, user_client, user,
+                                              reviews):
+        from reviews.models import Comment
+
+        Comment.objects.create(
+            pk=500, review=reviews[0], author=user, text='Высокий'
+        )
+        Comment.objects.create(
+            pk=900, review=reviews[0], author=user, text='Удалённый'
+        ).delete()
+        response = user_client.post('/api/v1/comments/bulk/', [
+            {'review': reviews[0].id, 'text': f'Новый {number}'}
+            for number in range(3)
+        ], format='json')
+        for number, result in enumerate(response.json()):
+            assert Comment.objects.get(
+                pk=result['data']['id']
+            ).text == f'Новый {number}', (
+                'Проверьте, что id созданных объектов верные'
+            )
+
+
+@pytest.mark.django_db
+class TestTitleBulkWrite:
+
+    url = '/api/v1/titles/bulk/'
+
+    def test_create(self, admin_client, category, genres,
+                    django_assert_max_num_queries):
+        from reviews.models import Title
+
+        payload = [
+            {
+                'name': f'Новинка {number}', 'year': 1950 + number,
+                'category': category.slug,
+                'genre': [genre.slug for genre in genres[:number % 2 + 1]],
+            }
+            for number in range(50)
+        ]
+        with django_assert_max_num_queries(12):
+            response = admin_client.post(self.url, payload, format='json')
+        assert response.status_code == 201
+        results = response.json()['results']
+        assert [item['name'] for item in results] == [
+            item['name'] for item in payload
+        ]
+        title = Title.objects.get(name='Новинка 1')
+        assert set(title.genre.values_list('slug', flat=True)) == {
+            'comedy', 'drama'
+        }
+        assert results[1]['genre'] == [
+            {'name': 'Драма', 'slug': 'drama'},
+            {'name': 'Комедия', 'slug': 'comedy'},
+        ]
+
+    def test_invalid_items_create_nothing(self, admin_client, category):
+        from reviews.models import Title
+
+        response = admin_client.post(self.url, [
+            {'name': 'Да', 'category': category.slug, 'genre': []},
+            {'name': 'Нет', 'category': 'unknown', 'genre': ['unknown']},
+        ], format='json')
+        assert response.status_code == 400
+        errors = response.json()
+        assert errors[0] == {}
+        assert set(errors[1]) == {'category', 'genre'}
+        assert not Title.objects.exists()
+
+    def test_update(self, admin_client, titles, genres):
+        response = admin_client.patch(self.url, [
+            {'id': titles[0].id, 'name': 'Новое имя'},
+            {'id': titles[1].id, 'genre': [genres[1].slug]},
+        ], format='json')
+        assert response.status_code == 200
+        first, second = response.json()['results']
+        assert first['name'] == 'Новое имя'
+        assert [genre['slug'] for genre in first['genre']] == ['drama']
+        assert [genre['slug'] for genre in second['genre']] == ['comedy']
+        response = admin_client.patch(self.url, [{'id': 999}], format='json')
+        assert response.status_code == 400
+
+    def test_admin_only(self, user_client):
+        response = user_client.post(self.url, [], format='json')
+        assert response.status_code == 403
+
+    def test_single_create_resolves_genres_once(
+        self, admin_client, category, genres, django_assert_num_queries
+    ):
+        with django_assert_num_queries(9):
+            response = admin_client.post('/api/v1/titles/', {
+                'name': 'Одна', 'category': category.slug,
+                'genre': [genre.slug for genre in genres],
+            }, format='json')
+        assert response.status_code == 201
@@ -0,0 +1,125 @@
+import pytest
+from django.core.management import call_command
+
+
+@pytest.mark.django_db
+class TestChanges:
+
+    url = '/api/v1/changes/'
+
+    @pytest.fixture(autouse=True)
+    def no_safety_window(self, settings):
+        settings.CHANGES_SAFETY_WINDOW = 0
+
+    def get_feed(self, client, since=0, **params):
+        response = client.get(self.url, {'since': since, **params})
+        assert response.status_code == 200
+        return response.json()
+
+    def test_writes_are_logged(self, client, titles, reviews):
+        feed = self.get_feed(client)
+        changed = {(item['model'], item['key']) for item in feed['results']}
+        assert ('category', 'movie') in changed
+        assert ('genre', 'drama') in changed
+        assert ('title', str(titles[2].id)) in changed
+        assert ('review', str(reviews[0].id)) in changed
+        title = next(
+            item for item in feed['results']
+            if item['key'] == str(titles[0].id) and item['model'] == 'title'
+        )
+        assert title['data']['rating'] == 6, (
+            'Проверьте, что в ленте текущее состояние объекта'
+        )
+
+    def test_incremental_sync(self, client, titles, reviews):
+        cursor = self.get_feed(client)['next']
+        assert self.get_feed(client, cursor)['results'] == []
+        deleted = ('review', str(reviews[1].id))
+        reviews[1].delete()
+        feed = self.get_feed(client, cursor)
+        changes = {
+            (item['model'], item['key']): item for item in feed['results']
+        }
+        assert set(changes) == {deleted, ('title', str(titles[0].id))}
+        assert changes[deleted]['deleted'] is True
+        assert changes[deleted]['data'] is None
+        assert changes[('title', str(titles[0].id))]['data']['rating'] == 7
+
+    def test_genre_links_and_category_delete(self, client, titles, genres,
+                                             category):
+        cursor = self.get_feed(client)['next']
+        titles[0].genre.add(genres[1])
+        category.delete()
+        keys = [
+            (item['model'], item['key'], item['deleted'])
+            for item in self.get_feed(client, cursor)['results']
+        ]
+        assert ('category', 'movie', True) in keys
+        assert {key for model, key, _ in keys if model == 'title'} == {
+            str(title.id) for title in titles
+        }
+
+    def test_pages(self, client, titles, django_assert_max_num_queries):
+        with django_assert_max_num_queries(4):
+            feed = self.get_feed(client, limit=2)
+        assert feed['has_more'] is True
+        assert len(feed['results']) <= 2
+        assert client.get(self.url, {'since': 'x'}).status_code == 400
+        response = client.get(self.url, {'limit': 'x'})
+        assert response.status_code == 400
+        assert 'limit' in response.json()
+
+    def test_recent_changes_held_back(self, client, titles, settings):
+        cursor = self.get_feed(client)['next']
+        settings.CHANGES_SAFETY_WINDOW = 60
+        titles[0].save()
+        feed = self.get_feed(client, cursor)
+        assert feed['results'] == [] and feed['next'] == cursor, (
+            'Проверьте, что свежие записи журнала не отдаются до конца окна'
+        )
+        assert feed['has_more'] is False
+        settings.CHANGES_SAFETY_WINDOW = 0
+        assert self.get_feed(client, cursor)['results']
+
+    def test_slug_rename_tombstone(self, client, genres):
+        cursor = self.get_feed(client)['next']
+        genre = genres[0]
+        old_slug = genre.slug
+        genre.slug = 'renamed'
+        genre.save()
+        keys = {
+            (item['key'], item['deleted'])
+            for item in self.get_feed(client, cursor)['results']
+            if item['model'] == 'genre'
+        }
+        assert keys == {(old_slug, True), ('renamed', False)}, (
+            'Проверьте, что старый slug попадает в ленту как удалённый'
+        )
+
+    def test_bulk_writes_and_compaction(self, user_client, titles):
+        from api.models import ChangeLog
+
+        response = user_client.post('/api/v1/reviews/bulk/', [
+            {'title': title.id, 'text': 'Да', 'score': 5} for title in titles
+        ], format='json')
+        review_ids = {str(result['data']['id']) for result in response.json()}
+        assert review_ids <= set(
+            ChangeLog.objects.filter(model='review').values_list(
+                'key', flat=True
+            )
+        ), 'Проверьте, что массовые операции попадают в журнал'
+        assert ChangeLog.objects.superseded().exists()
+        call_command('compact-changes')
+        assert not ChangeLog.objects.superseded().exists()
+
+    def test_only_catalog_is_logged(self, titles, django_assert_num_queries):
+        from api.models import ChangeLog, SlowQuery
+
+        ChangeLog.objects.all().delete()
+        SlowQuery.objects.create(sql='SELECT 1', duration=1, view='x',
+                                 method='GET', path='/')
+        assert not ChangeLog.objects.exists()
+        # One DELETE each, without fetching rows for signals.
+        with django_assert_num_queries(2):
+            ChangeLog.objects.all().delete()
+            SlowQuery.objects.all().delete()
@@ -0,0 +1,43 @@
+import pytest
+
+
+@pytest.mark.django_db
+class TestConditionalGet:
+
+    def test_title_not_modified(self, user_client, title,
+                                django_assert_num_queries):
+        url = f'/api/v1/titles/{title.id}/'
+        response = user_client.get(url)
+        etag = response['ETag']
+        assert response.has_header('Last-Modified')
+        with django_assert_num_queries(1):
+            response = user_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 304, (
+            'Проверьте, что при совпадении ETag возвращается 304'
+        )
+        response = user_client.get(
+            url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']
+        )
+        assert response.status_code == 304
+
+        title.name = 'Другое название'
+        title.save()
+        response = user_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200
+        assert response['ETag'] != etag
+
+    def test_anonymous_cached_list(self, client, titles):
+        etag = client.get('/api/v1/titles/')['ETag']
+        response = client.get('/api/v1/titles/', HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 304
+
+    def test_reviews_etag_changes(self, client, title, reviews):
+        url = f'/api/v1/titles/{title.id}/reviews/'
+        etag = client.get(url)['ETag']
+        assert client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 304
+        reviews[1].delete()
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200, (
+            'Проверьте, что ETag списка меняется при удалении объекта'
+        )
+        assert len(response.json()['results']) == 1
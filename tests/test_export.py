@@ -0,0 +1,58 @@
+import csv
+import gzip
+import io
+import json
+
+import pytest
+from django.core.management import call_command
+
+
+@pytest.mark.django_db
+class TestExport:
+
+    def get_content(self, client, url):
+        response = client.get(url)
+        assert response.status_code == 200
+        assert response.streaming, 'Проверьте, что выгрузка потоковая'
+        return b''.join(response.streaming_content)
+
+    def test_titles_csv(self, admin_client, titles):
+        content = self.get_content(admin_client, '/api/v1/export/titles.csv')
+        rows = list(csv.DictReader(io.StringIO(content.decode())))
+        assert [int(row['id']) for row in rows] == [
+            title.id for title in titles
+        ]
+        assert rows[1]['category'] == 'movie'
+        assert rows[1]['genre'] == 'comedy,drama'
+
+    def test_reviews_ndjson_gzip(self, admin_client, reviews):
+        response = admin_client.get('/api/v1/export/reviews.ndjson.gz')
+        assert response['Content-Type'] == 'application/gzip'
+        lines = gzip.decompress(
+            b''.join(response.streaming_content)
+        ).decode().splitlines()
+        records = [json.loads(line) for line in lines]
+        assert [record['id'] for record in records] == [
+            review.id for review in reviews
+        ]
+        assert records[0]['author'] == reviews[0].author.username
+
+    def test_queries_per_chunk(self, titles, django_assert_num_queries):
+        from api.export import stream_export
+
+        with django_assert_num_queries(3):
+            b''.join(stream_export('titles', 'ndjson', chunk_size=2))
+
+    def test_access(self, user_client, admin_client):
+        response = user_client.get('/api/v1/export/titles.csv')
+        assert response.status_code == 403
+        response = admin_client.get('/api/v1/export/users.csv')
+        assert response.status_code == 404
+
+    def test_command(self, tmp_path, comments):
+        path = tmp_path / 'comments.ndjson'
+        call_command(
+            'export-data', 'comments', '--format', 'ndjson', '-o', str(path)
+        )
+        lines = path.read_text().splitlines()
+        assert len(lines) == len(comments)
@@ -0,0 +1,51 @@
+import pytest
+
+
+@pytest.mark.django_db
+class TestTitleFilter:
+
+    def get_ids(self, client, query):
+        response = client.get(f'/api/v1/titles/?{query}')
+        assert response.status_code == 200
+        return sorted(item['id'] for item in response.json()['results'])
+
+    def test_genre_any_without_duplicates(self, client, titles):
+        ids = self.get_ids(client, 'genre=drama,comedy')
+        assert ids == sorted(title.id for title in titles), (
+            'Проверьте, что произведения с несколькими жанрами '
+            'не повторяются в выдаче'
+        )
+
+    def test_genre_exact_slug(self, client, titles):
+        assert self.get_ids(client, 'genre=dram') == []
+        assert self.get_ids(client, 'genre=comedy') == [
+            titles[1].id, titles[2].id
+        ]
+
+    def test_genre_all(self, client, titles):
+        ids = self.get_ids(client, 'genre=drama,comedy&genre_mode=all')
+        assert ids == [titles[1].id, titles[2].id]
+        assert self.get_ids(
+            client, 'genre=drama,unknown&genre_mode=all'
+        ) == [], 'Проверьте, что неизвестный жанр в режиме all не найден'
+
+    def test_multiple_categories(self, client, titles):
+        from reviews.models import Category
+
+        other = Category.objects.create(name='Книга', slug='book')
+        titles[0].category = other
+        titles[0].save()
+        assert self.get_ids(client, 'category=book') == [titles[0].id]
+        assert self.get_ids(client, 'category=book,movie') == sorted(
+            title.id for title in titles
+        )
+
+    def test_year_range(self, client, titles):
+        ids = self.get_ids(client, 'year__gte=2001&year__lte=2001')
+        assert ids == [titles[1].id]
+
+    def test_genre_filter_query_count(
+        self, client, titles, django_assert_max_num_queries
+    ):
+        with django_assert_max_num_queries(5):
+            client.get('/api/v1/titles/?genre=drama,comedy')
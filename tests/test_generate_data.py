@@ -0,0 +1,59 @@
+import pytest
+from django.core.management import call_command
+from django.db.models import Count
+
+
+def generate(seed=1):
+    call_command(
+        'generate-data', '--users', '40', '--titles', '30',
+        '--reviews', '300', '--comments', '500', '--seed', str(seed),
+        '--batch-size', '70',
+    )
+
+
+@pytest.mark.django_db(transaction=True)
+class TestGenerateData:
+
+    def test_volumes_and_skew(self):
+        from api.models import ChangeLog
+        from reviews.models import Comment, Review, Title, User
+
+        generate()
+        assert User.objects.count() == 40
+        assert Title.objects.count() == 30
+        assert Review.objects.count() == 300
+        assert Comment.objects.count() == 500
+        assert Title.genre.through.objects.count() >= 30
+        counts = sorted(Review.objects.values('title').annotate(
+            count=Count('id')
+        ).values_list('count', flat=True), reverse=True)
+        assert counts[0] > 4 * counts[len(counts) // 2], (
+            'Проверьте, что у популярных произведений больше отзывов'
+        )
+        assert not Title.objects.inconsistent_rating().exists(), (
+            'Проверьте, что после генерации пересчитывается рейтинг'
+        )
+        assert ChangeLog.objects.filter(model='comment').count() == 500
+
+    def test_same_seed_same_data(self):
+        from reviews.models import Comment, Review, Title, User
+
+        def snapshot():
+            return (
+                list(User.objects.order_by('pk').values_list('username')),
+                list(Review.objects.order_by('pk').values_list(
+                    'title_id', 'author_id', 'score', 'text'
+                )),
+                list(Comment.objects.order_by('pk').values_list(
+                    'review_id', 'author_id'
+                )),
+            )
+
+        generate()
+        first = snapshot()
+        User.objects.all().delete()
+        Title.objects.all().delete()
+        generate()
+        assert snapshot() == first, (
+            'Проверьте, что одинаковый seed даёт одинаковые данные'
+        )
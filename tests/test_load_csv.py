@@ -0,0 +1,113 @@
+import os
+
+import pytest
+from django.conf import settings
+from django.core.management import call_command
+
+DATA_DIR = os.path.join(settings.BASE_DIR, 'static', 'data')
+
+
+@pytest.mark.django_db(transaction=True)
+class TestLoadCsv:
+
+    def test_load_static_data(self):
+        from reviews.models import Comment, Review, Title
+
+        call_command('load-csv', DATA_DIR, '--batch-size', '7')
+        assert Title.objects.count() > 0
+        assert Title.genre.through.objects.count() > 0
+        assert Review.objects.count() > 0
+        assert Comment.objects.count() > 0
+        assert not Title.objects.inconsistent_rating().exists(), (
+            'Проверьте, что после загрузки пересчитывается рейтинг'
+        )
+        review = Review.objects.get(pk=1)
+        assert review.pub_date.year == 2019, (
+            'Проверьте, что дата публикации берётся из файла'
+        )
+
+    def test_bad_rows_reported(self, tmp_path, capsys):
+        from reviews.models import Genre
+
+        (tmp_path / 'genre.csv').write_text(
+            'id,name,slug\n1,Драма,drama\noops,Ужасы,horror\n'
+            '3,Комедия,comedy\n4,Ещё драма,drama\n',
+            encoding='utf-8',
+        )
+        call_command('load-csv', str(tmp_path))
+        assert set(Genre.objects.values_list('slug', flat=True)) == {
+            'drama', 'comedy'
+        }, 'Проверьте, что ошибка в строке не прерывает загрузку'
+        errors = capsys.readouterr().err
+        assert 'genre.csv:3:' in errors and 'genre.csv:5:' in errors
+
+    def test_upsert_applies_delta(self, tmp_path, capsys):
+        from reviews.models import Genre
+
+        (tmp_path / 'genre.csv').write_text(
+            'id,name,slug\n1,Драма,drama\n2,Комедия,comedy\n3,Ужасы,horror\n',
+            encoding='utf-8',
+        )
+        call_command('load-csv', str(tmp_path))
+        (tmp_path / 'genre.csv').write_text(
+            'id,name,slug,_deleted\n1,Драма,drama,\n2,Комедии,comedy,\n'
+            '3,Ужасы,horror,1\n4,Вестерн,western,\n',
+            encoding='utf-8',
+        )
+        call_command('load-csv', str(tmp_path), '--mode', 'upsert',
+                     '--dry-run')
+        assert '1 inserted, 1 updated, 1 unchanged, 1 deleted' in (
+            capsys.readouterr().out
+        )
+        assert Genre.objects.count() == 3, (
+            'Проверьте, что --dry-run ничего не меняет в базе'
+        )
+        call_command('load-csv', str(tmp_path), '--mode', 'upsert')
+        assert dict(Genre.objects.values_list('slug', 'name')) == {
+            'drama': 'Драма', 'comedy': 'Комедии', 'western': 'Вестерн'
+        }
+
+    def test_upsert_prune(self, capsys):
+        from reviews.models import Review, Title
+
+        call_command('load-csv', DATA_DIR)
+        capsys.readouterr()
+        call_command('load-csv', DATA_DIR, '--mode', 'upsert')
+        assert capsys.readouterr().out.count(' 0 inserted, 0 updated') == 7, (
+            'Проверьте, что повторная загрузка тех же данных ничего не меняет'
+        )
+        Title.objects.create(name='Лишнее')
+        call_command('load-csv', DATA_DIR, '--mode', 'upsert', '--prune')
+        assert not Title.objects.filter(name='Лишнее').exists()
+        assert Review.objects.count() > 0
+
+    @pytest.mark.parametrize('loader_class', ['TableLoader', 'UpsertLoader'])
+    def test_copy_errors_fall_back_to_rows(self, tmp_path, monkeypatch,
+                                           loader_class):
+        import sqlite3
+
+        from django.db.backends.sqlite3.base import SQLiteCursorWrapper
+
+        from api.management import loader
+        from reviews.models import Genre
+
+        def copy_expert(cursor, sql, buffer):
+            # Raised by the driver like psycopg2 does, not by Django.
+            raise sqlite3.IntegrityError('duplicate key value')
+
+        monkeypatch.setattr(
+            SQLiteCursorWrapper, 'copy_expert', copy_expert, raising=False
+        )
+        Genre.objects.create(id=1, name='Старый', slug='old')
+        path = tmp_path / 'genre.csv'
+        path.write_text(
+            'id,name,slug\n1,Драма,drama\n2,Комедия,comedy\n',
+            encoding='utf-8',
+        )
+        table_loader = getattr(loader, loader_class)()
+        table_loader.use_copy = True
+        report = table_loader.load(loader.GENRES, str(path))
+        assert [error.line for error in report.errors] == [2], (
+            'Проверьте, что ошибка COPY не прерывает загрузку'
+        )
+        assert Genre.objects.filter(slug='comedy').exists()
@@ -0,0 +1,123 @@
+import json
+import re
+
+import pytest
+
+from api import metrics
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    registry = metrics.Registry()
+    monkeypatch.setattr(metrics, 'registry', registry)
+    return registry
+
+
+def get_sample(content, line):
+    match = re.search(
+        '^' + re.escape(line) + r' (\S+)$', content, re.MULTILINE
+    )
+    assert match, f'Метрика {line} не найдена'
+    return float(match.group(1))
+
+
+def scrape(client):
+    return client.get(
+        '/metrics', HTTP_AUTHORIZATION='Bearer secret'
+    ).content.decode()
+
+
+@pytest.mark.django_db
+class TestMetrics:
+
+    @pytest.fixture(autouse=True)
+    def token(self, settings):
+        settings.METRICS_TOKEN = 'secret'
+
+    def test_request_metrics(self, client, titles, registry):
+        for _ in range(2):
+            assert client.get('/api/v1/titles/').status_code == 200
+        client.get('/api/v1/titles/999999/')
+        content = scrape(client)
+        route = 'route="titles-list"'
+        assert get_sample(
+            content,
+            f'yamdb_http_requests_total{{{route},method="GET",status="200"}}'
+        ) == 2
+        assert get_sample(
+            content,
+            'yamdb_http_requests_total'
+            '{route="titles-detail",method="GET",status="404"}'
+        ) == 1
+        assert get_sample(
+            content, f'yamdb_http_request_duration_seconds_count{{{route}}}'
+        ) == 2
+        assert get_sample(
+            content,
+            f'yamdb_http_request_duration_seconds_bucket{{{route},le="+Inf"}}'
+        ) == 2
+        assert get_sample(
+            content, f'yamdb_db_queries_per_request_sum{{{route}}}'
+        ) > 0, 'Проверьте, что считаются SQL-запросы'
+        assert get_sample(
+            content, f'yamdb_http_response_size_bytes_sum{{{route}}}'
+        ) > 0
+        assert '# TYPE yamdb_db_duration_seconds histogram' in content
+
+    def test_workers_are_merged(self, client, registry, settings, tmp_path):
+        settings.METRICS_MULTIPROC_DIR = str(tmp_path)
+        (tmp_path / 'worker-1.json').write_text(json.dumps({
+            'counters': [[
+                'yamdb_http_requests_total',
+                [['route', 'metrics'], ['method', 'GET'], ['status', 200]],
+                5,
+            ]],
+            'histograms': [],
+        }))
+        scrape(client)
+        content = scrape(client)
+        assert get_sample(
+            content,
+            'yamdb_http_requests_total'
+            '{route="metrics",method="GET",status="200"}'
+        ) == 6, 'Проверьте, что метрики воркеров складываются'
+        assert len(list(tmp_path.iterdir())) == 2
+
+    def test_token(self, client, registry):
+        assert client.get('/metrics').status_code == 403
+        response = client.get(
+            '/metrics', HTTP_AUTHORIZATION='Bearer secret'
+        )
+        assert response.status_code == 200
+        assert response['Content-Type'].startswith('text/plain')
+
+    def test_staff_only_without_token(self, client, registry, settings,
+                                      django_user_model):
+        settings.METRICS_TOKEN = None
+        assert client.get('/metrics').status_code == 403, (
+            'Без METRICS_TOKEN метрики доступны только персоналу'
+        )
+        client.force_login(django_user_model.objects.create_user(
+            username='staff', email='staff@yamdb.fake', is_staff=True
+        ))
+        assert client.get('/metrics').status_code == 200
+
+    def test_finished_threads_are_folded(self, registry):
+        import gc
+        import threading
+
+        def record():
+            registry.get_shard().inc('yamdb_http_requests_total', ())
+
+        for _ in range(20):
+            thread = threading.Thread(target=record)
+            thread.start()
+            thread.join()
+        del thread
+        gc.collect()
+        assert len(registry.shards) <= 1, (
+            'Проверьте, что шарды завершённых потоков не накапливаются'
+        )
+        assert registry.snapshot()['counters'] == [
+            ['yamdb_http_requests_total', (), 20]
+        ]
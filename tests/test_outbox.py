@@ -0,0 +1,57 @@
+import pytest
+from django.core import mail
+from django.core.management import call_command
+
+
+@pytest.mark.django_db(transaction=True)
+class TestOutbox:
+
+    def test_signup_queues_email(self, client):
+        from api.models import OutboxMessage, OutboxStatus
+
+        response = client.post(
+            '/api/v1/auth/signup/',
+            {'email': 'new@yamdb.fake', 'username': 'newbie'},
+        )
+        assert response.status_code == 200
+        assert len(mail.outbox) == 0, (
+            'Проверьте, что письмо не отправляется в запросе регистрации'
+        )
+        message = OutboxMessage.objects.get()
+        assert message.recipient == 'new@yamdb.fake'
+
+        call_command('send-outbox', '--once')
+        assert len(mail.outbox) == 1
+        assert mail.outbox[0].to == ['new@yamdb.fake']
+        message.refresh_from_db()
+        assert message.status == OutboxStatus.SENT
+
+    def test_failed_delivery_retried(self, settings):
+        from api.models import OutboxMessage, OutboxStatus
+
+        settings.EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+        settings.EMAIL_PORT = 1
+        message = OutboxMessage.objects.enqueue('Тема', 'Текст', 'a@b.ru')
+        call_command('send-outbox', '--once', '--max-attempts', '1')
+        message.refresh_from_db()
+        assert message.attempts == 1
+        assert message.status == OutboxStatus.FAILED
+        assert message.last_error
+
+    def test_workers_send_each_message_once(self):
+        from api.models import OutboxMessage, OutboxStatus
+
+        for number in range(30):
+            OutboxMessage.objects.enqueue(
+                'Тема', 'Текст', f'user{number}@yamdb.fake'
+            )
+        call_command(
+            'send-outbox', '--once', '--workers', '4', '--batch-size', '5'
+        )
+        recipients = [email.to[0] for email in mail.outbox]
+        assert len(recipients) == len(set(recipients)) == 30, (
+            'Проверьте, что воркеры не отправляют одно письмо дважды'
+        )
+        assert not OutboxMessage.objects.exclude(
+            status=OutboxStatus.SENT
+        ).exists()
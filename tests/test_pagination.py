@@ -0,0 +1,70 @@
+import pytest
+
+
+@pytest.mark.django_db
+class TestKeysetPagination:
+
+    def test_comments_cursor_pages(self, client, title, reviews, comments):
+        url = (
+            f'/api/v1/titles/{title.id}/reviews/{reviews[0].id}/comments/'
+            '?cursor=&limit=2'
+        )
+        response = client.get(url)
+        assert response.status_code == 200
+        data = response.json()
+        assert 'count' not in data, (
+            'Проверьте, что в режиме курсора не выполняется подсчёт записей'
+        )
+        ids = [item['id'] for item in data['results']]
+        response = client.get(data['next'])
+        data = response.json()
+        ids += [item['id'] for item in data['results']]
+        assert data['next'] is None
+        assert ids == [comment.id for comment in comments], (
+            'Проверьте, что курсорная пагинация возвращает все записи по порядку'
+        )
+
+    def test_limit_offset_still_available(self, client, title, reviews):
+        response = client.get(
+            f'/api/v1/titles/{title.id}/reviews/?limit=1&offset=1'
+        )
+        data = response.json()
+        assert data['count'] == len(reviews)
+        assert len(data['results']) == 1
+
+    def test_invalid_cursor(self, client, title, reviews):
+        response = client.get(f'/api/v1/titles/{title.id}/reviews/?cursor=xx')
+        assert response.status_code == 404
+
+
+@pytest.mark.django_db
+class TestCachedCountPagination:
+
+    def test_count_cached_until_write(self, user_client, titles, category,
+                                      django_assert_num_queries):
+        from reviews.models import Title
+
+        response = user_client.get('/api/v1/titles/')
+        data = response.json()
+        assert data['count'] == len(titles)
+        assert data['count_is_approximate'] is False
+        # validators, page, genres
+        with django_assert_num_queries(3):
+            user_client.get('/api/v1/titles/')
+        Title.objects.create(name='Новое', year=2020, category=category)
+        data = user_client.get('/api/v1/titles/').json()
+        assert data['count'] == len(titles) + 1, (
+            'Проверьте, что кэш количества сбрасывается при записи'
+        )
+
+    def test_count_follows_rating(self, user_client, user, titles):
+        from reviews.models import Review
+
+        url = '/api/v1/titles/?rating__gte=5'
+        assert user_client.get(url).json()['count'] == 0
+        Review.objects.create(
+            title=titles[0], author=user, text='Хорошо', score=9
+        )
+        assert user_client.get(url).json()['count'] == 1, (
+            'Проверьте, что кэш количества сбрасывается при смене рейтинга'
+        )
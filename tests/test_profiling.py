@@ -0,0 +1,51 @@
+import marshal
+
+import pytest
+
+from api.models import ProfileRecord
+
+
+@pytest.mark.django_db
+class TestProfiling:
+
+    def test_admin_request_is_profiled(self, admin_client, titles):
+        response = admin_client.get('/api/v1/titles/', HTTP_X_PROFILE='1')
+        assert response.status_code == 200
+        record = ProfileRecord.objects.get(pk=response['X-Profile-Id'])
+        assert record.view == 'titles-list'
+        assert record.status == 200
+        stats = marshal.loads(bytes(record.stats))
+        assert any(
+            function == 'get_serializer_class'
+            for path, line, function in stats
+        ), 'Проверьте, что сохраняются данные cProfile'
+        assert response['X-Profile-Url'].endswith(
+            f'/api/v1/profiles/{record.pk}.prof'
+        )
+
+    def test_query_flag(self, admin_client):
+        response = admin_client.get('/api/v1/genres/?profile=1')
+        assert 'X-Profile-Id' in response
+
+    def test_not_profiled(self, admin_client, user_client):
+        assert 'X-Profile-Id' not in admin_client.get('/api/v1/genres/')
+        response = user_client.get('/api/v1/genres/', HTTP_X_PROFILE='1')
+        assert response.status_code == 200
+        assert 'X-Profile-Id' not in response, (
+            'Профилировать запросы может только администратор'
+        )
+        assert not ProfileRecord.objects.exists()
+
+    def test_download(self, admin_client, user_client):
+        response = admin_client.get('/api/v1/genres/', HTTP_X_PROFILE='1')
+        pk = response['X-Profile-Id']
+        response = admin_client.get(f'/api/v1/profiles/{pk}.prof')
+        assert response.status_code == 200
+        assert marshal.loads(response.content)
+        response = admin_client.get(f'/api/v1/profiles/{pk}.txt')
+        assert response.status_code == 200
+        assert response['Content-Type'].startswith('text/plain')
+        assert user_client.get(
+            f'/api/v1/profiles/{pk}.prof'
+        ).status_code == 403
+        assert admin_client.get('/api/v1/profiles/0.txt').status_code == 404
@@ -0,0 +1,43 @@
+import pytest
+
+
+@pytest.mark.django_db
+class TestQueriesCount:
+    """Read endpoints must run a fixed number of queries per page."""
+
+    def test_titles(self, client, titles, reviews, django_assert_num_queries):
+        # validators, count, page, genres
+        with django_assert_num_queries(4):
+            response = client.get('/api/v1/titles/')
+        assert response.status_code == 200
+        assert response.json()['count'] == len(titles)
+        # validators, title, genres
+        with django_assert_num_queries(3):
+            client.get(f'/api/v1/titles/{titles[-1].id}/')
+
+    def test_categories(self, client, category, django_assert_num_queries):
+        with django_assert_num_queries(2):
+            assert client.get('/api/v1/categories/').status_code == 200
+
+    def test_genres(self, client, genres, django_assert_num_queries):
+        with django_assert_num_queries(2):
+            assert client.get('/api/v1/genres/').status_code == 200
+
+    def test_users(self, admin_client, user, another_user,
+                   django_assert_num_queries):
+        with django_assert_num_queries(2):
+            assert admin_client.get('/api/v1/users/').status_code == 200
+
+    def test_reviews(self, client, title, reviews, django_assert_num_queries):
+        # title, validators, count, page with authors
+        with django_assert_num_queries(4):
+            response = client.get(f'/api/v1/titles/{title.id}/reviews/')
+        assert len(response.json()['results']) == len(reviews)
+
+    def test_comments(self, client, title, reviews, comments,
+                      django_assert_num_queries):
+        url = f'/api/v1/titles/{title.id}/reviews/{reviews[0].id}/comments/'
+        # review, validators, count, page with authors
+        with django_assert_num_queries(4):
+            response = client.get(url)
+        assert len(response.json()['results']) == len(comments)
@@ -0,0 +1,51 @@
+import pytest
+
+
+@pytest.mark.django_db
+class TestResponseCache:
+
+    def test_anonymous_titles_cached(self, client, titles,
+                                     django_assert_num_queries):
+        first = client.get('/api/v1/titles/?limit=2&offset=0').json()
+        with django_assert_num_queries(0):
+            second = client.get('/api/v1/titles/?offset=0&limit=2').json()
+        assert first == second, (
+            'Проверьте, что кэш учитывает нормализованные параметры запроса'
+        )
+
+    def test_links_follow_host(self, client, titles):
+        url = '/api/v1/titles/?limit=1'
+        client.get(url, HTTP_HOST='one.example')
+        data = client.get(url, HTTP_HOST='two.example').json()
+        assert data['next'].startswith('http://two.example/'), (
+            'Проверьте, что кэш учитывает хост в ссылках пагинации'
+        )
+
+    def test_invalidated_by_writes(self, client, titles, genres, user):
+        from reviews.models import Review
+
+        client.get(f'/api/v1/titles/{titles[0].id}/')
+        genres[0].name = 'Трагедия'
+        genres[0].save()
+        data = client.get(f'/api/v1/titles/{titles[0].id}/').json()
+        assert data['genre'][0]['name'] == 'Трагедия'
+
+        Review.objects.create(title=titles[0], author=user, text='!', score=9)
+        data = client.get(f'/api/v1/titles/{titles[0].id}/').json()
+        assert data['rating'] == 9, (
+            'Проверьте, что кэш произведений сбрасывается при новом отзыве'
+        )
+
+    def test_categories_genres_cached(self, client, category, genres,
+                                      django_assert_num_queries):
+        client.get('/api/v1/categories/')
+        client.get('/api/v1/genres/')
+        with django_assert_num_queries(0):
+            client.get('/api/v1/categories/')
+            client.get('/api/v1/genres/')
+
+    def test_authenticated_not_cached(self, user_client, titles,
+                                      django_assert_num_queries):
+        user_client.get('/api/v1/titles/')
+        with django_assert_num_queries(3):
+            user_client.get('/api/v1/titles/')
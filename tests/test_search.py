@@ -0,0 +1,41 @@
+import pytest
+
+
+@pytest.mark.django_db
+class TestTitleSearch:
+
+    @pytest.fixture
+    def catalog(self, category):
+        from reviews.models import Title
+
+        return [
+            Title.objects.create(
+                name='Побег из Шоушенка', year=1994, category=category,
+                description='Тюремная драма о надежде'
+            ),
+            Title.objects.create(
+                name='Зелёная миля', year=1999, category=category,
+                description='Побег невозможен, драма'
+            ),
+            Title.objects.create(name='Крёстный отец', year=1972),
+        ]
+
+    def test_search_by_relevance(self, client, catalog):
+        response = client.get('/api/v1/titles/?search=побег')
+        ids = [item['id'] for item in response.json()['results']]
+        assert ids == [catalog[0].id, catalog[1].id], (
+            'Проверьте, что совпадение в названии важнее описания'
+        )
+
+    def test_search_all_words_and_prefix(self, client, catalog):
+        response = client.get('/api/v1/titles/?search=драм надежд')
+        ids = [item['id'] for item in response.json()['results']]
+        assert ids == [catalog[0].id]
+
+    def test_index_follows_writes(self, client, catalog):
+        from reviews.models import Title
+
+        assert client.get('/api/v1/titles/?search=Брат').json()['count'] == 0
+        title = Title.objects.create(name='Брат', year=1997)
+        results = client.get('/api/v1/titles/?search=брат').json()['results']
+        assert [item['id'] for item in results] == [title.id]
@@ -0,0 +1,121 @@
+import pytest
+from rest_framework.renderers import JSONRenderer
+
+
+@pytest.mark.django_db
+class TestFastReadTitleSerializer:
+
+    @pytest.fixture
+    def catalog(self, titles, reviews):
+        from reviews.models import Title
+
+        Title.objects.create(name='Без категории', description=None)
+        return Title.objects.select_related('category').prefetch_related(
+            'genre'
+        ).order_by('id')
+
+    def test_output_is_identical(self, catalog):
+        from api.serializers import (FastReadTitleSerializer,
+                                     ReadTitleSerializer)
+
+        expected = JSONRenderer().render(
+            ReadTitleSerializer(catalog, many=True).data
+        )
+        actual = JSONRenderer().render(
+            FastReadTitleSerializer(catalog, many=True).data
+        )
+        assert actual == expected, (
+            'Проверьте, что быстрый сериализатор выдает те же байты, '
+            'что и ReadTitleSerializer'
+        )
+
+    def test_descending_genre_ordering(self, catalog, monkeypatch):
+        from api.serializers import (FastReadTitleSerializer,
+                                     ReadTitleSerializer)
+        from reviews.models import Genre
+
+        monkeypatch.setattr(Genre._meta, 'ordering', ['-name'])
+        assert FastReadTitleSerializer(catalog, many=True).data == (
+            ReadTitleSerializer(catalog.all(), many=True).data
+        ), 'Проверьте порядок жанров при сортировке по убыванию'
+
+    def test_list_matches_detail(self, client, catalog):
+        results = client.get('/api/v1/titles/?limit=10').json()['results']
+        for item in results:
+            detail = client.get(f'/api/v1/titles/{item["id"]}/').json()
+            assert item == detail
+
+    def test_genres_fetched_once(self, catalog, django_assert_num_queries):
+        from api.serializers import FastReadTitleSerializer
+
+        with django_assert_num_queries(2):
+            FastReadTitleSerializer(catalog, many=True).data
+
+
+@pytest.mark.django_db
+class TestTitleFields:
+
+    def test_sparse_fields(self, client, titles, django_assert_num_queries):
+        with django_assert_num_queries(3):
+            response = client.get('/api/v1/titles/?fields=id,name,rating')
+        item = response.json()['results'][0]
+        assert list(item) == ['id', 'rating', 'name'], (
+            'Проверьте, что ?fields= ограничивает поля ответа'
+        )
+        detail = client.get(f'/api/v1/titles/{item["id"]}/?fields=name,id')
+        assert detail.json() == {'id': item['id'], 'name': item['name']}
+
+    def test_sparse_fields_select_columns(self, client, titles):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        with CaptureQueriesContext(connection) as queries:
+            client.get(f'/api/v1/titles/{titles[0].id}/?fields=name')
+        assert not any(
+            'description' in query['sql'] or 'reviews_category' in query['sql']
+            for query in queries.captured_queries
+        ), 'Проверьте, что ?fields= ограничивает выбираемые колонки'
+
+    def test_unknown_fields(self, client, titles):
+        response = client.get('/api/v1/titles/?fields=id,secret&expand=x')
+        assert response.status_code == 400
+        assert set(response.json()) == {'fields', 'expand'}
+
+    def test_expand_reviews(
+        self, client, titles, reviews, django_assert_num_queries
+    ):
+        from reviews.models import Review
+
+        Review.objects.create(
+            title=titles[1], author=reviews[0].author, text='Да', score=5
+        )
+        with django_assert_num_queries(4):
+            response = client.get(
+                '/api/v1/titles/?fields=id&expand=reviews,category'
+            )
+        results = {item['id']: item for item in response.json()['results']}
+        assert list(results[titles[0].id]) == ['id', 'category', 'reviews']
+        assert [
+            review['id'] for review in results[titles[0].id]['reviews']
+        ] == [reviews[1].id, reviews[0].id], (
+            'Проверьте, что отзывы встроены от новых к старым'
+        )
+        assert len(results[titles[1].id]['reviews']) == 1
+        assert results[titles[2].id]['reviews'] == []
+        detail = client.get(
+            f'/api/v1/titles/{titles[0].id}/?fields=id&expand=reviews'
+        ).json()
+        assert detail['reviews'] == results[titles[0].id]['reviews']
+
+    def test_expand_reviews_is_bounded(self, client, title):
+        from reviews.models import Review, User
+
+        for number in range(7):
+            Review.objects.create(
+                title=title, text='Текст', score=number,
+                author=User.objects.create(
+                    username=f'critic{number}', email=f'{number}@ya.ru'
+                ),
+            )
+        response = client.get(f'/api/v1/titles/{title.id}/?expand=reviews')
+        assert len(response.json()['reviews']) == 5
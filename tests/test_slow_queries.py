@@ -0,0 +1,62 @@
+import pytest
+
+from api.models import SlowQuery
+
+
+@pytest.mark.django_db
+class TestSlowQueries:
+
+    def test_disabled_by_default(self, client, titles, settings):
+        settings.SLOW_QUERY_THRESHOLD = None
+        client.get('/api/v1/titles/')
+        assert not SlowQuery.objects.exists()
+
+    def test_slow_queries_are_saved(self, client, titles, settings):
+        settings.SLOW_QUERY_THRESHOLD = 0
+        settings.SLOW_QUERY_EXPLAIN_RATE = 1
+        client.get('/api/v1/titles/')
+        queries = list(SlowQuery.objects.all())
+        assert queries, 'Проверьте, что запросы выше порога сохраняются'
+        query = queries[0]
+        assert query.view == 'titles-list'
+        assert query.method == 'GET'
+        assert query.path == '/api/v1/titles/'
+        assert 'reviews_title' in query.sql
+        assert 'test_slow_queries.py' in query.stack
+        assert query.plan == '', (
+            'EXPLAIN ANALYZE выполняется только на PostgreSQL'
+        )
+
+    def test_ring_buffer(self, client, titles, settings):
+        settings.SLOW_QUERY_THRESHOLD = 0
+        settings.SLOW_QUERY_LIMIT = 3
+        for _ in range(3):
+            client.get('/api/v1/titles/')
+        assert SlowQuery.objects.count() == 3, (
+            'Проверьте, что хранятся только последние запросы'
+        )
+
+    def test_save_failure_is_logged(self, client, titles, settings,
+                                    monkeypatch, caplog):
+        from django.db import DatabaseError, connection
+        from django.test import RequestFactory
+
+        from api.slow_queries import SlowQueryCollector, SlowQueryMiddleware
+
+        def fail(collector):
+            raise DatabaseError('Нет места')
+
+        settings.SLOW_QUERY_THRESHOLD = 0
+        monkeypatch.setattr(SlowQueryCollector, 'save', fail)
+        assert client.get('/api/v1/titles/').status_code == 200, (
+            'Ошибка сохранения не должна ломать ответ'
+        )
+        assert 'Нет места' in caplog.text
+
+        def get_response(request):
+            connection.cursor().execute('SELECT 1')
+            raise ValueError('Исходная ошибка')
+
+        middleware = SlowQueryMiddleware(get_response)
+        with pytest.raises(ValueError, match='Исходная ошибка'):
+            middleware(RequestFactory().get('/'))
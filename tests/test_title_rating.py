@@ -0,0 +1,54 @@
+import pytest
+from django.core.management import CommandError, call_command
+
+from reviews.models import Review, Title
+
+
+def assert_rating(title, rating_sum, rating_count, rating):
+    title.refresh_from_db()
+    assert (title.rating_sum, title.rating_count, title.rating) == (
+        rating_sum, rating_count, rating
+    ), 'Проверьте, что агрегаты рейтинга произведения обновляются при изменении отзывов'
+
+
+@pytest.mark.django_db
+class TestTitleRating:
+
+    def test_rating_follows_reviews(self, title, reviews, another_user):
+        assert_rating(title, 11, 2, 6)
+
+        review = Review.objects.get(pk=reviews[0].pk)
+        review.score = 10
+        review.save()
+        assert_rating(title, 14, 2, 7)
+
+        Review.objects.get(pk=reviews[1].pk).delete()
+        assert_rating(title, 10, 1, 10)
+
+        another_user.delete()
+        assert_rating(title, 10, 1, 10)
+        reviews[0].author.delete()
+        assert_rating(title, 0, 0, None)
+
+    def test_review_moved_to_another_title(self, titles, reviews):
+        review = Review.objects.get(pk=reviews[0].pk)
+        review.title = titles[1]
+        review.save()
+        assert_rating(titles[0], 4, 1, 4)
+        assert_rating(titles[1], 7, 1, 7)
+
+    def test_rebuild_command(self, title, reviews):
+        Title.objects.update(rating_sum=0, rating_count=0, rating=None)
+        with pytest.raises(CommandError):
+            call_command('rebuild-ratings', '--check')
+        call_command('rebuild-ratings')
+        assert_rating(title, 11, 2, 6)
+        call_command('rebuild-ratings', '--check')
+
+    def test_rating_filter_and_ordering(self, client, titles, reviews):
+        response = client.get('/api/v1/titles/?rating__gte=6')
+        assert [item['id'] for item in response.json()['results']] == [
+            titles[0].id
+        ], 'Проверьте фильтрацию произведений по рейтингу'
+        response = client.get('/api/v1/titles/?ordering=-rating&rating__gte=0')
+        assert response.json()['results'][0]['rating'] == 6